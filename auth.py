@@ -0,0 +1,93 @@
+"""
+Authentication helpers for the Attendance Management System
+Password hashing runs in a bounded thread pool with a configurable cost and is
+upgraded transparently at login; faculty records are cached in process.
+
+Environment:
+    PASSWORD_HASH_METHOD   werkzeug hash method, e.g. ``scrypt:32768:8:1`` or
+                           ``pbkdf2:sha256:600000``; short forms such as ``pbkdf2``
+                           take werkzeug's defaults (default: werkzeug's default)
+    PASSWORD_HASH_WORKERS  concurrent hash computations per process (default 2)
+    FACULTY_CACHE_TTL      seconds faculty records stay cached (default 300)
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Any
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from cache import TTLCache
+
+# werkzeug's default method, written out so stored hashes can be compared to it
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+
+
+def full_hash_method(method: str) -> str:
+    """werkzeug's full form of a hash method (``pbkdf2`` -> ``pbkdf2:sha256:600000``)
+
+    Stored hashes are prefixed with the full form, so a short configured method
+    would otherwise never match and every login would rehash.
+    """
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a bounded worker pool"""
+
+    def __init__(self, method: str = DEFAULT_HASH_METHOD, workers: int = 2):
+        self.method = full_hash_method(method)
+        self.workers = workers
+        self._pool = None
+        self._pool_pid = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # A pool created before fork (e.g. in the gunicorn master) has no threads in the child
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def hash(self, password: str) -> str:
+        return self._executor().submit(generate_password_hash, password, self.method).result()
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._executor().submit(check_password_hash, password_hash, password).result()
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a stored hash uses a different method or cost than configured"""
+        return password_hash.split('$', 1)[0] != self.method
+
+
+hasher = PasswordHasher(
+    method=os.getenv('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD),
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+)
+faculty_cache = TTLCache(ttl=float(os.getenv('FACULTY_CACHE_TTL', '300')))
+
+
+def get_faculty(repo, faculty_id: str) -> Optional[Dict[str, Any]]:
+    """Faculty auth record (including password hash), cached in process"""
+    return faculty_cache.get_or_load(faculty_id, lambda: repo.find_faculty(faculty_id))
+
+
+def faculty_profile(repo, faculty_id: str) -> Optional[Dict[str, Any]]:
+    """Cached faculty profile without credentials, for checks beyond the session cookie"""
+    faculty = get_faculty(repo, faculty_id)
+    if not faculty:
+        return None
+    return {key: value for key, value in faculty.items() if key not in ('password_hash', '_id')}
+
+
+def authenticate(repo, faculty_id: str, password: str) -> Optional[Dict[str, Any]]:
+    """Verify credentials; upgrades the stored hash when the configured cost has changed"""
+    faculty = get_faculty(repo, faculty_id)
+    if not faculty or not hasher.verify(faculty['password_hash'], password):
+        return None
+    if hasher.needs_rehash(faculty['password_hash']):
+        try:
+            new_hash = hasher.hash(password)
+            repo.update_faculty_password(faculty_id, new_hash)
+            faculty_cache.set(faculty_id, dict(faculty, password_hash=new_hash))
+        except Exception as e:
+            print(f"⚠️ Password hash upgrade failed for {faculty_id}: {e}")
+    return faculty
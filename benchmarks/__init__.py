@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the Attendance Management System
+Run from the repository root, e.g. ``python -m benchmarks.bench_endpoints``.
+Use ``--backend memory`` (the default) to run with no outside service,
+``--backend mongomock`` (requires ``mongomock``) or ``--backend mongo`` for a
+local mongod, to compare query-layer overhead.
+"""
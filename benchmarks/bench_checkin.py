@@ -0,0 +1,75 @@
+"""
+Benchmark QR self check-in under a thundering herd: a whole class submitting
+the same token at once. Reports check-ins per second through the Flask app
+and through CheckIns directly (the ceiling without WSGI overhead), and checks
+that every student ends up with exactly one mark.
+
+Usage:
+    python -m benchmarks.bench_checkin --students 5000 --concurrency 32
+    python -m benchmarks.bench_checkin --backend mongo --students 20000
+"""
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+from benchmarks.harness import drive, load_app, login, seed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark QR self check-in')
+    parser.add_argument('--backend', choices=['memory', 'mongomock', 'mongo'], default='memory')
+    parser.add_argument('--uri', help='MongoDB URI when --backend=mongo (default: local mongod)')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args(argv)
+
+    module = load_app(args.backend, args.uri)
+    app, checkins = module.app, module.checkins
+    student_ids = seed(module.repo, students=args.students, records=0)['student_ids']
+
+    faculty = app.test_client()
+    login(faculty)
+
+    def fresh_lecture() -> str:
+        """Start a new lecture so earlier runs' check-ins do not count as duplicates"""
+        fresh_lecture.number += 1
+        faculty.post('/api/set_lecture', json={'lecture_number': fresh_lecture.number})
+        return faculty.post('/api/checkin/token', json={}).get_json()['token']
+    fresh_lecture.number = 100
+
+    # Through the app: one request per student, all at once
+    token = fresh_lecture()
+    result = drive(app.test_client,
+                   lambda client, i: client.post('/api/checkin', json={'token': token, 'student_id': student_ids[i]}),
+                   len(student_ids), args.concurrency)
+    started = time.perf_counter()
+    checkins.flush()
+    flush_ms = (time.perf_counter() - started) * 1000
+    print(f"app     {result['throughput_rps']:>10.0f} check-ins/s  p50 {result['p50_ms']:.2f}ms  "
+          f"p99 {result['p99_ms']:.2f}ms  final flush {flush_ms:.1f}ms")
+
+    # Everyone again: all duplicates (409), answered from memory
+    result = drive(app.test_client,
+                   lambda client, i: client.post('/api/checkin', json={'token': token, 'student_id': student_ids[i]}),
+                   len(student_ids), args.concurrency, expected_status=409)
+    print(f"repeat  {result['throughput_rps']:>10.0f} check-ins/s  p99 {result['p99_ms']:.2f}ms")
+
+    # Without Flask: token verification, roster lookup, dedupe and buffering only
+    token = fresh_lecture()
+    started = time.perf_counter()
+    outcomes = [checkins.check_in(token, student_id) for student_id in student_ids]
+    seconds = time.perf_counter() - started
+    checkins.flush()
+    print(f"direct  {len(student_ids) / seconds:>10.0f} check-ins/s  "
+          f"accepted {outcomes.count('accepted')}/{len(student_ids)}")
+
+    if module.mark_queue:
+        module.mark_queue.drain()
+    marks = module.repo.count_attendance_for_days(*module.clock.month_days(module.clock.day_key()))
+    print(f"stored  {marks} marks for {2 * len(student_ids)} accepted check-ins")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Load-test the marking, stats, reports and export endpoints.
+
+Usage:
+    python -m benchmarks.bench_endpoints --students 2000 --records 50000 --concurrency 8
+    python -m benchmarks.bench_endpoints --save benchmarks/baselines/main.json
+    python -m benchmarks.bench_endpoints --compare benchmarks/baselines/main.json
+"""
+import argparse
+import sys
+from typing import Dict, List, Optional, Any
+
+from benchmarks.harness import (compare_baseline, drive, git_revision, load_app, login,
+                                save_baseline, seed)
+
+EXPORT_ROUTES = [
+    '/export_excel',
+    '/api/export_today_attendance',
+    '/api/export_all_students',
+    '/api/export_monthly_report',
+    '/export/attendance_excel',
+    '/export/students_excel',
+    '/export/daily_report_excel',
+]
+
+
+def endpoint_plan(student_ids: List[str], requests: int, export_requests: int) -> Dict[str, Any]:
+    """Request generator and request count for every benchmarked endpoint"""
+    bulk_size = 50
+
+    def mark(client, i):
+        return client.post('/api/mark_attendance', json={'student_id': student_ids[i % len(student_ids)]})
+
+    def bulk(client, i):
+        start = (i * bulk_size) % max(len(student_ids), 1)
+        return client.post('/api/bulk_attendance', json={'student_ids': student_ids[start:start + bulk_size]})
+
+    plan = {
+        'mark_attendance': (mark, requests),
+        'bulk_attendance': (bulk, max(1, requests // 10)),
+        'stats': (lambda client, i: client.get('/api/stats'), requests),
+        'reports': (lambda client, i: client.get('/reports'), max(1, requests // 5)),
+    }
+    for route in EXPORT_ROUTES:
+        plan[route] = ((lambda r: lambda client, i: client.get(r))(route), export_requests)
+    return plan
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark attendance endpoints')
+    parser.add_argument('--backend', choices=['memory', 'mongomock', 'mongo'], default='memory')
+    parser.add_argument('--uri', help='MongoDB URI when --backend=mongo (default: local mongod)')
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--export-requests', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--only', action='append', help='run only the named endpoint(s)')
+    parser.add_argument('--save', help='write results to this JSON baseline')
+    parser.add_argument('--compare', help='compare results with this JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression ratio')
+    args = parser.parse_args(argv)
+
+    module = load_app(args.backend, args.uri)
+    app = module.app
+    print(f"🌱 Seeding {args.students} students and {args.records} attendance records ({args.backend})...")
+    seeded = seed(module.repo, args.students, args.records)
+
+    def make_client():
+        client = app.test_client()
+        login(client)
+        return client
+
+    results = {}
+    for name, (request_fn, count) in endpoint_plan(seeded['student_ids'], args.requests, args.export_requests).items():
+        if args.only and name not in args.only:
+            continue
+        result = drive(make_client, request_fn, count, args.concurrency)
+        results[name] = result
+        print(f"{name:<32} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f}ms  "
+              f"p99 {result['p99_ms']:>8.2f}ms  rss {result['peak_rss_mb']:>7.1f}MB")
+
+    meta = {
+        'revision': git_revision(),
+        'backend': args.backend,
+        'students': args.students,
+        'records': seeded['records'],
+        'concurrency': args.concurrency,
+    }
+    if args.save:
+        save_baseline(args.save, results, meta)
+        print(f"💾 Baseline saved to {args.save}")
+    if args.compare:
+        regressions = compare_baseline(args.compare, results, args.tolerance)
+        for message in regressions:
+            print(f"❌ Regression: {message}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Benchmark workbook generation: one sheet per department, built by the parallel
+writer at increasing worker counts and by the serial pandas writers.
+
+Usage:
+    python -m benchmarks.bench_excel --departments 20 --rows 5000
+    python -m benchmarks.bench_excel --workers 1 --workers 4 --writer parallel
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import List, Optional
+
+from excel_builder import WRITERS, build_workbook, pool_size
+
+
+def department_sheets(departments: int, rows: int) -> list:
+    """Synthetic attendance rows split into one sheet per department"""
+    start = datetime(2024, 1, 1, 9)
+    sheets = []
+    for d in range(departments):
+        data = [[
+            f'S{d:02d}{i:05d}',
+            f'Student {d:02d}-{i:05d}',
+            f'Class {chr(65 + i % 3)}',
+            (start + timedelta(minutes=i)).strftime('%Y-%m-%d'),
+            (start + timedelta(minutes=i)).strftime('%H:%M:%S'),
+            i % 8 + 1,
+            'Present' if i % 5 else 'Absent',
+        ] for i in range(rows)]
+        sheets.append((f'Department {d + 1}', ['Student ID', 'Name', 'Class', 'Date', 'Time', 'Lecture', 'Status'], data))
+    return sheets
+
+
+def timed_build(sheets: list, writer: str, workers: Optional[int] = None, repeat: int = 3) -> tuple:
+    """Best wall time over ``repeat`` runs and the workbook size"""
+    best, size = float('inf'), 0
+    for _ in range(repeat):
+        buffer = BytesIO()
+        started = time.perf_counter()
+        build_workbook(buffer, sheets, writer=writer, workers=workers)
+        best = min(best, time.perf_counter() - started)
+        size = buffer.tell()
+    return best, size
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark Excel workbook generation')
+    parser.add_argument('--departments', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=5000, help='rows per department sheet')
+    parser.add_argument('--workers', type=int, action='append', help='worker counts for the parallel writer')
+    parser.add_argument('--writer', action='append', choices=WRITERS, help='writers to run (default: all available)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    sheets = department_sheets(args.departments, args.rows)
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({n for n in (1, 2, 4, 8, cpus) if n <= cpus})
+    writers = args.writer or list(WRITERS)
+    print(f"📊 {args.departments} sheets x {args.rows} rows, {cpus} CPUs, app pool size {pool_size()}")
+
+    if 'parallel' in writers:
+        # The first build also spawns the pool; later exports in the process reuse it
+        cold, _ = timed_build(sheets, 'parallel', pool_size(), repeat=1)
+        warm, _ = timed_build(sheets, 'parallel', pool_size(), repeat=1)
+        print(f"parallel   workers={pool_size():<3} {cold:>8.3f}s first build (pool start {max(cold - warm, 0):.3f}s), "
+              f"{warm:.3f}s reused")
+        baseline = None
+        for workers in worker_counts:
+            seconds, size = timed_build(sheets, 'parallel', workers, args.repeat)
+            baseline = baseline or seconds
+            print(f"parallel   workers={workers:<3} {seconds:>8.3f}s  speedup {baseline / seconds:>5.2f}x  "
+                  f"{size / 1e6:>6.1f}MB")
+
+    for writer in (w for w in writers if w != 'parallel'):
+        try:
+            seconds, size = timed_build(sheets, writer, repeat=1)
+        except ImportError as e:
+            print(f"{writer:<10} skipped ({e})")
+            continue
+        print(f"{writer:<10} serial      {seconds:>8.3f}s  {size / 1e6:>16.1f}MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
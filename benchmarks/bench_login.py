@@ -0,0 +1,63 @@
+"""
+Measure login throughput per password hash method, and how a login burst
+affects latency of ordinary requests served at the same time.
+
+Usage:
+    python -m benchmarks.bench_login --logins 200 --concurrency 8
+    python -m benchmarks.bench_login --method pbkdf2:sha256:600000 --method scrypt:32768:8:1
+"""
+import argparse
+import sys
+import threading
+from typing import List, Optional
+
+from benchmarks.harness import BENCH_PASSWORD, drive, load_app, login, seed
+
+DEFAULT_METHODS = ['pbkdf2:sha256:600000', 'scrypt:32768:8:1', 'scrypt:16384:8:1']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the login path')
+    parser.add_argument('--backend', choices=['memory', 'mongomock', 'mongo'], default='memory')
+    parser.add_argument('--uri', help='MongoDB URI when --backend=mongo (default: local mongod)')
+    parser.add_argument('--method', action='append', help='hash method(s) to compare')
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=500, help='concurrent /api/stats requests')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    module = load_app(args.backend, args.uri)
+    app = module.app
+    seed(module.repo, students=200, records=2000)
+
+    from auth import hasher
+
+    def do_login(client, i):
+        return client.post('/login', data={'faculty_id': 'bench', 'password': BENCH_PASSWORD})
+
+    def make_client():
+        client = app.test_client()
+        login(client)
+        return client
+
+    print(f"{'method':<24} {'logins/s':>9} {'login p99':>11} {'stats p99 idle':>15} {'stats p99 busy':>15}")
+    for method in args.method or DEFAULT_METHODS:
+        hasher.method = method
+        # The first login upgrades the stored hash to the method under test
+        make_client()
+
+        logins = drive(app.test_client, do_login, args.logins, args.concurrency)
+        idle = drive(make_client, lambda client, i: client.get('/api/stats'), args.requests, args.concurrency)
+
+        burst = threading.Thread(target=drive, args=(app.test_client, do_login, args.logins, args.concurrency))
+        burst.start()
+        stats = drive(make_client, lambda client, i: client.get('/api/stats'), args.requests, args.concurrency)
+        burst.join()
+
+        print(f"{method:<24} {logins['throughput_rps']:>9.1f} {logins['p99_ms']:>9.1f}ms "
+              f"{idle['p99_ms']:>13.2f}ms {stats['p99_ms']:>13.2f}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
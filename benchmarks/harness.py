@@ -0,0 +1,207 @@
+"""
+Shared benchmark helpers: app loading, data seeding, concurrent drivers and
+JSON baselines.
+"""
+import json
+import os
+import random
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Any
+
+DEPARTMENTS = ['CSE', 'ECE', 'ME', 'CE', 'EE', 'IT', 'BT', 'CH']
+BENCH_PASSWORD = 'bench123'
+
+
+def load_app(backend: str = 'memory', uri: Optional[str] = None):
+    """Import the Flask app on the in-memory backend, mongomock or a local mongod
+
+    Any data in the benchmark database is cleared first. All traffic comes from one
+    login, so rate limits are off; exports wait for their job instead of answering 202.
+    """
+    os.environ['STORAGE_BACKEND'] = 'memory' if backend == 'memory' else 'mongo'
+    os.environ['MONGO_URI'] = uri or 'mongodb://localhost:27017/attendance_bench'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ.setdefault('EXPORT_WAIT_SECONDS', '300')
+    os.environ.setdefault('CHECKIN_SECRET', 'benchmark-checkin-secret')
+    import attendance_system
+
+    if backend == 'mongomock':
+        import mongomock
+
+        attendance_system.repo.db = mongomock.MongoClient().attendance_bench
+        # mongomock ignores index hints
+        attendance_system.repo.use_hints = False
+    if backend in ('mongo', 'mongomock'):
+        for name in ('students', 'attendance', 'lectures', 'faculty'):
+            attendance_system.repo.db[name].delete_many({})
+    attendance_system.app.config['TESTING'] = True
+    return attendance_system
+
+
+def seed(repo, students: int, records: int, days: int = 30, rng_seed: int = 42) -> Dict[str, Any]:
+    """Populate an empty storage backend through its public interface"""
+    from werkzeug.security import generate_password_hash
+    from models import ATTENDANCE_METHODS
+    from storage import MARK_FIELDS
+
+    rng = random.Random(rng_seed)
+    repo.insert_faculty({
+        'faculty_id': 'bench',
+        'password_hash': generate_password_hash(BENCH_PASSWORD),
+        'name': 'Benchmark Faculty',
+        'created_at': datetime.now()
+    })
+    student_docs = []
+    for i in range(students):
+        student = {
+            'name': f'Student {i:05d}',
+            'student_id': f'S{i:05d}',
+            'class': f'Class {chr(65 + i % 3)}',
+            'email': f's{i:05d}@example.edu',
+            'phone': '',
+            'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+            'created_at': datetime.now(),
+            'is_active': True
+        }
+        repo.insert_student(student)
+        student_docs.append(student)
+    repo.get_or_create_active_lecture('bench')
+
+    # Records go through the same builder as real marks, so they carry day, section and
+    # updated_at and hit the same indexes; draws that repeat a mark are skipped
+    now = datetime.now()
+    attendance_docs, marks = [], set()
+    for _ in range(records if student_docs else 0):
+        student = rng.choice(student_docs)
+        timestamp = now - timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
+        record = repo.build_attendance(student, {'lecture_number': rng.randint(1, 8)}, 'bench',
+                                       ATTENDANCE_METHODS['MANUAL'], timestamp)
+        mark = tuple(record[field] for field in MARK_FIELDS)
+        if mark not in marks:
+            marks.add(mark)
+            attendance_docs.append(record)
+    for i in range(0, len(attendance_docs), 5000):
+        repo.insert_attendance_many(attendance_docs[i:i + 5000])
+    return {'student_ids': [s['student_id'] for s in student_docs], 'records': len(attendance_docs)}
+
+
+def login(client) -> None:
+    client.post('/login', data={'faculty_id': 'bench', 'password': BENCH_PASSWORD})
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    """Background thread tracking peak RSS while a benchmark runs"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def drive(make_client: Callable, request_fn: Callable, requests: int, concurrency: int,
+          expected_status: int = 200) -> Dict[str, Any]:
+    """Run ``requests`` calls of ``request_fn(client, i)`` over ``concurrency`` clients
+
+    Every response must have ``expected_status``; timings of anything else (a 429
+    from the rate limiter, a 500) would measure the wrong work.
+    """
+    latencies: List[float] = []
+    lock = threading.Lock()
+    clients = [make_client() for _ in range(concurrency)]
+
+    def worker(worker_index: int):
+        client = clients[worker_index]
+        local = []
+        for i in range(worker_index, requests, concurrency):
+            started = time.perf_counter()
+            response = request_fn(client, i)
+            local.append(time.perf_counter() - started)
+            assert response.status_code == expected_status, \
+                f'request {i}: HTTP {response.status_code}, expected {expected_status}'
+        with lock:
+            latencies.extend(local)
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        'peak_rss_mb': round(sampler.peak / (1024 * 1024), 2),
+    }
+
+
+def save_baseline(path: str, results: Dict[str, Any], meta: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump({'meta': meta, 'results': results}, fh, indent=2, sort_keys=True)
+
+
+def compare_baseline(path: str, results: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a message for every endpoint whose p99 or throughput regressed beyond ``tolerance``"""
+    with open(path) as fh:
+        baseline = json.load(fh)['results']
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous['p99_ms'] and current['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']}ms -> {current['p99_ms']}ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def git_revision() -> str:
+    try:
+        import subprocess
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return 'unknown'
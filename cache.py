@@ -0,0 +1,90 @@
+"""
+In-process caches for the Attendance Management System
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe dict cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                self._evict()
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value, calling ``loader`` on a miss (None results are not cached)"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (expires, _) in self._data.items() if expires < now]
+        for key in expired:
+            del self._data[key]
+        if len(self._data) >= self.max_entries:
+            # Drop the entries closest to expiry
+            for key, _ in sorted(self._data.items(), key=lambda item: item[1][0])[:len(self._data) // 10 + 1]:
+                del self._data[key]
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers asking for the same key
+
+    Only callers that arrive while the computation runs share its result (or
+    exception); nothing is kept afterwards.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, list] = {}   # key -> [done event, result, exception]
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+        try:
+            call[1] = fn()
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1]
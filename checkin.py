@@ -0,0 +1,350 @@
+"""
+Self check-in for the Attendance Management System
+A faculty member displays a rotating QR code for the running lecture; students
+scan it and submit the token with their student ID. Tokens are signed with
+HMAC-SHA256 and carry the lecture, so a check-in needs no database read: the
+signature and rotation window are verified, the student is looked up in an
+in-memory roster and deduplicated in a per-lecture in-memory set, and
+accepted check-ins are buffered and written in batches by a background
+flusher. Batches are written with write_marks, so a student whose check-ins
+reach two worker processes still gets one mark, and a check-in arriving after
+the lecture was finalized turns the absent mark into a present one. A batch
+that keeps failing is dropped after a few attempts and its students may check
+in again.
+
+Each worker process publishes how many check-ins it has accepted and written
+in a small file, so finalizing a lecture can wait until the check-ins buffered
+in every worker on the host are stored.
+
+Check-in is disabled unless a secret is configured: anyone who knows the key
+can mint tokens, and the Flask default key is public.
+
+Environment:
+    CHECKIN_SECRET          HMAC key (default: SECRET_KEY; check-in is off when neither is set)
+    CHECKIN_ROTATION        seconds a QR token is current; the previous one is still accepted (default 15)
+    CHECKIN_BATCH_SIZE      check-ins written per batch (default 500)
+    CHECKIN_FLUSH_INTERVAL  seconds between batch writes (default 0.2)
+    CHECKIN_MAX_ATTEMPTS    writes of a batch before it is dropped (default 5)
+    CHECKIN_VERSION_PATH    roster counter file (default: attendance_checkin.bin in the temp dir)
+    CHECKIN_PROGRESS_DIR    per-process progress files (default: attendance_checkins in the temp dir)
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+import clock
+from lecture_sessions import section_roster
+from models import ATTENDANCE_METHODS, ATTENDANCE_STATUS
+from storage import StorageBackend
+from versioning import DataVersion
+
+# Check-in outcomes
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+INVALID_TOKEN = 'invalid_token'
+UNKNOWN_STUDENT = 'unknown_student'
+
+_SEPARATOR = '\x1f'
+# Check-ins accepted, and written (or dropped), by one worker process
+_PROGRESS = struct.Struct('QQ')
+_SIGNATURE_BYTES = 16
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class CheckInUnavailable(RuntimeError):
+    """Raised when self check-in is used without a configured secret"""
+
+
+class CheckIns:
+    """Token issue and verification, deduplication and batched writes of self check-ins"""
+
+    def __init__(self, repo, secret: Optional[bytes], version: DataVersion, rotation: float = 15,
+                 batch_size: int = 500, flush_interval: float = 0.2, max_attempts: int = 5,
+                 progress_dir: str = 'checkins'):
+        self.repo = repo
+        self.secret = secret
+        self.version = version
+        self.rotation = rotation
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.progress_dir = progress_dir
+        # Receives each batch of attendance records; the write-behind queue can stand in
+        self.sink: Callable[[List[Dict[str, Any]]], Any] = repo.write_marks
+        # Called after a batch is written
+        self.on_flush: Optional[Callable[[], None]] = None
+        self._roster: Dict[str, Dict[str, Any]] = {}
+        self._roster_stamp = None
+        self._seen: Dict[tuple, set] = {}      # (faculty_id, section, lecture_number, day) -> student_ids
+        self._pending: List[Dict[str, Any]] = []
+        self._failed_attempts = 0
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._progress = None
+        self._progress_pid = None
+        self._accepted = 0
+        self._written = 0
+        os.makedirs(progress_dir, exist_ok=True)
+
+    # Tokens
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret)
+
+    def _require_secret(self) -> None:
+        if not self.secret:
+            raise CheckInUnavailable('Self check-in is disabled: set CHECKIN_SECRET or SECRET_KEY')
+
+    def _sign(self, payload: bytes) -> bytes:
+        self._require_secret()
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+    def issue(self, lecture: Dict[str, Any], faculty_id: Optional[str], now: Optional[float] = None) -> Dict[str, Any]:
+        """Token for the current rotation window of a lecture, and when the next one is due"""
+        now = now or time.time()
+        window = int(now // self.rotation)
+        payload = _SEPARATOR.join([faculty_id or '', lecture['section'], str(lecture['lecture_number']),
+                                   lecture.get('subject', 'General'), str(clock.day_key()), str(window)]).encode()
+        return {
+            'token': f'{_b64encode(payload)}.{_b64encode(self._sign(payload))}',
+            'refresh_in': round((window + 1) * self.rotation - now, 3),
+            'rotation': self.rotation,
+        }
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The lecture a token was issued for, or None if it is forged, malformed or expired"""
+        try:
+            encoded_payload, encoded_signature = token.split('.')
+            payload = _b64decode(encoded_payload)
+            signature = _b64decode(encoded_signature)
+        except (AttributeError, ValueError, binascii.Error):
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        faculty_id, section, lecture_number, subject, day, window = payload.decode().split(_SEPARATOR)
+        # The previous window stays valid so a code scanned just before it rotates still works
+        if int(window) < int((now or time.time()) // self.rotation) - 1:
+            return None
+        return {'faculty_id': faculty_id or None, 'section': section, 'lecture_number': int(lecture_number),
+                'subject': subject, 'day': int(day)}
+
+    # Check-ins
+
+    def roster(self) -> Dict[str, Dict[str, Any]]:
+        """Active students by student ID, reloaded after any student change"""
+        stamp = self.version.read()[:2]
+        if self._roster_stamp != stamp:
+            students = self.repo.list_active_students()
+            self._roster = {student['student_id']: student for student in students}
+            self._roster_stamp = stamp
+        return self._roster
+
+    def check_in(self, token: str, student_id: str) -> str:
+        """Accept a check-in; returns one of ACCEPTED, DUPLICATE, INVALID_TOKEN or UNKNOWN_STUDENT
+
+        Students outside the lecture's section count as unknown.
+        """
+        self._require_secret()
+        lecture = self.verify(token)
+        if not lecture:
+            return INVALID_TOKEN
+        student = self.roster().get(student_id)
+        if not student or not section_roster([student], lecture['section']):
+            return UNKNOWN_STUDENT
+        key = (lecture['faculty_id'], lecture['section'], lecture['lecture_number'], lecture['day'])
+        with self._lock:
+            seen = self._seen.setdefault(key, set())
+            if student_id in seen:
+                return DUPLICATE
+            seen.add(student_id)
+            self._pending.append(StorageBackend.build_attendance(
+                student, lecture, lecture['faculty_id'], ATTENDANCE_METHODS['SELF_CHECKIN'], clock.now(),
+                ATTENDANCE_STATUS['PRESENT']))
+            self._accepted += 1
+            self._publish_progress()
+            full = len(self._pending) >= self.batch_size
+        self.start()
+        if full:
+            self._wake.set()
+        return ACCEPTED
+
+    def invalidate(self) -> None:
+        """Reload the roster in every worker process on next use"""
+        self.version.bump()
+
+    # Batched writes
+
+    def start(self) -> None:
+        """Start the flusher thread in this process (safe to call repeatedly, and after fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='checkin-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write pending check-ins in batches; a failed batch stays pending for up to max_attempts runs"""
+        # Serialized, so a caller returns only after a batch taken by the flusher thread is written
+        with self._flushing:
+            return self._flush()
+
+    def _flush(self) -> int:
+        written = 0
+        while True:
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+            if not batch:
+                break
+            try:
+                self.sink(batch)
+            except Exception as e:
+                self._failed_attempts += 1
+                if self._failed_attempts < self.max_attempts:
+                    print(f"❌ Writing {len(batch)} check-ins failed, retrying: {e}")
+                    with self._lock:
+                        self._pending[:0] = batch
+                else:
+                    self._failed_attempts = 0
+                    self._forget(batch)
+                    self._settled(len(batch))
+                    print(f"❌ Dropped {len(batch)} check-ins after {self.max_attempts} failed writes, "
+                          f"their students can check in again: {e}")
+                break
+            self._failed_attempts = 0
+            self._settled(len(batch))
+            written += len(batch)
+        if written and self.on_flush:
+            self.on_flush()
+        self._forget_past_lectures()
+        return written
+
+    # Progress shared with the other worker processes
+
+    def _progress_path(self, pid: int) -> str:
+        return os.path.join(self.progress_dir, f'{pid}.bin')
+
+    def _publish_progress(self) -> None:
+        """Write this process's counts to its progress file (call with the lock held)"""
+        if self._progress_pid != os.getpid():
+            # Counts are per process; a forked child starts its own file
+            fd = os.open(self._progress_path(os.getpid()), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                os.ftruncate(fd, _PROGRESS.size)
+                self._progress = mmap.mmap(fd, _PROGRESS.size)
+            finally:
+                os.close(fd)
+            self._progress_pid = os.getpid()
+            self._accepted, self._written = len(self._pending), 0
+        _PROGRESS.pack_into(self._progress, 0, self._accepted, self._written)
+
+    def _settled(self, count: int) -> None:
+        with self._lock:
+            self._written += count
+            self._publish_progress()
+
+    def _read_progress(self, path: str) -> Optional[tuple]:
+        try:
+            with open(path, 'rb') as fh:
+                return _PROGRESS.unpack(fh.read(_PROGRESS.size))
+        except (OSError, struct.error):
+            return None
+
+    def wait_for_all(self, timeout: float = 5.0) -> bool:
+        """Wait until the check-ins accepted so far by every worker process on the host are
+        written; returns False if some are still buffered at the timeout"""
+        self.flush()
+        waiting = {}
+        for name in os.listdir(self.progress_dir):
+            pid = int(name[:-4]) if name.endswith('.bin') and name[:-4].isdigit() else None
+            if pid is None:
+                continue
+            path = self._progress_path(pid)
+            if not _pid_alive(pid):
+                # Whatever a dead process had buffered is lost
+                os.remove(path)
+                continue
+            progress = self._read_progress(path)
+            if progress and progress[1] < progress[0]:
+                waiting[path] = progress[0]
+        deadline = time.monotonic() + timeout
+        while waiting and time.monotonic() < deadline:
+            # Other workers flush every flush_interval
+            time.sleep(min(self.flush_interval, 0.05))
+            waiting = {path: accepted for path, accepted in waiting.items()
+                       if (self._read_progress(path) or (0, accepted))[1] < accepted}
+        return not waiting
+
+    def _forget(self, records: List[Dict[str, Any]]) -> None:
+        """Let the students of unwritten check-ins check in again"""
+        with self._lock:
+            for record in records:
+                key = (record['faculty_id'], record['section'], record['lecture_number'], record['day'])
+                self._seen.get(key, set()).discard(record['student_id'])
+
+    def _forget_past_lectures(self) -> None:
+        today = clock.day_key()
+        with self._lock:
+            for key in [key for key in self._seen if key[3] < today]:
+                del self._seen[key]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+checkin_version = DataVersion(os.getenv(
+    'CHECKIN_VERSION_PATH', os.path.join(tempfile.gettempdir(), 'attendance_checkin.bin')))
+
+
+def create_checkins(repo, secret_key: Optional[str] = None) -> CheckIns:
+    """Build the check-in service from environment settings
+
+    ``secret_key`` is the configured Flask secret key, or None when the app runs
+    with its built-in default, which must never sign check-in tokens.
+    """
+    secret = os.getenv('CHECKIN_SECRET') or secret_key
+    return CheckIns(
+        repo,
+        secret.encode() if secret else None,
+        checkin_version,
+        rotation=float(os.getenv('CHECKIN_ROTATION', '15')),
+        batch_size=int(os.getenv('CHECKIN_BATCH_SIZE', '500')),
+        flush_interval=float(os.getenv('CHECKIN_FLUSH_INTERVAL', '0.2')),
+        max_attempts=int(os.getenv('CHECKIN_MAX_ATTEMPTS', '5')),
+        progress_dir=os.getenv('CHECKIN_PROGRESS_DIR', os.path.join(tempfile.gettempdir(), 'attendance_checkins')),
+    )
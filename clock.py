@@ -0,0 +1,86 @@
+"""
+Time and day keys for the Attendance Management System
+Timestamps are stored as naive datetimes in the institution's local time.
+Every attendance record also carries ``day``, the integer YYYYMMDD key of its
+local date. Duplicate checks, day buckets and date-range reports filter and
+group on that indexed integer rather than on datetime ranges over ``date`` or
+``timestamp``, so writers and readers always agree on a mark's day.
+
+Environment:
+    INSTITUTION_TIMEZONE  IANA zone for timestamps and day keys, e.g. Asia/Kolkata (default: server local time)
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+_TIMEZONE_NAME = os.getenv('INSTITUTION_TIMEZONE', '')
+INSTITUTION_TZ = ZoneInfo(_TIMEZONE_NAME) if _TIMEZONE_NAME and ZoneInfo else None
+
+
+def now() -> datetime:
+    """Current institution-local time as a naive datetime, the form stored in records"""
+    if INSTITUTION_TZ is None:
+        return datetime.now()
+    return datetime.now(INSTITUTION_TZ).replace(tzinfo=None)
+
+
+def to_local(value: datetime) -> datetime:
+    """Naive institution-local form of a datetime; aware values are converted, naive ones kept"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(INSTITUTION_TZ).replace(tzinfo=None)
+
+
+def day_key(value: Optional[datetime] = None) -> int:
+    """Integer YYYYMMDD key of the local day containing ``value`` (default now)"""
+    value = to_local(value) if value else now()
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def day_start(key: int) -> datetime:
+    """Midnight starting the day with this key"""
+    return datetime(key // 10000, key // 100 % 100, key % 100)
+
+
+def add_days(key: int, days: int) -> int:
+    return day_key(day_start(key) + timedelta(days=days))
+
+
+def month_days(key: Optional[int] = None) -> tuple:
+    """[first, end) day keys of the month containing ``key`` (default today)"""
+    key = key or day_key()
+    first = key // 100 * 100 + 1
+    next_month = day_start(first) + timedelta(days=32)
+    return first, next_month.year * 10000 + next_month.month * 100 + 1
+
+
+def parse_day(value: str) -> int:
+    """Day key of a 'YYYY-MM-DD' string; raises ValueError for anything else"""
+    return day_key(datetime.strptime(value, '%Y-%m-%d'))
+
+
+def format_day(key: int) -> str:
+    return day_start(key).strftime('%Y-%m-%d')
+
+
+def day_bounds(day: Optional[datetime] = None) -> tuple:
+    """Return the [start, end) datetimes of the day containing ``day``"""
+    start = day_start(day_key(day))
+    return start, start + timedelta(days=1)
+
+
+def day_range_query(start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Any]:
+    """MongoDB filter on ``day`` for an inclusive 'YYYY-MM-DD' range; unparsable ends are ignored"""
+    query = {}
+    for op, value in (('$gte', start_date), ('$lte', end_date)):
+        if value:
+            try:
+                query[op] = parse_day(value)
+            except ValueError:
+                pass
+    return {'day': query} if query else {}
@@ -0,0 +1,165 @@
+"""
+Cache coherence for the Attendance Management System
+Per-worker caches (dashboard ETags, the active lecture cache, export job ids)
+are validated against version counters shared by the worker processes on a
+host. CacheCoherence is the publish/subscribe hub that bumps them: writers
+publish the collection they changed, and subscribers invalidate their caches.
+
+With MongoDB, one process per host also follows a change stream on students,
+attendance and lectures and publishes every change it sees, so writes made by
+other hosts (or directly in the database) invalidate this host's caches
+within milliseconds. Without change streams (standalone servers, the sqlite
+and memory backends) only local publishes are delivered.
+
+Environment:
+    CACHE_COHERENCE       changestream or local (default: changestream for the mongo backend)
+    COHERENCE_LOCK_PATH   lock electing the host's watcher (default: attendance_coherence.lock in the temp dir)
+    COHERENCE_TOKEN_PATH  resume token file (default: attendance_coherence.token in the temp dir)
+"""
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import OperationFailure, PyMongoError
+
+WATCHED_COLLECTIONS = ('students', 'attendance', 'lectures')
+
+# Server error codes: change streams need a replica set; the resume point aged out of the oplog
+CHANGE_STREAMS_UNSUPPORTED = (40573, 40324)
+HISTORY_LOST = 286
+
+
+class CacheCoherence:
+    """Fan out collection changes to the caches that depend on them"""
+
+    def __init__(self, db=None, lock_path: str = 'attendance_coherence.lock',
+                 token_path: str = 'attendance_coherence.token', retry_interval: float = 5.0):
+        self.db = db
+        self.lock_path = lock_path
+        self.token_path = token_path
+        self.retry_interval = retry_interval
+        self.mode = 'changestream' if db is not None else 'local'
+        self.last_event = None
+        self._subscribers: Dict[str, List[Callable[[], None]]] = {}
+        self._lock_file = None
+        self._thread = None
+        self._pid = None
+
+    # Publish / subscribe
+
+    def subscribe(self, collection: str, callback: Callable[[], None]) -> None:
+        """Call ``callback`` whenever ``collection`` changes"""
+        self._subscribers.setdefault(collection, []).append(callback)
+
+    def publish(self, *collections: str) -> None:
+        """Invalidate the caches that depend on ``collections``"""
+        called = set()
+        for collection in collections:
+            for callback in self._subscribers.get(collection, []):
+                # A counter shared by several collections is bumped once
+                if callback not in called:
+                    called.add(callback)
+                    callback()
+
+    # Change stream watcher
+
+    def start(self) -> None:
+        """Start the watcher thread in this process (safe to call repeatedly, and after fork)"""
+        if self.mode != 'changestream':
+            return
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock_file = None
+        self._thread = threading.Thread(target=self._run, name='cache-coherence', daemon=True)
+        self._thread.start()
+
+    def rebind(self, db) -> None:
+        """Follow the change stream through ``db``, e.g. a worker's own client after fork"""
+        if self.db is None:
+            return
+        self.db = db
+        # Threads do not survive fork, so this starts the worker's watcher on the new client
+        self.start()
+
+    def _elected(self) -> bool:
+        """Whether this process holds the host's watcher lock; the OS frees it when the holder exits"""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run(self) -> None:
+        while self.mode == 'changestream':
+            if not self._elected():
+                time.sleep(self.retry_interval)
+                continue
+            try:
+                self.watch()
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    print(f"📢 Change streams unavailable, caches follow local writes only: {e}")
+                    self.mode = 'local'
+                    # Let the other workers find out for themselves
+                    self._lock_file.close()
+                    self._lock_file = None
+                    return
+                if e.code == HISTORY_LOST:
+                    # Changes since the saved token are gone; everything may be stale
+                    self._save_token(None)
+                    self.publish(*WATCHED_COLLECTIONS)
+                    continue
+                print(f"⚠️ Change stream failed, retrying: {e}")
+            except PyMongoError as e:
+                print(f"⚠️ Change stream interrupted, retrying: {e}")
+            time.sleep(self.retry_interval)
+
+    def watch(self) -> None:
+        """Follow the change stream, publishing every change as it arrives"""
+        pipeline = [{'$match': {'ns.coll': {'$in': list(WATCHED_COLLECTIONS)}}}, {'$project': {'ns': 1}}]
+        with self.db.watch(pipeline, resume_after=self._load_token()) as stream:
+            saved = time.monotonic()
+            for change in stream:
+                self.publish(change['ns']['coll'])
+                self.last_event = time.time()
+                # Replaying a few changes after a restart only costs extra invalidations
+                if time.monotonic() - saved >= 1:
+                    self._save_token(stream.resume_token)
+                    saved = time.monotonic()
+
+    def _load_token(self) -> Optional[dict]:
+        try:
+            with open(self.token_path) as fh:
+                return json_util.loads(fh.read())
+        except (OSError, ValueError):
+            return None
+
+    def _save_token(self, token: Optional[dict]) -> None:
+        if token is None:
+            if os.path.exists(self.token_path):
+                os.remove(self.token_path)
+            return
+        tmp = f'{self.token_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as fh:
+            fh.write(json_util.dumps(token))
+        os.replace(tmp, self.token_path)
+
+
+def create_cache_coherence(db=None) -> CacheCoherence:
+    """Build the coherence hub; ``db`` is the MongoDB database when the mongo backend is used"""
+    mode = os.getenv('CACHE_COHERENCE', 'changestream' if db is not None else 'local')
+    return CacheCoherence(
+        db if mode == 'changestream' else None,
+        lock_path=os.getenv('COHERENCE_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'attendance_coherence.lock')),
+        token_path=os.getenv('COHERENCE_TOKEN_PATH', os.path.join(tempfile.gettempdir(), 'attendance_coherence.token')),
+    )
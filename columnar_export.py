@@ -0,0 +1,260 @@
+"""
+Columnar exports for the Attendance Management System
+Streams attendance and students as Parquet or Arrow IPC, one record batch per
+storage batch, so memory stays bounded by the batch size. Column types are kept
+(timestamps, integers, booleans) instead of being flattened to CSV text.
+Requires the optional pyarrow package.
+
+Usage:
+    python columnar_export.py --out exports/columnar [--format parquet|arrow]
+                              [--start 2024-01] [--end 2024-06] [--batch-size 5000]
+                              [--uri mongodb://localhost:27017/attendance_system]
+
+The CLI writes a month-partitioned dataset:
+    attendance/month=2024-05/part-0.parquet
+    students/part-0.parquet
+
+Environment:
+    COLUMNAR_BATCH_SIZE  rows per record batch for the HTTP endpoint (default 5000)
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; the columnar export reports it as unavailable
+    pa = pq = None
+
+DEFAULT_URI = 'mongodb://localhost:27017/attendance_system'
+FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrows', 'application/vnd.apache.arrow.stream'),
+}
+DATASETS = ('attendance', 'students')
+BATCH_SIZE = int(os.getenv('COLUMNAR_BATCH_SIZE', '5000'))
+
+# (field, kind) per dataset; kind selects the Arrow type and value conversion
+COLUMNS = {
+    'attendance': [
+        ('_id', 'string'), ('student_id', 'string'), ('student_object_id', 'string'),
+        ('student_name', 'string'), ('lecture_number', 'int'), ('subject', 'string'),
+        ('section', 'string'), ('faculty_id', 'string'), ('date', 'timestamp'), ('day', 'int'),
+        ('timestamp', 'timestamp'), ('status', 'string'), ('marked_by', 'string'),
+    ],
+    'students': [
+        ('student_id', 'string'), ('name', 'string'), ('class', 'string'), ('email', 'string'),
+        ('phone', 'string'), ('department', 'string'), ('created_at', 'timestamp'), ('is_active', 'bool'),
+    ],
+}
+
+
+class ColumnarUnavailable(RuntimeError):
+    """Raised when pyarrow is not installed"""
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ColumnarUnavailable('pyarrow is not installed (pip install pyarrow)')
+
+
+def _arrow_type(kind: str):
+    return {'string': pa.string(), 'int': pa.int32(), 'timestamp': pa.timestamp('ms'), 'bool': pa.bool_()}[kind]
+
+
+def _convert(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    if kind == 'string':
+        return str(value)
+    if kind == 'int':
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if kind == 'timestamp':
+        return value if isinstance(value, datetime) else None
+    return bool(value)
+
+
+def schema(dataset: str):
+    _require_pyarrow()
+    return pa.schema([(field, _arrow_type(kind)) for field, kind in COLUMNS[dataset]])
+
+
+def to_batch(dataset: str, records: List[Dict[str, Any]]):
+    """One Arrow record batch from storage records"""
+    arrays = [pa.array([_convert(record.get(field), kind) for record in records], type=_arrow_type(kind))
+              for field, kind in COLUMNS[dataset]]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema(dataset))
+
+
+class _Sink:
+    """Write-only file object whose contents are drained after every batch"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _open_writer(sink, dataset: str, fmt: str):
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema(dataset))
+    return pa.ipc.new_stream(sink, schema(dataset))
+
+
+def _batches(repo, dataset: str, start: Optional[datetime], end: Optional[datetime],
+             batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    if dataset == 'attendance':
+        return repo.iter_attendance(start, end, batch_size)
+    return repo.iter_students(batch_size)
+
+
+def stream_dataset(repo, dataset: str, fmt: str = 'parquet', start: Optional[datetime] = None,
+                   end: Optional[datetime] = None, batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """Yield one Parquet file or Arrow IPC stream chunk by chunk, one row group per batch"""
+    _require_pyarrow()
+    sink = _Sink()
+    writer = _open_writer(sink, dataset, fmt)
+    for records in _batches(repo, dataset, start, end, batch_size):
+        writer.write_batch(to_batch(dataset, records))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def month_key(record: Dict[str, Any]) -> str:
+    timestamp = record.get('timestamp')
+    return timestamp.strftime('%Y-%m') if isinstance(timestamp, datetime) else 'unknown'
+
+
+def write_partitioned(repo, out_dir: str, fmt: str = 'parquet', start: Optional[datetime] = None,
+                      end: Optional[datetime] = None, batch_size: int = 5000) -> Dict[str, int]:
+    """Write attendance partitioned by month and students to ``out_dir``; returns rows per file"""
+    _require_pyarrow()
+    extension = FORMATS[fmt][0]
+    written: Dict[str, int] = {}
+    parts: Dict[str, int] = {}
+
+    def open_file(directory: str) -> Tuple[Any, Any, str]:
+        os.makedirs(directory, exist_ok=True)
+        part = parts.get(directory, 0)
+        parts[directory] = part + 1
+        path = os.path.join(directory, f'part-{part}{extension}')
+        fh = open(path, 'wb')
+        return fh, _open_writer(fh, dataset, fmt), path
+
+    # Attendance arrives in timestamp order, so only one month's file is open at a time
+    dataset = 'attendance'
+    current, fh, writer, path = None, None, None, None
+    for records in _batches(repo, dataset, start, end, batch_size):
+        for month, group in _group_consecutive(records, month_key):
+            if month != current:
+                if writer:
+                    writer.close()
+                    fh.close()
+                current = month
+                fh, writer, path = open_file(os.path.join(out_dir, 'attendance', f'month={month}'))
+                written[path] = 0
+            writer.write_batch(to_batch(dataset, group))
+            written[path] += len(group)
+    if writer:
+        writer.close()
+        fh.close()
+
+    dataset = 'students'
+    fh, writer, path = open_file(os.path.join(out_dir, 'students'))
+    written[path] = 0
+    for records in _batches(repo, dataset, None, None, batch_size):
+        writer.write_batch(to_batch(dataset, records))
+        written[path] += len(records)
+    writer.close()
+    fh.close()
+    return written
+
+
+def _group_consecutive(records: Iterable[Dict[str, Any]], key) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    group, group_key = [], None
+    for record in records:
+        record_key = key(record)
+        if group and record_key != group_key:
+            yield group_key, group
+            group = []
+        group_key = record_key
+        group.append(record)
+    if group:
+        yield group_key, group
+
+
+def parse_month(value: str, end: bool = False) -> datetime:
+    """``YYYY-MM`` as the first instant of that month, or of the next month when ``end``"""
+    month = datetime.strptime(value, '%Y-%m')
+    if end:
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return month
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Export attendance and students as Parquet or Arrow')
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='parquet')
+    parser.add_argument('--start', help='first month to export (YYYY-MM)')
+    parser.add_argument('--end', help='last month to export, inclusive (YYYY-MM)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--uri', default=os.getenv('MONGO_URI', DEFAULT_URI), help='MongoDB connection URI')
+    args = parser.parse_args(argv)
+
+    from pymongo import MongoClient
+    from repository import AttendanceRepository
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+    repo = AttendanceRepository(client.get_default_database('attendance_system'))
+    try:
+        written = write_partitioned(
+            repo, args.out, args.format,
+            start=parse_month(args.start) if args.start else None,
+            end=parse_month(args.end, end=True) if args.end else None,
+            batch_size=args.batch_size,
+        )
+    except ColumnarUnavailable as e:
+        print(f"❌ {e}")
+        return 1
+    for path, rows in sorted(written.items()):
+        print(f"✅ {path}: {rows} rows")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Incremental sync for client-side caches in the Attendance Management System
+A page keeps a local copy of the active roster and today's attendance: it
+loads a snapshot once, then polls with the cursor it was given and receives
+only the students and attendance records changed since, a page at a time.
+Changes are read in order of (change time, _id) through an index, so a poll
+with nothing new costs one index probe per collection.
+
+A write that commits late, or comes from a host whose clock lags, can carry
+a change time just behind the newest change already sent. Once a client has
+caught up, its cursor therefore steps back SYNC_OVERLAP_SECONDS and the most
+recent changes are sent again on the next poll. Clients apply changes idempotently: students
+by _id, attendance records by student_object_id, faculty_id, section, lecture_number and day.
+
+Environment:
+    SYNC_OVERLAP_SECONDS  recent changes sent again on each poll (default 5)
+    SYNC_PAGE_SIZE        changes per collection per response (default 1000)
+"""
+import base64
+import binascii
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any
+
+import clock
+
+COLLECTIONS = ('students', 'attendance')
+
+
+def encode_cursor(positions: Dict[str, tuple]) -> str:
+    """Opaque cursor holding each collection's ``(changed_at, id)`` position"""
+    raw = json.dumps({collection: [changed_at.isoformat(), last_id]
+                      for collection, (changed_at, last_id) in positions.items()})
+    return base64.urlsafe_b64encode(raw.encode()).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, tuple]:
+    """Positions from a cursor; raises ValueError for anything not made by encode_cursor"""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return {collection: (datetime.fromisoformat(raw[collection][0]), str(raw[collection][1]))
+                for collection in COLLECTIONS}
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, IndexError, ValueError):
+        raise ValueError('Invalid sync cursor')
+
+
+def _jsonable(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """ObjectIds as strings and datetimes in ISO format, keeping microseconds"""
+    return {key: value.isoformat() if isinstance(value, datetime)
+            else value if value is None or isinstance(value, (str, int, float, bool)) else str(value)
+            for key, value in doc.items()}
+
+
+class ChangeFeed:
+    """Snapshots and incremental changes of students and attendance"""
+
+    def __init__(self, repo, overlap: float = 5, page_size: int = 1000):
+        self.repo = repo
+        self.overlap = timedelta(seconds=overlap)
+        self.page_size = page_size
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Active roster and today's attendance, with the cursor to poll from"""
+        # Changes committing while the snapshot is read come again in the first poll
+        start = (clock.now() - self.overlap, '')
+        today = clock.day_key()
+        attendance = [record for batch in self.repo.iter_attendance(
+                          clock.day_start(today), clock.day_start(clock.add_days(today, 1)))
+                      for record in batch]
+        return {
+            'full': True,
+            'students': [_jsonable(dict(student, is_active=True)) for student in self.repo.list_active_students()],
+            'attendance': [_jsonable(record) for record in attendance],
+            'cursor': encode_cursor({collection: start for collection in COLLECTIONS}),
+            'has_more': False,
+        }
+
+    def changes(self, cursor: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Students and attendance records changed after ``cursor``; poll again at once while ``has_more``"""
+        positions = decode_cursor(cursor)
+        limit = max(1, min(limit or self.page_size, self.page_size))
+        floor = clock.now() - self.overlap
+        result: Dict[str, Any] = {'full': False, 'has_more': False}
+        for collection in COLLECTIONS:
+            changes = self.repo.changed_since(collection, positions[collection], limit)
+            if changes:
+                positions[collection] = (changes[-1][0], str(changes[-1][1]['_id']))
+            if len(changes) == limit:
+                result['has_more'] = True
+            result[collection] = [_jsonable(doc) for _, doc in changes]
+        if not result['has_more']:
+            # Caught up: look at the overlap window again on the next poll. Only
+            # then, so paging through a busy window always reaches the end
+            positions = {collection: (floor, '') if position[0] > floor else position
+                         for collection, position in positions.items()}
+        result['cursor'] = encode_cursor(positions)
+        return result
+
+
+def create_change_feed(repo) -> ChangeFeed:
+    """Build the change feed from environment settings"""
+    return ChangeFeed(repo, overlap=float(os.getenv('SYNC_OVERLAP_SECONDS', '5')),
+                      page_size=int(os.getenv('SYNC_PAGE_SIZE', '1000')))
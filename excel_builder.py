@@ -0,0 +1,260 @@
+"""
+Workbook builder for Excel exports
+Sheets are rendered to worksheet XML in parallel on a process pool and then
+packed into one .xlsx file. Cells use inline strings, so sheets do not share
+state and each one can be rendered on its own. The pandas writers (openpyxl,
+xlsxwriter) remain available as serial backends.
+
+Environment:
+    EXCEL_WRITER   parallel | xlsxwriter | openpyxl (default parallel)
+    EXCEL_WORKERS  processes used by the parallel writer per app process
+                   (default 2, at most 4 and the CPU count)
+"""
+import atexit
+import multiprocessing
+import os
+import re
+import threading
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# (sheet name, column headers, rows)
+Sheet = Tuple[str, Sequence[str], Sequence[Sequence[Any]]]
+
+WRITERS = ('parallel', 'xlsxwriter', 'openpyxl')
+PARALLEL_MIN_ROWS = 20000
+# Every gunicorn worker has its own pool, so keep each one small
+DEFAULT_WORKERS = 2
+MAX_WORKERS = 4
+
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def column_letter(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(ref: str, value: Any, style: int = 0) -> str:
+    style_attr = f' s="{style}"' if style else ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value:  # NaN
+            return ''
+        return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(value, date):
+        value = value.strftime('%Y-%m-%d')
+    text = escape(_INVALID_XML.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def render_sheet(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    """Worksheet XML for a header row (bold) followed by ``rows``"""
+    letters = [column_letter(i) for i in range(len(columns))]
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+             '<sheetData>']
+    parts.append('<row r="1">' + ''.join(_cell(f'{letter}1', name, 1) for letter, name in zip(letters, columns)) + '</row>')
+    for number, row in enumerate(rows, 2):
+        cells = ''.join(_cell(f'{letter}{number}', value) for letter, value in zip(letters, row)
+                        if value is not None and value != '')
+        parts.append(f'<row r="{number}">{cells}</row>')
+    parts.append('</sheetData></worksheet>')
+    return ''.join(parts).encode('utf-8')
+
+
+def records_sheet(name: str, records: Sequence[Dict[str, Any]]) -> Sheet:
+    """Sheet from a list of dicts; columns in first-seen key order, as pandas.DataFrame does"""
+    columns: Dict[str, None] = {}
+    for record in records:
+        for key in record:
+            columns.setdefault(key)
+    return name, list(columns), [[record.get(column) for column in columns] for record in records]
+
+
+def _render(sheet: Sheet) -> tuple:
+    """Render and deflate one sheet; returns (crc32, size, deflated bytes) for the zip entry"""
+    xml = render_sheet(sheet[1], sheet[2])
+    compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+    return zlib.crc32(xml), len(xml), compressor.compress(xml) + compressor.flush()
+
+
+def sheet_names(names: Sequence[str]) -> List[str]:
+    """Valid, unique Excel sheet names (31 characters, no []:*?/\\)"""
+    result, seen = [], set()
+    for name in names:
+        base = _INVALID_SHEET_CHARS.sub('_', str(name)).strip() or 'Sheet'
+        candidate, suffix = base[:31], 2
+        while candidate.lower() in seen:
+            tag = f' ({suffix})'
+            candidate, suffix = base[:31 - len(tag)] + tag, suffix + 1
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+
+
+def _write_zip(fh: BinaryIO, entries: List[Tuple[str, tuple]]) -> None:
+    """Write a zip archive from entries that are already deflated
+
+    The rendering workers do the compression, so assembling the workbook is
+    only a matter of writing headers around their output.
+    """
+    now = datetime.now()
+    dos_time = (now.hour << 11) | (now.minute << 5) | (now.second // 2)
+    dos_date = ((now.year - 1980) << 9) | (now.month << 5) | now.day
+    offset, directory = 0, []
+    for name, (crc, size, data) in entries:
+        encoded = name.encode('utf-8')
+        header = struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, 0x800, 8, dos_time, dos_date,
+                             crc, len(data), size, len(encoded), 0)
+        fh.write(header + encoded)
+        fh.write(data)
+        directory.append(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 20, 20, 0x800, 8, dos_time, dos_date,
+                                     crc, len(data), size, len(encoded), 0, 0, 0, 0, 0, offset) + encoded)
+        offset += len(header) + len(encoded) + len(data)
+    central = b''.join(directory)
+    fh.write(central)
+    fh.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(entries), len(entries), len(central), offset, 0))
+
+
+def _deflate(text: str) -> tuple:
+    data = text.encode('utf-8')
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return zlib.crc32(data), len(data), compressor.compress(data) + compressor.flush()
+
+
+def _package(fh: BinaryIO, names: List[str], parts: List[tuple]) -> None:
+    """Pack rendered sheets and the workbook scaffolding into an .xlsx file"""
+    sheet_overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, len(parts) + 1))
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+        + ''.join(f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                  for i, name in enumerate(names, 1))
+        + '</sheets></workbook>'
+    )
+    workbook_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + ''.join(f'<Relationship Id="rId{i}" '
+                  'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                  f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(parts) + 1))
+        + f'<Relationship Id="rId{len(parts) + 1}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/></Relationships>'
+    )
+    entries = [
+        ('[Content_Types].xml', _deflate(_CONTENT_TYPES.format(sheets=sheet_overrides))),
+        ('_rels/.rels', _deflate(_ROOT_RELS)),
+        ('xl/workbook.xml', _deflate(workbook)),
+        ('xl/_rels/workbook.xml.rels', _deflate(workbook_rels)),
+        ('xl/styles.xml', _deflate(_STYLES)),
+    ]
+    entries.extend((f'xl/worksheets/sheet{i}.xml', part) for i, part in enumerate(parts, 1))
+    _write_zip(fh, entries)
+
+
+def pool_size() -> int:
+    """Worker processes for the parallel writer (EXCEL_WORKERS, capped)"""
+    workers = int(os.getenv('EXCEL_WORKERS', str(DEFAULT_WORKERS)))
+    return max(1, min(workers, MAX_WORKERS, os.cpu_count() or 1))
+
+
+def _shutdown() -> None:
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False)
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    """This process's render pool, started on first use and reused for every export"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or _pool._max_workers != workers:
+            if _pool is not None and _pool_pid == os.getpid():
+                _pool.shutdown(wait=False)
+            else:
+                atexit.register(_shutdown)
+            # spawn: forking a threaded web worker can copy locks held by other threads
+            # (database clients, logging) into the child, where they are never released
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def build_workbook(fh: BinaryIO, sheets: List[Sheet], writer: Optional[str] = None,
+                   workers: Optional[int] = None) -> None:
+    """Write ``sheets`` to ``fh`` as one workbook using the chosen writer backend"""
+    writer = writer or os.getenv('EXCEL_WRITER', 'parallel')
+    if writer not in WRITERS:
+        raise ValueError(f'Unknown Excel writer: {writer}')
+    names = sheet_names([sheet[0] for sheet in sheets])
+
+    if writer != 'parallel':
+        import pandas as pd
+
+        with pd.ExcelWriter(fh, engine=writer) as excel:
+            for name, (_, columns, rows) in zip(names, sheets):
+                pd.DataFrame(list(rows), columns=list(columns)).to_excel(excel, sheet_name=name, index=False)
+        return
+
+    workers = workers or pool_size()
+    # Small workbooks render faster than they could be shipped to the pool
+    total_rows = sum(len(sheet[2]) for sheet in sheets)
+    if workers == 1 or len(sheets) == 1 or total_rows < PARALLEL_MIN_ROWS:
+        parts = [_render(sheet) for sheet in sheets]
+    else:
+        parts = list(_executor(workers).map(_render, sheets))
+    _package(fh, names, parts)
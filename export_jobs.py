@@ -0,0 +1,271 @@
+"""
+Background export jobs for the Attendance Management System
+Exports run on a worker pool and write their artifact to local disk, where the
+status, download and expiry of each job are tracked in a small JSON file that
+every worker process on the host can read. A job's id is derived from the export
+kind, its parameters and the current data version, so identical requests made
+while the data is unchanged share one job and its artifact. Reports built ahead
+of time by the scheduler are stored the same way under an id that leaves out
+the data version. They cover past days only and are served until they expire
+or the attendance of those days changes, so marking today does not retire them.
+
+Environment:
+    EXPORT_DIR            artifact directory (default: exports)
+    EXPORT_WORKERS        concurrent export jobs per process (default 2)
+    EXPORT_TTL            seconds an artifact stays downloadable (default 900)
+    EXPORT_MAX_ARTIFACTS  artifacts kept on disk before the oldest are removed (default 50)
+    EXPORT_JOB_TIMEOUT    seconds after which an unfinished job is started again (default 600)
+    EXPORT_WAIT_SECONDS   how long export routes wait before answering with a status page (default 5)
+    EXPORT_PRECOMPUTE_TTL seconds a precomputed report is served (default 90000, past the next run)
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+import clock
+from exports import EXPORTS, covered_days
+
+_JOB_ID = re.compile(r'^[0-9a-f]{24}$')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ExportJobs:
+    """Submit, run, track and expire export jobs"""
+
+    def __init__(self, repo, version, directory: str = 'exports', workers: int = 2, ttl: float = 900,
+                 max_artifacts: int = 50, job_timeout: float = 600, precompute_ttl: float = 90000):
+        self.repo = repo
+        self.version = version
+        self.directory = directory
+        self.workers = workers
+        self.ttl = ttl
+        self.max_artifacts = max_artifacts
+        self.job_timeout = job_timeout
+        self.precompute_ttl = precompute_ttl
+        self._pool = None
+        self._pool_pid = None
+        self._last_sweep = 0.0
+        # (kind, params) -> (data version, fingerprint); recomputed only after a write
+        self._fingerprints: Dict[str, tuple] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    # Paths and job files
+
+    def _meta_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def artifact_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.bin')
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(job_id)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        path = self._meta_path(job['id'])
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(job, fh)
+        os.replace(tmp, path)
+
+    def _update(self, job_id: str, **changes) -> Dict[str, Any]:
+        with self._locked():
+            job = self._read(job_id) or {'id': job_id}
+            job.update(changes)
+            self._write(job)
+            return job
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # A pool created before fork has no threads in the child
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='export')
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    # Jobs
+
+    def job_id(self, kind: str, **params: str) -> str:
+        """Identical exports of unchanged data map to the same id"""
+        key = f"{kind}:{json.dumps(params, sort_keys=True)}:{self.version.etag(clock.day_key())}"
+        return hashlib.sha1(key.encode()).hexdigest()[:24]
+
+    @staticmethod
+    def precomputed_id(kind: str, **params: str) -> str:
+        """Precomputed reports are keyed by kind and parameters only"""
+        key = f"precomputed:{kind}:{json.dumps(params, sort_keys=True)}"
+        return hashlib.sha1(key.encode()).hexdigest()[:24]
+
+    def fingerprint(self, kind: str, **params: str) -> str:
+        """Changes whenever the data a report reads changes: the attendance of the days it
+        covers, or for reports without fixed days any write at all"""
+        days = covered_days(kind, params)
+        if days is None:
+            return self.version.etag()
+        key = f"{kind}:{json.dumps(params, sort_keys=True)}"
+        etag = self.version.etag()
+        cached = self._fingerprints.get(key)
+        if cached and cached[0] == etag:
+            return cached[1]
+        count, latest = self.repo.attendance_fingerprint(*days)
+        fingerprint = f'{count}:{latest}'
+        if len(self._fingerprints) > 64:
+            self._fingerprints.clear()
+        self._fingerprints[key] = (etag, fingerprint)
+        return fingerprint
+
+    def _reusable(self, job: Optional[Dict[str, Any]]) -> bool:
+        if not job:
+            return False
+        if job['status'] == 'done':
+            return job['expires_at'] > time.time() and os.path.exists(self.artifact_path(job['id']))
+        if job['status'] in ('queued', 'running'):
+            return _pid_alive(job['pid']) and time.time() - job['created_at'] < self.job_timeout
+        return False
+
+    def submit(self, kind: str, **params: str) -> Dict[str, Any]:
+        """Start an export, or return the existing job for the same kind, parameters and data"""
+        if kind not in EXPORTS:
+            raise ValueError(f'Unknown export: {kind}')
+        self.sweep()
+        job_id = self.job_id(kind, **params)
+        with self._locked():
+            job = self._read(job_id)
+            if self._reusable(job):
+                return job
+            job = {
+                'id': job_id,
+                'kind': kind,
+                'params': params,
+                'status': 'queued',
+                'pid': os.getpid(),
+                'created_at': time.time(),
+            }
+            self._write(job)
+        self._executor().submit(self._run, job_id, kind, params)
+        return job
+
+    def precompute(self, kind: str, **params: str) -> Dict[str, Any]:
+        """Build a report now, in the calling thread, replacing any earlier precomputed copy"""
+        if kind not in EXPORTS:
+            raise ValueError(f'Unknown export: {kind}')
+        job_id = self.precomputed_id(kind, **params)
+        # Taken before the build, so a write made while it runs leaves the copy stale
+        self._update(job_id, kind=kind, params=params, status='queued', pid=os.getpid(),
+                     created_at=time.time(), precomputed=True, fingerprint=self.fingerprint(kind, **params))
+        self._run(job_id, kind, params, ttl=self.precompute_ttl)
+        return self._read(job_id)
+
+    def get_precomputed(self, kind: str, **params: str) -> Optional[Dict[str, Any]]:
+        """The precomputed report for these parameters, when one is built, unexpired and its data unchanged"""
+        job = self.get(self.precomputed_id(kind, **params))
+        if job and job['status'] == 'done' and os.path.exists(self.artifact_path(job['id'])) \
+                and job.get('fingerprint') == self.fingerprint(kind, **params):
+            return job
+        return None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current job state, or None for unknown and expired jobs"""
+        if not _JOB_ID.match(job_id):
+            return None
+        job = self._read(job_id)
+        if job and job['status'] == 'done' and job['expires_at'] <= time.time():
+            return None
+        return job
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Poll until the job finishes or ``timeout`` seconds pass"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if not job or job['status'] in ('done', 'failed') or time.monotonic() >= deadline:
+                return job
+            time.sleep(0.1)
+
+    def _run(self, job_id: str, kind: str, params: Optional[Dict[str, str]] = None,
+             ttl: Optional[float] = None) -> None:
+        builder, mimetype = EXPORTS[kind]
+        self._update(job_id, status='running', started_at=time.time())
+        tmp = f'{self.artifact_path(job_id)}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'wb') as fh:
+                filename = builder(self.repo, fh, **(params or {}))
+            os.replace(tmp, self.artifact_path(job_id))
+            finished = time.time()
+            self._update(job_id, status='done', filename=filename, mimetype=mimetype,
+                         size=os.path.getsize(self.artifact_path(job_id)),
+                         finished_at=finished, expires_at=finished + (ttl or self.ttl))
+        except Exception as e:
+            print(f"❌ Export job {job_id} ({kind}) failed: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            failed = time.time()
+            self._update(job_id, status='failed', error=str(e), finished_at=failed, expires_at=failed + self.ttl)
+
+    def sweep(self, interval: float = 30) -> None:
+        """Remove expired artifacts and keep at most ``max_artifacts`` on-demand ones on disk"""
+        now = time.time()
+        if now - self._last_sweep < interval:
+            return
+        self._last_sweep = now
+        with self._locked():
+            finished: List[Dict[str, Any]] = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                job = self._read(name[:-5])
+                if not job:
+                    continue
+                if job['status'] in ('queued', 'running'):
+                    # Left behind by a worker that died mid-export
+                    if now - job['created_at'] > 2 * self.job_timeout:
+                        self._remove(job['id'])
+                elif job['expires_at'] <= now:
+                    self._remove(job['id'])
+                elif job['status'] == 'done' and not job.get('precomputed'):
+                    finished.append(job)
+            finished.sort(key=lambda job: job['finished_at'], reverse=True)
+            for job in finished[self.max_artifacts:]:
+                self._remove(job['id'])
+
+    def _remove(self, job_id: str) -> None:
+        for path in (self.artifact_path(job_id), self._meta_path(job_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def create_export_jobs(repo, version) -> ExportJobs:
+    """Build the job queue from environment settings"""
+    return ExportJobs(
+        repo,
+        version,
+        directory=os.getenv('EXPORT_DIR', 'exports'),
+        workers=int(os.getenv('EXPORT_WORKERS', '2')),
+        ttl=float(os.getenv('EXPORT_TTL', '900')),
+        max_artifacts=int(os.getenv('EXPORT_MAX_ARTIFACTS', '50')),
+        job_timeout=float(os.getenv('EXPORT_JOB_TIMEOUT', '600')),
+        precompute_ttl=float(os.getenv('EXPORT_PRECOMPUTE_TTL', '90000')),
+    )
@@ -0,0 +1,251 @@
+"""
+Export builders for the Attendance Management System
+Each builder reads from a storage backend, writes one file to a binary file
+object and returns the download filename. Optional string parameters narrow
+the report (a day, a month-to-date cut-off) and are part of the job identity. Builders do not touch the request,
+so they can run in background export jobs. Workbooks go through excel_builder
+(EXCEL_WRITER selects the backend).
+"""
+import csv
+import os
+import shutil
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
+
+from excel_builder import build_workbook, records_sheet
+import clock
+from storage import ATTENDED_STATUSES
+from streaming import stream_csv
+
+CSV_MIMETYPE = 'text/csv'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _write_csv(fh: BinaryIO, chunks) -> None:
+    for chunk in chunks:
+        fh.write(chunk.encode('utf-8'))
+
+
+def attendance_csv(repo, fh: BinaryIO) -> str:
+    """All attendance records as CSV"""
+    attendance_data = repo.all_attendance()
+
+    def rows():
+        for record in attendance_data:
+            # Records are normalized, so timestamp is a datetime when known
+            timestamp = record.get('timestamp')
+            yield [
+                record.get('student_id', 'N/A'),
+                record.get('student_name', 'Unknown'),
+                timestamp.strftime('%Y-%m-%d') if timestamp else '',
+                timestamp.strftime('%H:%M:%S') if timestamp else record.get('time', ''),
+                record.get('lecture_number', ''),
+                record.get('subject', ''),
+                record.get('status', 'present')
+            ]
+
+    _write_csv(fh, stream_csv(['Student ID', 'Student Name', 'Date', 'Time', 'Lecture', 'Subject', 'Status'],
+                              rows(), quoting=csv.QUOTE_ALL))
+    return f"attendance_report_{clock.now().strftime('%Y-%m-%d')}.csv"
+
+
+def monthly_report_csv(repo, fh: BinaryIO, end: Optional[str] = None, base: Optional[str] = None,
+                       base_end: Optional[str] = None) -> str:
+    """This month's attendance as CSV
+
+    ``end`` ('YYYY-MM-DD', exclusive) stops the report early, which is how the
+    scheduler precomputes month-to-date. ``base`` is such a precomputed file
+    covering the month up to ``base_end``; its rows are copied and only the
+    records from ``base_end`` on are read.
+    """
+    today = clock.day_key()
+    first_day, end_day = clock.month_days(today)
+    if end:
+        end_day = min(end_day, clock.parse_day(end))
+
+    header = ['Student Name', 'Student ID', 'Date', 'Time', 'Lecture', 'Status']
+    if base and base_end and os.path.exists(base):
+        with open(base, 'rb') as base_fh:
+            shutil.copyfileobj(base_fh, fh)
+        first_day = max(first_day, clock.parse_day(base_end))
+        header = None
+
+    # Get monthly attendance by integer day key
+    attendance_records = repo.attendance_for_days(first_day, end_day)
+    students = repo.students_by_object_ids(
+        record['student_object_id'] for record in attendance_records if record.get('student_object_id'))
+
+    def rows():
+        for record in attendance_records:
+            # Try to get student info from the record first, then from database
+            student_name = record.get('student_name', 'Unknown')
+            student_id = record.get('student_id', 'N/A')
+
+            # If we have object_id, use the fresh student data
+            student = students.get(record.get('student_object_id'))
+            if student:
+                student_name = student.get('name', student_name)
+                student_id = student.get('student_id', student_id)
+
+            timestamp = record.get('timestamp', clock.now())
+            yield [
+                student_name,
+                student_id,
+                timestamp.strftime('%Y-%m-%d') if isinstance(timestamp, datetime) else 'N/A',
+                timestamp.strftime('%H:%M:%S') if isinstance(timestamp, datetime) else 'N/A',
+                record.get('lecture_number', 1),
+                record.get('status', 'present').title()
+            ]
+
+    _write_csv(fh, stream_csv(header, rows()))
+    return f'monthly_report_{clock.day_start(today).strftime("%Y_%m")}.csv'
+
+
+def attendance_excel(repo, fh: BinaryIO) -> str:
+    """All attendance records with a summary sheet"""
+    attendance_records = repo.all_attendance()
+    students = repo.students_by_object_ids(
+        record['student_object_id'] for record in attendance_records if record.get('student_object_id'))
+
+    # Prepare data for Excel
+    data = []
+    for record in attendance_records:
+        # Get student details
+        student = students.get(record.get('student_object_id'))
+
+        data.append({
+            'Date': record['date'].strftime('%Y-%m-%d') if record.get('date') else '',
+            'Time': record.get('timestamp', '').strftime('%H:%M:%S') if record.get('timestamp') else '',
+            'Student ID': student.get('student_id', 'Unknown') if student else 'Unknown',
+            'Student Name': student.get('name', 'Unknown') if student else 'Unknown',
+            'Department': student.get('department', 'N/A') if student else 'N/A',
+            'Lecture Number': record.get('lecture_number', 1),
+            'Status': record.get('status', 'present').title()
+        })
+
+    sheets = [records_sheet('Attendance Records', data)]
+
+    # Add summary sheet
+    sheets.append(('Summary', ['Metric', 'Value'], [
+        ['Total Records', len(data)],
+        ['Unique Students', len(set([d['Student ID'] for d in data]))],
+        ['Date Range', f"{min([d['Date'] for d in data])} to {max([d['Date'] for d in data])}" if data else "No data"]
+    ]))
+
+    # One sheet per lecture, rendered in parallel
+    by_lecture: Dict[Any, list] = {}
+    for row in data:
+        by_lecture.setdefault(row['Lecture Number'], []).append(row)
+    for lecture_number in sorted(by_lecture, key=str):
+        sheets.append(records_sheet(f'Lecture {lecture_number}', by_lecture[lecture_number]))
+
+    build_workbook(fh, sheets)
+    return f'attendance_records_{clock.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+
+
+def students_excel(repo, fh: BinaryIO) -> str:
+    """All students"""
+    students = repo.list_students()
+
+    data = []
+    for student in students:
+        data.append({
+            'Student ID': student.get('student_id', ''),
+            'Name': student.get('name', ''),
+            'Email': student.get('email', ''),
+            'Phone': student.get('phone', ''),
+            'Department': student.get('department', ''),
+            'Class': student.get('class', ''),
+            'Registration Date': student.get('created_at', '').strftime('%Y-%m-%d') if student.get('created_at') else '',
+            'Status': 'Active' if student.get('is_active', True) else 'Inactive'
+        })
+
+    build_workbook(fh, [records_sheet('Students', data)])
+    return f'students_list_{clock.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+
+
+def daily_report_excel(repo, fh: BinaryIO, day: Optional[str] = None) -> str:
+    """Present and absent students for ``day`` ('YYYY-MM-DD', default today) with a summary sheet"""
+    key = clock.parse_day(day) if day else clock.day_key()
+    today = clock.format_day(key)
+
+    attendance_records = repo.attendance_for_days(key, clock.add_days(key, 1))
+    all_students = repo.list_students(active_only=True)
+
+    present_students = []
+    absent_students = []
+
+    # Earliest present or late mark per student ID; absent marks count as absent
+    attended = {}
+    for record in sorted(attendance_records, key=lambda r: r['timestamp']):
+        if record.get('status', 'present') in ATTENDED_STATUSES:
+            attended.setdefault(record.get('student_id'), record)
+
+    for student in all_students:
+        student_data = {
+            'Student ID': student.get('student_id', ''),
+            'Name': student.get('name', ''),
+            'Department': student.get('department', ''),
+            'Class': student.get('class', '')
+        }
+
+        record = attended.get(student.get('student_id'))
+        if record:
+            # Attendance time
+            student_data['Time'] = record['timestamp'].strftime('%H:%M:%S') if record.get('timestamp') else ''
+            student_data['Status'] = record.get('status', 'present').title()
+            present_students.append(student_data)
+        else:
+            student_data['Status'] = 'Absent'
+            absent_students.append(student_data)
+
+    sheets = []
+    # Present students sheet
+    if present_students:
+        sheets.append(records_sheet('Present Students', present_students))
+
+    # Absent students sheet
+    if absent_students:
+        sheets.append(records_sheet('Absent Students', absent_students))
+
+    # Summary sheet
+    sheets.append(('Summary', ['Metric', 'Value'], [
+        ['Date', today],
+        ['Total Students', len(all_students)],
+        ['Present', len(present_students)],
+        ['Absent', len(absent_students)],
+        ['Attendance Rate', f"{(len(present_students)/len(all_students)*100):.1f}%" if all_students else "0%"]
+    ]))
+
+    # One sheet per department, rendered in parallel
+    by_department: Dict[str, list] = {}
+    for row in present_students + absent_students:
+        by_department.setdefault(row['Department'] or 'No Department', []).append(
+            dict(row, Status=row.get('Status', 'Present')))
+    for department in sorted(by_department):
+        sheets.append(records_sheet(department, sorted(by_department[department], key=lambda r: r['Student ID'])))
+
+    build_workbook(fh, sheets)
+    return f'daily_attendance_report_{today}.xlsx'
+
+
+def covered_days(kind: str, params: Dict[str, str]) -> Optional[Tuple[int, int]]:
+    """[first, end) day keys of the attendance a report reads, for reports limited to fixed days"""
+    if kind == 'daily_report_excel' and params.get('day'):
+        key = clock.parse_day(params['day'])
+        return key, clock.add_days(key, 1)
+    if kind == 'monthly_report_csv' and params.get('end'):
+        # As monthly_report_csv: the month so far, up to the (exclusive) cut-off
+        end = clock.parse_day(params['end'])
+        return min(clock.month_days()[0], end), end
+    return None
+
+
+# kind -> (builder, mimetype)
+EXPORTS: Dict[str, Tuple[Callable[..., str], str]] = {
+    'attendance_csv': (attendance_csv, CSV_MIMETYPE),
+    'monthly_report_csv': (monthly_report_csv, CSV_MIMETYPE),
+    'attendance_excel': (attendance_excel, XLSX_MIMETYPE),
+    'students_excel': (students_excel, XLSX_MIMETYPE),
+    'daily_report_excel': (daily_report_excel, XLSX_MIMETYPE),
+}
@@ -0,0 +1,175 @@
+"""
+Face-recognition matching for the Attendance Management System
+Faces are detected and embedded where the classroom photo is taken (any model
+producing fixed-length vectors, e.g. 128-d FaceNet or dlib embeddings); this
+module matches a photo's batch of embeddings against the enrolled students.
+
+Enrolled embeddings are held as one L2-normalized float32 matrix, so cosine
+similarity for a whole batch is a single matrix product per chunk of faces.
+Each face takes the most similar student above the threshold, and a student
+is matched at most once per photo (the more similar face wins). Above
+FACE_ANN_MIN_STUDENTS enrolled students an hnswlib index replaces the exact
+search when hnswlib is installed. The matrix is rebuilt when a student
+changes, tracked by a version counter shared by the worker processes.
+
+Requires numpy (pip install numpy); hnswlib is optional.
+
+Environment:
+    FACE_MATCH_THRESHOLD   minimum cosine similarity for a match (default 0.6)
+    FACE_ANN_MIN_STUDENTS  enrolled students from which hnswlib is used (default 50000)
+    FACE_VERSION_PATH      counter file (default: attendance_faces.bin in the temp dir)
+"""
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Any, Sequence
+
+from versioning import DataVersion
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for face matching
+    np = None
+
+try:
+    import hnswlib
+except ImportError:  # hnswlib is optional; exact search is used without it
+    hnswlib = None
+
+# Faces scored per matrix product; bounds the similarity matrix to CHUNK x students
+CHUNK_SIZE = 256
+
+# Candidates considered per face when resolving two faces matching one student
+CANDIDATES = 3
+
+
+class FaceMatchingUnavailable(RuntimeError):
+    """Raised when numpy is not installed"""
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise FaceMatchingUnavailable('numpy is not installed (pip install numpy)')
+
+
+def _normalized(vectors) -> 'np.ndarray':
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def validate_embedding(embedding: Any, dim: Optional[int] = None) -> List[float]:
+    """A finite numeric vector of ``dim`` values (any length when None); raises ValueError"""
+    _require_numpy()
+    try:
+        vector = np.asarray(embedding, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError('embedding must be a list of numbers')
+    if vector.ndim != 1 or not vector.size or not np.isfinite(vector).all():
+        raise ValueError('embedding must be a non-empty list of finite numbers')
+    if dim is not None and vector.size != dim:
+        raise ValueError(f'embedding must have {dim} values, got {vector.size}')
+    return vector.tolist()
+
+
+class EmbeddingIndex:
+    """Nearest-neighbour search over the enrolled students' embeddings"""
+
+    def __init__(self, students: List[Dict[str, Any]], ann_min_students: int = 50000):
+        _require_numpy()
+        self.students = students
+        self.matrix = _normalized([student['face_embedding'] for student in students]) if students else None
+        self.dim = self.matrix.shape[1] if students else None
+        self._ann = None
+        if hnswlib is not None and len(students) >= ann_min_students:
+            self._ann = hnswlib.Index(space='ip', dim=self.dim)
+            self._ann.init_index(max_elements=len(students), ef_construction=200, M=16)
+            self._ann.add_items(self.matrix, np.arange(len(students)))
+            self._ann.set_ef(64)
+
+    def __len__(self) -> int:
+        return len(self.students)
+
+    def search(self, faces: 'np.ndarray', k: int = CANDIDATES) -> tuple:
+        """Top ``k`` student rows and cosine similarities per face, best first"""
+        k = min(k, len(self.students))
+        if self._ann is not None:
+            rows, distances = self._ann.knn_query(faces, k=k)
+            # Inner-product distance is 1 - similarity
+            return rows.astype(np.int64), 1.0 - distances
+        rows = np.empty((len(faces), k), dtype=np.int64)
+        scores = np.empty((len(faces), k), dtype=np.float32)
+        for start in range(0, len(faces), CHUNK_SIZE):
+            similarity = faces[start:start + CHUNK_SIZE] @ self.matrix.T
+            top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(similarity, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            rows[start:start + CHUNK_SIZE] = np.take_along_axis(top, order, axis=1)
+            scores[start:start + CHUNK_SIZE] = np.take_along_axis(top_scores, order, axis=1)
+        return rows, scores
+
+    def match(self, embeddings: Sequence[Sequence[float]], threshold: float) -> List[Optional[Dict[str, Any]]]:
+        """The matched student (with its ``similarity``) for each face, or None"""
+        matches: List[Optional[Dict[str, Any]]] = [None] * len(embeddings)
+        if not len(embeddings) or not self.students:
+            return matches
+        faces = _normalized(embeddings)
+        if faces.shape[1] != self.dim:
+            raise ValueError(f'embeddings must have {self.dim} values, got {faces.shape[1]}')
+        rows, scores = self.search(faces)
+
+        # Resolve faces from the most confident down; each student is taken once
+        taken = set()
+        for face in np.argsort(-scores[:, 0]):
+            for row, score in zip(rows[face], scores[face]):
+                if score < threshold:
+                    break
+                if row not in taken:
+                    taken.add(row)
+                    student = self.students[row]
+                    matches[face] = {'_id': student['_id'], 'student_id': student['student_id'],
+                                     'name': student.get('name', ''), 'similarity': float(score)}
+                    break
+        return matches
+
+
+class FaceMatcher:
+    """Cached embedding index, rebuilt after any student change"""
+
+    def __init__(self, repo, version: DataVersion, threshold: float = 0.6, ann_min_students: int = 50000):
+        self.repo = repo
+        self.version = version
+        self.threshold = threshold
+        self.ann_min_students = ann_min_students
+        self._index: Optional[EmbeddingIndex] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def index(self) -> EmbeddingIndex:
+        stamp = self.version.read()[:2]
+        if self._index is None or self._stamp != stamp:
+            with self._lock:
+                if self._index is None or self._stamp != stamp:
+                    # Read the version first so a concurrent change leaves the new index already stale
+                    self._index = EmbeddingIndex(self.repo.face_embeddings(), self.ann_min_students)
+                    self._stamp = stamp
+        return self._index
+
+    def match(self, embeddings: Sequence[Sequence[float]],
+              threshold: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+        return self.index().match(embeddings, self.threshold if threshold is None else threshold)
+
+    def invalidate(self) -> None:
+        """Rebuild the index in every worker process on next use"""
+        self.version.bump()
+
+
+face_version = DataVersion(os.getenv(
+    'FACE_VERSION_PATH', os.path.join(tempfile.gettempdir(), 'attendance_faces.bin')))
+
+
+def create_face_matcher(repo) -> FaceMatcher:
+    """Build the face matcher from environment settings"""
+    return FaceMatcher(repo, face_version,
+                       threshold=float(os.getenv('FACE_MATCH_THRESHOLD', '0.6')),
+                       ann_min_students=int(os.getenv('FACE_ANN_MIN_STUDENTS', '50000')))
@@ -0,0 +1,208 @@
+"""
+Index advisor for the Attendance Management System
+Replays the application's query shapes with explain(), reports collection scans
+and poorly selective plans, and can apply the recommended index set.
+
+Usage:
+    python index_advisor.py [--uri mongodb://localhost:27017/attendance_system] [--apply] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple, Any
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import clock
+from repository import index_name, _plan_stages
+from storage import DEFAULT_SECTION, MARK_FIELDS
+
+DEFAULT_URI = 'mongodb://localhost:27017/attendance_system'
+
+# Docs examined per doc returned above which a plan is reported as poorly selective
+SELECTIVITY_THRESHOLD = 10
+
+# Index set required by the repository query shapes
+RECOMMENDED_INDEXES = [
+    {'collection': 'students', 'keys': [('student_id', 1)], 'unique': True},
+    {'collection': 'students', 'keys': [('is_active', 1), ('student_id', 1)]},
+    {'collection': 'faculty', 'keys': [('faculty_id', 1)], 'unique': True},
+    # One active lecture per faculty member and section
+    {'collection': 'lectures', 'keys': [('faculty_id', 1), ('section', 1), ('is_active', 1)],
+     'unique': True, 'partial': {'is_active': True}},
+    # One mark per student and lecture of a class and day; concurrent upserts of a mark cannot both insert
+    {'collection': 'attendance', 'keys': [(field, 1) for field in MARK_FIELDS], 'unique': True},
+    {'collection': 'attendance', 'keys': [('day', 1), ('timestamp', 1)]},
+    {'collection': 'attendance', 'keys': [('timestamp', -1)]},
+    # Change feed for client-side caches
+    {'collection': 'students', 'keys': [('updated_at', 1), ('_id', 1)]},
+    {'collection': 'attendance', 'keys': [('updated_at', 1), ('_id', 1)]},
+]
+
+
+def query_shapes(db) -> List[Dict[str, Any]]:
+    """Build the app's real query shapes, filled in with sample values from the database"""
+    student = db.students.find_one({}, {'student_id': 1}) or {'_id': None, 'student_id': ''}
+    lecture = db.lectures.find_one({}, {'lecture_number': 1, 'faculty_id': 1, 'section': 1}) or {'lecture_number': 1}
+    today = clock.day_key()
+    month_start, month_end = clock.month_days(today)
+    recent = clock.now() - timedelta(minutes=5)
+
+    return [
+        {'name': 'faculty.by_faculty_id', 'collection': 'faculty',
+         'filter': {'faculty_id': 'admin'}},
+        {'name': 'students.by_student_id', 'collection': 'students',
+         'filter': {'student_id': student['student_id']}},
+        {'name': 'students.active', 'collection': 'students',
+         'filter': {'is_active': True}, 'sort': [('student_id', 1)]},
+        {'name': 'lectures.active', 'collection': 'lectures',
+         'filter': {'faculty_id': lecture.get('faculty_id', 'admin'),
+                    'section': lecture.get('section', DEFAULT_SECTION), 'is_active': True}},
+        {'name': 'attendance.duplicate_check', 'collection': 'attendance',
+         'filter': {'student_object_id': str(student['_id']),
+                    'faculty_id': lecture.get('faculty_id', 'admin'),
+                    'section': lecture.get('section', DEFAULT_SECTION),
+                    'lecture_number': lecture['lecture_number'],
+                    'day': today}},
+        {'name': 'attendance.by_day', 'collection': 'attendance',
+         'filter': {'day': {'$gte': today, '$lt': clock.add_days(today, 1)}}},
+        {'name': 'attendance.by_day', 'collection': 'attendance',
+         'filter': {'day': {'$gte': month_start, '$lt': month_end}}, 'sort': [('day', 1), ('timestamp', 1)]},
+        {'name': 'attendance.by_timestamp', 'collection': 'attendance',
+         'filter': {}, 'sort': [('timestamp', -1)], 'limit': 10},
+        {'name': 'students.changed', 'collection': 'students',
+         'filter': {'updated_at': {'$gte': recent}}, 'sort': [('updated_at', 1), ('_id', 1)], 'limit': 1000},
+        {'name': 'attendance.changed', 'collection': 'attendance',
+         'filter': {'updated_at': {'$gte': recent}}, 'sort': [('updated_at', 1), ('_id', 1)], 'limit': 1000},
+    ]
+
+
+def explain_shape(db, shape: Dict[str, Any]) -> Dict[str, Any]:
+    """Run explain() for one query shape and summarize the winning plan"""
+    cursor = db[shape['collection']].find(shape['filter'])
+    if shape.get('sort'):
+        cursor = cursor.sort(shape['sort'])
+    if shape.get('limit'):
+        cursor = cursor.limit(shape['limit'])
+    explain = cursor.explain()
+
+    plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    stats = explain.get('executionStats', {})
+    stages = _plan_stages(plan)
+    returned = stats.get('nReturned', 0)
+    docs_examined = stats.get('totalDocsExamined', 0)
+    selectivity = docs_examined / max(returned, 1)
+
+    return {
+        'name': shape['name'],
+        'collection': shape['collection'],
+        'filter': shape['filter'],
+        'stages': sorted(stages),
+        'collscan': 'COLLSCAN' in stages,
+        'in_memory_sort': 'SORT' in stages,
+        'returned': returned,
+        'keys_examined': stats.get('totalKeysExamined', 0),
+        'docs_examined': docs_examined,
+        'poor_selectivity': selectivity > SELECTIVITY_THRESHOLD,
+    }
+
+
+def missing_indexes(db) -> List[Dict[str, Any]]:
+    """Return the recommended indexes that are not present, matched by key pattern"""
+    missing = []
+    existing: Dict[str, list] = {}
+    for spec in RECOMMENDED_INDEXES:
+        if spec['collection'] not in existing:
+            existing[spec['collection']] = [
+                [(field, int(direction)) for field, direction in info['key']]
+                for info in db[spec['collection']].index_information().values()
+            ]
+        if list(spec['keys']) not in existing[spec['collection']]:
+            missing.append(spec)
+    return missing
+
+
+def apply_indexes(db) -> Tuple[List[str], Dict[str, str]]:
+    """Create any missing recommended indexes; safe to run repeatedly
+
+    Returns the indexes created and, by name, the error for each one that could
+    not be (e.g. a unique index over existing duplicates); the others are still created.
+    """
+    created, failed = [], {}
+    for spec in missing_indexes(db):
+        options = {'name': index_name(spec['keys'])}
+        if spec.get('unique'):
+            options['unique'] = True
+        if spec.get('partial'):
+            options['partialFilterExpression'] = spec['partial']
+        name = f"{spec['collection']}.{options['name']}"
+        try:
+            db[spec['collection']].create_index(spec['keys'], **options)
+        except PyMongoError as e:
+            failed[name] = str(e)
+            continue
+        created.append(name)
+    return created, failed
+
+
+def print_applied(created: List[str], failed: Dict[str, str]) -> None:
+    for name in created:
+        print(f"✅ Created index {name}")
+    for name, error in failed.items():
+        print(f"⚠️ Could not create index {name}: {error}")
+
+
+def advise(db) -> Dict[str, Any]:
+    """Explain every query shape and list the indexes that would fix the problems found"""
+    results = [explain_shape(db, shape) for shape in query_shapes(db)]
+    return {
+        'queries': results,
+        'collscans': [r['name'] for r in results if r['collscan']],
+        'poor_selectivity': [r['name'] for r in results if r['poor_selectivity']],
+        'missing_indexes': [f"{spec['collection']}.{index_name(spec['keys'])}" for spec in missing_indexes(db)],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("\n" + "=" * 60)
+    print("🔎 INDEX ADVISOR REPORT")
+    print("=" * 60)
+    for result in report['queries']:
+        flag = '❌' if result['collscan'] else ('⚠️' if result['poor_selectivity'] else '✅')
+        print(f"{flag} {result['name']:<28} stages={','.join(result['stages'])} "
+              f"docs={result['docs_examined']} keys={result['keys_examined']} returned={result['returned']}")
+    print("-" * 60)
+    if report['missing_indexes']:
+        print("💡 Recommended indexes:")
+        for name in report['missing_indexes']:
+            print(f"   - {name}")
+    else:
+        print("✅ All recommended indexes are present")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Report collection scans and apply recommended indexes')
+    parser.add_argument('--uri', default=os.getenv('MONGO_URI', DEFAULT_URI), help='MongoDB connection URI')
+    parser.add_argument('--apply', action='store_true', help='create missing recommended indexes')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+    db = client.get_default_database('attendance_system')
+
+    if args.apply:
+        print_applied(*apply_indexes(db))
+
+    report = advise(db)
+    if args.json:
+        print(json.dumps(report, default=str, indent=2))
+    else:
+        print_report(report)
+    return 1 if report['collscans'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Request-level performance instrumentation for the Attendance Management System
+Records per-request latency, MongoDB command counts/time (via pymongo command
+monitoring) and bytes returned, exposes per-route histograms at /metrics in the
+Prometheus text format and reports N+1 query patterns.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Any
+
+import bson
+from flask import Response, g, request
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+BYTES_BUCKETS = (1024, 10240, 102400, 1048576, 10485760)
+
+# Connection handshake and authentication; everything else is work done for the request.
+# getMore stays in: fetching later cursor batches is part of a query's cost.
+IGNORED_COMMANDS = {'isMaster', 'ismaster', 'hello', 'saslStart', 'saslContinue', 'authenticate'}
+
+# Per-request command log; None outside of a request
+_current_commands: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar('current_commands', default=None)
+
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> str:
+    """Reduce a command to its shape: name, collection and the filter's field names"""
+    if command_name == 'getMore':
+        return f"getMore:{command.get('collection', '')}"
+    collection = command.get(command_name, '')
+    spec = command.get('filter')
+    if spec is None and command_name == 'aggregate':
+        pipeline = command.get('pipeline') or [{}]
+        spec = pipeline[0].get('$match', {})
+    if spec is None and command_name in ('update', 'delete'):
+        ops = command.get('updates') or command.get('deletes') or [{}]
+        spec = ops[0].get('q', {})
+    fields = ','.join(sorted(spec.keys())) if isinstance(spec, dict) else ''
+    return f'{command_name}:{collection}({fields})'
+
+
+class Histogram:
+    """Cumulative-bucket histogram compatible with the Prometheus exposition format"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = [f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+                 for bound, count in zip(self.buckets, self.counts)]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.total}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.total}')
+        return lines
+
+
+class MetricsRegistry:
+    """Per-route histograms shared by all request threads of a worker"""
+
+    METRICS = {
+        'attendance_request_seconds': ('Request latency in seconds', LATENCY_BUCKETS),
+        'attendance_mongo_commands': ('MongoDB commands issued per request', COUNT_BUCKETS),
+        'attendance_mongo_seconds': ('Time spent in MongoDB commands per request', LATENCY_BUCKETS),
+        'attendance_mongo_bytes': ('Bytes returned by MongoDB per request', BYTES_BUCKETS),
+        'attendance_response_bytes': ('Response body size in bytes', BYTES_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, Histogram] = {}
+        self.n_plus_one: Counter = Counter()
+
+    def observe(self, metric: str, route: str, method: str, value: float) -> None:
+        key = (metric, route, method)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self.METRICS[metric][1])
+            self._histograms[key].observe(value)
+
+    def record_n_plus_one(self, route: str, shape: str) -> None:
+        with self._lock:
+            self.n_plus_one[(route, shape)] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for metric, (help_text, _) in self.METRICS.items():
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (name, route, method), histogram in sorted(self._histograms.items()):
+                    if name == metric:
+                        lines.extend(histogram.render(metric, f'route="{route}",method="{method}"'))
+            lines.append('# HELP attendance_n_plus_one_total Requests that repeated one query shape over the threshold')
+            lines.append('# TYPE attendance_n_plus_one_total counter')
+            for (route, shape), count in sorted(self.n_plus_one.items()):
+                lines.append(f'attendance_n_plus_one_total{{route="{route}",shape="{shape}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class CommandTracker(monitoring.CommandListener):
+    """pymongo command listener that attributes commands to the current request"""
+
+    def __init__(self):
+        self._pending: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        commands = _current_commands.get()
+        if commands is None or event.command_name in IGNORED_COMMANDS:
+            return
+        entry = {
+            'command': event.command_name,
+            'shape': query_shape(event.command_name, event.command),
+            'seconds': 0.0,
+            'bytes': 0,
+        }
+        commands.append(entry)
+        with self._lock:
+            self._pending[event.request_id] = (entry, time.perf_counter())
+
+    def _finish(self, event, reply: Optional[Dict[str, Any]]):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        entry, started = pending
+        entry['seconds'] = time.perf_counter() - started
+        if reply is not None:
+            try:
+                entry['bytes'] = len(bson.encode(reply))
+            except Exception:
+                entry['bytes'] = 0
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event, None)
+
+
+command_tracker = CommandTracker()
+metrics = MetricsRegistry()
+
+
+def current_commands() -> List[Dict[str, Any]]:
+    """Mongo commands issued so far by the current request"""
+    return _current_commands.get() or []
+
+
+def init_instrumentation(app, n_plus_one_threshold: Optional[int] = None) -> None:
+    """Register request hooks and the /metrics endpoint on the Flask app"""
+    threshold = n_plus_one_threshold or int(os.getenv('N_PLUS_ONE_THRESHOLD', '5'))
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics_start = time.perf_counter()
+        g._metrics_token = _current_commands.set([])
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        if route == '/metrics':
+            return response
+        method = request.method
+        commands = current_commands()
+
+        metrics.observe('attendance_request_seconds', route, method, elapsed)
+        metrics.observe('attendance_mongo_commands', route, method, len(commands))
+        metrics.observe('attendance_mongo_seconds', route, method, sum(c['seconds'] for c in commands))
+        metrics.observe('attendance_mongo_bytes', route, method, sum(c['bytes'] for c in commands))
+        if not response.is_streamed:
+            metrics.observe('attendance_response_bytes', route, method, response.calculate_content_length() or 0)
+
+        # Batches of one cursor are not repeated queries
+        for shape, count in Counter(c['shape'] for c in commands if c['command'] != 'getMore').items():
+            if count > threshold:
+                metrics.record_n_plus_one(route, shape)
+                print(f"⚠️ N+1 query pattern on {method} {route}: {shape} issued {count} times")
+
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={sum(c["seconds"] for c in commands) * 1000:.1f};desc="{len(commands)} queries"'
+        )
+        return response
+
+    @app.teardown_request
+    def _reset_request_metrics(exc=None):
+        token = g.pop('_metrics_token', None)
+        if token is not None:
+            try:
+                _current_commands.reset(token)
+            except ValueError:
+                _current_commands.set(None)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,94 @@
+"""
+Lecture sessions for the Attendance Management System
+Every faculty member runs at most one active lecture per section. Marking looks
+the lecture up on every request, so active lectures are cached in process and
+keyed by (faculty_id, section); a lecture version counter shared by the worker
+processes on the host drops cached entries as soon as any worker starts a new
+lecture. Changes made on other hosts arrive through the cache coherence change
+stream (coherence.py); without one, the TTL bounds how long they go unseen.
+
+Environment:
+    LECTURE_CACHE_TTL     seconds active lectures stay cached (default 30)
+    LECTURE_VERSION_PATH  counter file (default: attendance_lectures.bin in the temp dir)
+"""
+import os
+import tempfile
+from typing import Dict, List, Optional, Any
+
+from cache import TTLCache
+from storage import DEFAULT_SECTION
+from versioning import DataVersion
+
+
+def normalize_section(section: Any) -> str:
+    """Section names are compared case-insensitively and default to DEFAULT_SECTION"""
+    section = str(section or '').strip().lower()
+    return section[:64] or DEFAULT_SECTION
+
+
+def section_roster(students: List[Dict[str, Any]], section: str) -> List[Dict[str, Any]]:
+    """Students taught in a section: everyone for the default section, else those whose class matches it"""
+    if section == DEFAULT_SECTION:
+        return students
+    return [student for student in students if normalize_section(student.get('class')) == section]
+
+
+class LectureSessions:
+    """Cached access to the active lecture of each faculty member and section"""
+
+    def __init__(self, repo, version: DataVersion, ttl: float = 30, max_entries: int = 10000):
+        self.repo = repo
+        self.version = version
+        self._cache = TTLCache(ttl=ttl, max_entries=max_entries)
+
+    def _cached(self, key: tuple) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry and entry[0] == self.version.read()[:2]:
+            return dict(entry[1])
+        return None
+
+    def _store(self, key: tuple, stamp: tuple, lecture: Dict[str, Any]) -> Dict[str, Any]:
+        self._cache.set(key, (stamp, dict(lecture)))
+        return lecture
+
+    def current(self, faculty_id: Optional[str], section: str = DEFAULT_SECTION) -> Optional[Dict[str, Any]]:
+        """The active lecture, or None when the faculty member has not started one in the section"""
+        key = (faculty_id, section)
+        lecture = self._cached(key)
+        if lecture is None:
+            # Read the version first so a concurrent change leaves an already stale entry
+            stamp = self.version.read()[:2]
+            lecture = self.repo.get_active_lecture(faculty_id, section)
+            if lecture:
+                self._store(key, stamp, lecture)
+        return lecture
+
+    def active(self, faculty_id: Optional[str], section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        """The active lecture, starting lecture 1 when there is none"""
+        key = (faculty_id, section)
+        lecture = self._cached(key)
+        if lecture is None:
+            stamp = self.version.read()[:2]
+            lecture = self._store(key, stamp, self.repo.get_or_create_active_lecture(faculty_id, section))
+        return lecture
+
+    def start(self, lecture_number: int, faculty_id: Optional[str], section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        """Start a new lecture for the faculty member in the section
+
+        Callers publish 'lectures', which drops the cached lecture in every worker
+        process, this one included.
+        """
+        return self.repo.set_active_lecture(lecture_number, faculty_id, section)
+
+    def invalidate(self) -> None:
+        """Drop cached lectures in every worker process, e.g. after a remote change"""
+        self.version.bump()
+
+
+lecture_version = DataVersion(os.getenv(
+    'LECTURE_VERSION_PATH', os.path.join(tempfile.gettempdir(), 'attendance_lectures.bin')))
+
+
+def create_lecture_sessions(repo) -> LectureSessions:
+    """Build the lecture session cache from environment settings"""
+    return LectureSessions(repo, lecture_version, ttl=float(os.getenv('LECTURE_CACHE_TTL', '30')))
@@ -0,0 +1,588 @@
+"""
+Offline-capable local storage for the Attendance Management System
+SQLiteRepository serves the same named queries as AttendanceRepository from an
+embedded SQLite database, so marking and reads keep working when MongoDB is
+unreachable. LocalSync reconciles the local store with MongoDB in the
+background using change timestamps.
+
+Conflict rules:
+    students, lectures, faculty  last writer wins by ``updated_at``
+    attendance                   when both sides hold a mark for the same student,
+                                 lecture and day, the MongoDB mark is kept and the
+                                 local one dropped; status changes to a mark are
+                                 last writer wins
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any, Iterable, Iterator
+
+from bson import json_util
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from repository import (AttendanceRepository, ATTENDANCE_EXPORT_FIELDS, CHANGE_FEED_FIELDS, STUDENT_EXPORT_FIELDS,
+                        STUDENT_FACE_FIELDS, STUDENT_ROSTER_FIELDS, STUDENT_SUMMARY_FIELDS, duplicate_keys_only)
+import clock
+from storage import DEFAULT_SECTION, StorageBackend, batched, day_key, normalize_attendance
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY, student_id TEXT UNIQUE, is_active INTEGER,
+    updated_at TEXT, synced INTEGER NOT NULL DEFAULT 0, doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS students_active ON students (is_active, student_id);
+CREATE TABLE IF NOT EXISTS attendance (
+    id TEXT PRIMARY KEY, student_id TEXT, student_object_id TEXT, lecture_number INTEGER,
+    day TEXT, timestamp TEXT, updated_at TEXT, synced INTEGER NOT NULL DEFAULT 0, doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attendance_timestamp ON attendance (timestamp);
+CREATE INDEX IF NOT EXISTS attendance_unsynced ON attendance (synced);
+CREATE TABLE IF NOT EXISTS lectures (
+    id TEXT PRIMARY KEY, lecture_number INTEGER, faculty_id TEXT, section TEXT, is_active INTEGER,
+    updated_at TEXT, synced INTEGER NOT NULL DEFAULT 0, doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS faculty (
+    id TEXT PRIMARY KEY, faculty_id TEXT UNIQUE,
+    updated_at TEXT, synced INTEGER NOT NULL DEFAULT 0, doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (collection TEXT PRIMARY KEY, watermark TEXT);
+"""
+
+# Columns added after the first release, with the indexes that need them;
+# applied to existing local databases on open
+MIGRATIONS = [
+    ('lectures', 'faculty_id', 'TEXT'),
+    ('lectures', 'section', 'TEXT'),
+    ('attendance', 'status', 'TEXT'),
+    ('students', 'changed_at', 'TEXT'),
+    ('attendance', 'changed_at', 'TEXT'),
+    ('attendance', 'faculty_id', 'TEXT'),
+    ('attendance', 'section', 'TEXT'),
+]
+INDEXES = """
+DROP INDEX IF EXISTS lectures_active;
+CREATE INDEX IF NOT EXISTS lectures_scope ON lectures (faculty_id, section, is_active);
+CREATE INDEX IF NOT EXISTS attendance_day ON attendance (day, timestamp);
+CREATE INDEX IF NOT EXISTS students_changed ON students (changed_at, id);
+CREATE INDEX IF NOT EXISTS attendance_changed ON attendance (changed_at, id);
+DROP INDEX IF EXISTS attendance_mark;
+CREATE INDEX IF NOT EXISTS attendance_scoped_mark ON attendance (student_object_id, faculty_id, section,
+                                                                 lecture_number, day);
+"""
+
+# The attendance day column held the day's midnight before integer day keys;
+# keys are YYYYMMDD, so the TEXT column still orders and compares them correctly.
+# Run once per database, tracked by PRAGMA user_version
+DAY_KEY_VERSION = 1
+DAY_KEY_MIGRATION = """
+UPDATE attendance SET day = replace(substr(day, 1, 10), '-', '') WHERE day LIKE '____-__-__%';
+PRAGMA user_version = 1;
+"""
+
+# Marks are identified by faculty member and section too (MARK_FIELDS); rows
+# stored before that get the columns from their document
+MARK_SCOPE_VERSION = 2
+MARK_SCOPE_MIGRATION = """
+UPDATE attendance SET faculty_id = json_extract(doc, '$.faculty_id'),
+                      section = coalesce(nullif(json_extract(doc, '$.section'), ''), 'default');
+PRAGMA user_version = 2;
+"""
+
+# Indexed columns stored alongside the JSON document for each table
+COLUMNS = {
+    'students': ('student_id', 'is_active'),
+    'attendance': ('student_id', 'student_object_id', 'faculty_id', 'section', 'lecture_number', 'day', 'timestamp',
+                   'status'),
+    'lectures': ('lecture_number', 'faculty_id', 'section', 'is_active'),
+    'faculty': ('faculty_id',),
+}
+
+# Conditions matching the rest of a mark's fields (see MARK_FIELDS); faculty_id may be NULL
+MARK_SCOPE = 'faculty_id IS ? AND section = ? AND lecture_number = ? AND day = ?'
+
+# Tables in the change feed; ``changed_at`` is when a row last changed in this
+# store, including documents pulled from MongoDB with an older ``updated_at``
+CHANGE_FEED_TABLES = ('students', 'attendance')
+
+# Change timestamp used to pull documents, with fallbacks for older documents
+CHANGE_FIELDS = {
+    'students': ('updated_at', 'created_at'),
+    'attendance': ('updated_at', 'timestamp'),
+    'lectures': ('updated_at', 'date'),
+    'faculty': ('updated_at', 'created_at'),
+}
+
+
+def _ts(value: Optional[datetime]) -> Optional[str]:
+    """Sortable text form of a datetime"""
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f') if isinstance(value, datetime) else None
+
+
+def _project(doc: Dict[str, Any], fields: Dict[str, int]) -> Dict[str, Any]:
+    projected = {key: doc[key] for key, include in fields.items() if include and key in doc}
+    if fields.get('_id', 1):
+        projected['_id'] = doc['_id']
+    return projected
+
+
+def _change_time(collection: str, doc: Dict[str, Any]) -> Optional[datetime]:
+    for field in CHANGE_FIELDS[collection]:
+        if isinstance(doc.get(field), datetime):
+            return doc[field]
+    return None
+
+
+class SQLiteRepository(StorageBackend):
+    """Storage backend on an embedded SQLite database"""
+
+    def __init__(self, path: str = 'attendance_local.db'):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self.conn()
+        conn.executescript(SCHEMA)
+        for table, column, sql_type in MIGRATIONS:
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if column not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {sql_type}')
+        conn.executescript(INDEXES)
+        user_version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if user_version < DAY_KEY_VERSION:
+            conn.executescript(DAY_KEY_MIGRATION)
+        if user_version < MARK_SCOPE_VERSION:
+            conn.executescript(MARK_SCOPE_MIGRATION)
+
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Storage helpers
+
+    @staticmethod
+    def _columns(table: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        values = {}
+        for column in COLUMNS[table]:
+            if column == 'timestamp':
+                values['timestamp'] = _ts(doc.get('timestamp'))
+            elif column == 'is_active':
+                values['is_active'] = 1 if doc.get('is_active', True) else 0
+            else:
+                value = doc.get(column)
+                values[column] = str(value) if isinstance(value, ObjectId) else value
+        return values
+
+    def save(self, table: str, doc: Dict[str, Any], synced: bool = False) -> Any:
+        """Insert or replace a document, stamping ``updated_at`` for local changes"""
+        if '_id' not in doc:
+            doc['_id'] = ObjectId()
+        if not synced:
+            doc['updated_at'] = clock.now()
+        if table == 'attendance':
+            normalize_attendance(doc)
+        values = self._columns(table, doc)
+        values.update({
+            'id': str(doc['_id']),
+            'updated_at': _ts(doc.get('updated_at')),
+            'synced': 1 if synced else 0,
+            'doc': json_util.dumps(doc),
+        })
+        if table in CHANGE_FEED_TABLES:
+            values['changed_at'] = _ts(clock.now())
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        self.conn().execute(f'INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})',
+                            list(values.values()))
+        return doc['_id']
+
+    def _docs(self, sql: str, params: Iterable = ()) -> List[Dict[str, Any]]:
+        return [json_util.loads(row[0]) for row in self.conn().execute(sql, tuple(params))]
+
+    def _one(self, sql: str, params: Iterable = ()) -> Optional[Dict[str, Any]]:
+        docs = self._docs(sql + ' LIMIT 1', params)
+        return docs[0] if docs else None
+
+    def _count(self, sql: str, params: Iterable = ()) -> int:
+        return self.conn().execute(sql, tuple(params)).fetchone()[0]
+
+    # Faculty
+
+    def find_faculty(self, faculty_id: str) -> Optional[Dict[str, Any]]:
+        return self._one('SELECT doc FROM faculty WHERE faculty_id = ?', (faculty_id,))
+
+    def faculty_exists(self, faculty_id: str) -> bool:
+        return self._count('SELECT COUNT(*) FROM faculty WHERE faculty_id = ?', (faculty_id,)) > 0
+
+    def insert_faculty(self, faculty_data: Dict[str, Any]) -> Any:
+        return self.save('faculty', faculty_data)
+
+    def update_faculty_password(self, faculty_id: str, password_hash: str) -> None:
+        faculty = self.find_faculty(faculty_id)
+        if faculty:
+            faculty['password_hash'] = password_hash
+            self.save('faculty', faculty)
+
+    # Students
+
+    def count_active_students(self) -> int:
+        return self._count('SELECT COUNT(*) FROM students WHERE is_active = 1')
+
+    def student_exists(self, student_id: str) -> bool:
+        return self._count('SELECT COUNT(*) FROM students WHERE student_id = ?', (student_id,)) > 0
+
+    def find_student(self, student_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._one('SELECT doc FROM students WHERE student_id = ?', (student_id,))
+        return _project(doc, STUDENT_SUMMARY_FIELDS) if doc else None
+
+    def find_students(self, student_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(student_ids)
+        if not ids:
+            return {}
+        docs = self._docs(f'SELECT doc FROM students WHERE student_id IN ({",".join("?" * len(ids))})', ids)
+        return {doc['student_id']: _project(doc, STUDENT_SUMMARY_FIELDS) for doc in docs}
+
+    def students_by_object_ids(self, object_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids = [str(oid) for oid in set(object_ids)]
+        if not ids:
+            return {}
+        docs = self._docs(f'SELECT doc FROM students WHERE id IN ({",".join("?" * len(ids))})', ids)
+        return {str(doc['_id']): _project(doc, {'student_id': 1, 'name': 1, 'department': 1}) for doc in docs}
+
+    def list_active_students(self) -> List[Dict[str, Any]]:
+        docs = self._docs('SELECT doc FROM students WHERE is_active = 1 ORDER BY student_id')
+        return [_project(doc, STUDENT_ROSTER_FIELDS) for doc in docs]
+
+    def list_students(self, active_only: bool = False) -> List[Dict[str, Any]]:
+        sql = 'SELECT doc FROM students' + (' WHERE is_active = 1' if active_only else '')
+        return [_project(doc, STUDENT_EXPORT_FIELDS) for doc in self._docs(sql)]
+
+    def iter_students(self, batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        rows = self.conn().execute('SELECT doc FROM students ORDER BY student_id')
+        yield from batched((_project(json_util.loads(row[0]), STUDENT_EXPORT_FIELDS) for row in rows), batch_size)
+
+    def insert_student(self, student_data: Dict[str, Any]) -> Any:
+        return self.save('students', student_data)
+
+    def set_face_embedding(self, student_id: str, embedding: List[float]) -> bool:
+        with self._write_lock:
+            student = self._one('SELECT doc FROM students WHERE student_id = ?', (student_id,))
+            if not student:
+                return False
+            student['face_embedding'] = list(embedding)
+            self.save('students', student)
+            return True
+
+    def face_embeddings(self) -> List[Dict[str, Any]]:
+        docs = self._docs('SELECT doc FROM students WHERE is_active = 1')
+        return [_project(doc, STUDENT_FACE_FIELDS) for doc in docs if doc.get('face_embedding')]
+
+    # Lectures
+
+    def get_active_lecture(self, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Optional[Dict[str, Any]]:
+        return self._one('SELECT doc FROM lectures WHERE faculty_id IS ? AND section = ? AND is_active = 1',
+                         (faculty_id, section))
+
+    def get_or_create_active_lecture(self, faculty_id: Optional[str],
+                                     section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        current_lecture = self.get_active_lecture(faculty_id, section)
+        if current_lecture:
+            return current_lecture
+        with self._write_lock:
+            current_lecture = self.get_active_lecture(faculty_id, section)
+            if not current_lecture:
+                current_lecture = self.build_lecture(1, faculty_id, section)
+                self.save('lectures', current_lecture)
+            return current_lecture
+
+    def set_active_lecture(self, lecture_number: int, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        with self._write_lock:
+            for lecture in self._docs('SELECT doc FROM lectures WHERE faculty_id IS ? AND section = ? '
+                                      'AND is_active = 1', (faculty_id, section)):
+                lecture['is_active'] = False
+                self.save('lectures', lecture)
+            lecture = self.build_lecture(lecture_number, faculty_id, section)
+            self.save('lectures', lecture)
+            return lecture
+
+    # Attendance
+
+    def count_attendance_for_days(self, first_day: int, end_day: int,
+                                  statuses: Optional[Iterable[str]] = None) -> int:
+        sql = 'SELECT COUNT(*) FROM attendance WHERE day >= ? AND day < ?'
+        params = [first_day, end_day]
+        if statuses is not None:
+            statuses = list(statuses)
+            condition = f'status IN ({",".join("?" * len(statuses))})'
+            # Rows stored before the status column existed are present marks
+            sql += f' AND ({condition} OR status IS NULL)' if 'present' in statuses else f' AND {condition}'
+            params += statuses
+        return self._count(sql, params)
+
+    def attendance_fingerprint(self, first_day: int, end_day: int) -> tuple:
+        return tuple(self.conn().execute(
+            'SELECT COUNT(*), MAX(updated_at) FROM attendance WHERE day >= ? AND day < ?',
+            (first_day, end_day)).fetchone())
+
+    def attendance_for_days(self, first_day: int, end_day: int) -> List[Dict[str, Any]]:
+        return [normalize_attendance(doc) for doc in self._docs(
+            'SELECT doc FROM attendance WHERE day >= ? AND day < ? ORDER BY day, timestamp', (first_day, end_day))]
+
+    def all_attendance(self, limit: int = 0) -> List[Dict[str, Any]]:
+        sql = 'SELECT doc FROM attendance ORDER BY timestamp DESC'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        return [normalize_attendance(doc) for doc in self._docs(sql)]
+
+    def iter_attendance(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        bounds = [(condition, _ts(value)) for condition, value in (('timestamp >= ?', start), ('timestamp < ?', end))
+                  if value is not None]
+        where = ' WHERE ' + ' AND '.join(condition for condition, _ in bounds) if bounds else ''
+        rows = self.conn().execute(f'SELECT doc FROM attendance{where} ORDER BY timestamp',
+                                   [value for _, value in bounds])
+        yield from batched((_project(normalize_attendance(json_util.loads(row[0])), ATTENDANCE_EXPORT_FIELDS)
+                            for row in rows), batch_size)
+
+    def attendance_exists(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> bool:
+        return self._count(
+            f'SELECT COUNT(*) FROM attendance WHERE student_object_id = ? AND {MARK_SCOPE}',
+            (student_object_id, faculty_id, section, lecture_number, day_key(day))) > 0
+
+    def marked_object_ids(self, object_ids: Iterable[str], faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> set:
+        ids = list(object_ids)
+        if not ids:
+            return set()
+        rows = self.conn().execute(
+            f'SELECT student_object_id FROM attendance WHERE student_object_id IN ({",".join("?" * len(ids))}) '
+            f'AND {MARK_SCOPE}',
+            ids + [faculty_id, section, lecture_number, day_key(day)])
+        return {row[0] for row in rows}
+
+    def insert_attendance(self, record: Dict[str, Any]) -> Any:
+        ids = self.insert_attendance_many([record])
+        return ids[0] if ids else None
+
+    def insert_attendance_many(self, records: List[Dict[str, Any]]) -> List[Any]:
+        """Insert in one transaction, skipping marks that exist; BEGIN IMMEDIATE holds the database's
+        write lock, so no other process can add a mark between the check and the insert"""
+        ids = []
+        with self._write_lock:
+            conn = self.conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for record in records:
+                    # Legacy records without a student reference are kept, as in MongoDB
+                    if record.get('student_object_id') and self._mark(
+                            record['student_object_id'], record.get('faculty_id'),
+                            record.get('section') or DEFAULT_SECTION, record['lecture_number'], record['date']):
+                        continue
+                    ids.append(self.save('attendance', record))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return ids
+
+    def _mark(self, student_object_id: str, faculty_id: Optional[str], section: str, lecture_number: int,
+              day: datetime) -> Optional[Dict[str, Any]]:
+        return self._one(f'SELECT doc FROM attendance WHERE student_object_id = ? AND {MARK_SCOPE}',
+                         (student_object_id, faculty_id, section, lecture_number, day_key(day)))
+
+    def insert_missing_marks(self, records: List[Dict[str, Any]]) -> int:
+        return len(self.insert_attendance_many(records))
+
+    def update_attendance_status(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                                 lecture_number: int, day: datetime, status: str,
+                                 replaces: Optional[Iterable[str]] = None) -> bool:
+        with self._write_lock:
+            record = self._mark(student_object_id, faculty_id, section, lecture_number, day)
+            if not record or record.get('status') == status:
+                return False
+            if replaces is not None and record.get('status') not in replaces:
+                return False
+            record['status'] = status
+            self.save('attendance', record)
+            return True
+
+    # Change feed
+
+    def changed_since(self, collection: str, after: tuple, limit: int = 1000) -> List[tuple]:
+        changed_at, last_id = _ts(after[0]), after[1]
+        rows = self.conn().execute(
+            f'SELECT changed_at, doc FROM {collection} WHERE changed_at >= ? AND (changed_at > ? OR id > ?) '
+            f'ORDER BY changed_at, id LIMIT ?', (changed_at, changed_at, last_id, limit))
+        changes = []
+        for changed, doc in rows:
+            doc = json_util.loads(doc)
+            if collection == 'attendance':
+                normalize_attendance(doc)
+            changes.append((datetime.strptime(changed, '%Y-%m-%d %H:%M:%S.%f'),
+                            _project(doc, CHANGE_FEED_FIELDS[collection])))
+        return changes
+
+    # Sync support
+
+    def unsynced(self, table: str, limit: int = 500) -> List[Dict[str, Any]]:
+        return self._docs(f'SELECT doc FROM {table} WHERE synced = 0 LIMIT ?', (limit,))
+
+    def mark_synced(self, table: str, docs: Iterable[Dict[str, Any]]) -> None:
+        """Flag pushed documents as synced, unless they were changed locally since they were read"""
+        self.conn().executemany(f'UPDATE {table} SET synced = 1 WHERE id = ? AND updated_at IS ?',
+                                [(str(doc['_id']), _ts(doc.get('updated_at'))) for doc in docs])
+
+    def delete(self, table: str, ids: Iterable[Any]) -> None:
+        self.conn().executemany(f'DELETE FROM {table} WHERE id = ?', [(str(i),) for i in ids])
+
+    def local_version(self, table: str, doc_id: Any) -> Optional[tuple]:
+        """(updated_at, synced) of a local document, if present"""
+        return self.conn().execute(f'SELECT updated_at, synced FROM {table} WHERE id = ?', (str(doc_id),)).fetchone()
+
+    def watermark(self, collection: str) -> Optional[datetime]:
+        row = self.conn().execute('SELECT watermark FROM sync_state WHERE collection = ?', (collection,)).fetchone()
+        return datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S.%f') if row and row[0] else None
+
+    def set_watermark(self, collection: str, value: datetime) -> None:
+        self.conn().execute('INSERT OR REPLACE INTO sync_state (collection, watermark) VALUES (?, ?)',
+                            (collection, _ts(value)))
+
+
+class LocalSync:
+    """Background reconciliation between the local SQLite store and MongoDB"""
+
+    def __init__(self, local: SQLiteRepository, remote: AttendanceRepository,
+                 interval: float = 5.0, batch_size: int = 500):
+        self.local = local
+        self.remote = remote
+        self.interval = interval
+        self.batch_size = batch_size
+        self.online = None
+        self.last_sync = None
+        # Called when a pull brought in remote changes
+        self.on_change: Optional[Callable[[], None]] = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the sync thread in this process (safe to call repeatedly, and after fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='local-sync', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.sync_once()
+            time.sleep(self.interval)
+
+    def sync_once(self) -> Dict[str, int]:
+        """Push local changes, then pull remote ones; returns counts per direction"""
+        with self._lock:
+            try:
+                pushed = sum(self.push(table) for table in COLUMNS)
+                pulled = sum(self.pull(table) for table in COLUMNS)
+            except PyMongoError as e:
+                if self.online is not False:
+                    print(f"📴 MongoDB unreachable, serving from local store: {e}")
+                self.online = False
+                return {'pushed': 0, 'pulled': 0}
+            if self.online is False:
+                print("📶 MongoDB reachable again, local store synchronized")
+            self.online = True
+            self.last_sync = clock.now()
+            if pulled and self.on_change:
+                self.on_change()
+            return {'pushed': pushed, 'pulled': pulled}
+
+    def push(self, table: str) -> int:
+        pushed = 0
+        while True:
+            docs = self.local.unsynced(table, self.batch_size)
+            if not docs:
+                return pushed
+            if table == 'attendance':
+                self._push_attendance(docs)
+            else:
+                self._push_documents(table, docs)
+            pushed += len(docs)
+
+    def _push_documents(self, table: str, docs: List[Dict[str, Any]]) -> None:
+        # Replace only when the remote copy is not newer; a newer remote copy makes
+        # the upsert collide on _id, and the pull step then overwrites the local copy
+        requests = [ReplaceOne(
+            {'_id': doc['_id'], '$or': [{'updated_at': {'$lte': doc['updated_at']}},
+                                        {'updated_at': {'$exists': False}}]},
+            doc, upsert=True) for doc in docs]
+        try:
+            self.remote.db[table].bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            if not duplicate_keys_only(e):
+                raise
+        self.local.mark_synced(table, docs)
+
+    def _push_attendance(self, docs: List[Dict[str, Any]]) -> None:
+        # Marks already in MongoDB were pushed by an interrupted earlier run or
+        # had their status changed locally; only the status needs sending
+        pushed = {doc['_id']: doc.get('status') for doc in self.remote.db.attendance.find(
+            {'_id': {'$in': [doc['_id'] for doc in docs]}}, {'_id': 1, 'status': 1})}
+        changed = [UpdateOne({'_id': doc['_id']}, {'$set': {'status': doc['status'], 'updated_at': doc['updated_at']}})
+                   for doc in docs if doc['_id'] in pushed and pushed[doc['_id']] != doc.get('status')]
+        if changed:
+            self.remote.db.attendance.bulk_write(changed, ordered=False)
+        self.local.mark_synced('attendance', [doc for doc in docs if doc['_id'] in pushed])
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            if doc['_id'] in pushed:
+                continue
+            scope = (doc.get('faculty_id'), doc.get('section') or DEFAULT_SECTION, doc['lecture_number'], doc['date'])
+            groups.setdefault(scope, []).append(doc)
+        duplicates, new_docs = [], []
+        for scope, group in groups.items():
+            existing = self.remote.marked_object_ids([doc['student_object_id'] for doc in group], *scope)
+            for doc in group:
+                (duplicates if doc['student_object_id'] in existing else new_docs).append(doc)
+        # Marks that reached MongoDB since the check are skipped by the unique mark index
+        inserted = set(self.remote.insert_attendance_many(new_docs))
+        self.local.mark_synced('attendance', [doc for doc in new_docs if doc['_id'] in inserted])
+        duplicates.extend(doc for doc in new_docs if doc['_id'] not in inserted)
+        # Remote wins for marks made on both sides; the remote copy arrives on pull
+        self.local.delete('attendance', [doc['_id'] for doc in duplicates])
+
+    def pull(self, collection: str) -> int:
+        watermark = self.local.watermark(collection) or datetime.min
+        primary, fallback = CHANGE_FIELDS[collection]
+        # $gte so documents sharing the watermark timestamp are not missed
+        query = {'$or': [{primary: {'$gte': watermark}},
+                         {primary: {'$exists': False}, fallback: {'$gte': watermark}}]}
+        pulled = 0
+        newest = watermark
+        for doc in self.remote.db[collection].find(query).batch_size(self.batch_size):
+            changed = _change_time(collection, doc) or watermark
+            newest = max(newest, changed)
+            local = self.local.local_version(collection, doc['_id'])
+            # Keep unsynced local edits that are newer than the remote copy
+            if local and not local[1] and local[0] and local[0] > (_ts(changed) or ''):
+                continue
+            # Documents at the watermark come back every cycle; skip unchanged ones
+            if local and local[1] and local[0] and local[0] == _ts(changed):
+                continue
+            self.local.save(collection, doc, synced=True)
+            pulled += 1
+        if newest > watermark:
+            self.local.set_watermark(collection, newest)
+        return pulled
+
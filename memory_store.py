@@ -0,0 +1,278 @@
+"""
+In-memory storage backend for the Attendance Management System
+Keeps every collection in process memory with dict indexes for the app's query
+shapes, so the full app can run and be load-tested with no outside service.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Iterator
+
+from bson.objectid import ObjectId
+
+from repository import (CHANGE_FEED_FIELDS, STUDENT_EXPORT_FIELDS, STUDENT_FACE_FIELDS, STUDENT_ROSTER_FIELDS, STUDENT_SUMMARY_FIELDS,
+                        FACULTY_AUTH_FIELDS, ATTENDANCE_FIELDS, ATTENDANCE_EXPORT_FIELDS)
+import clock
+from storage import DEFAULT_SECTION, StorageBackend, day_key, mark_key, normalize_attendance
+
+
+def _project(doc: Dict[str, Any], fields: Dict[str, int]) -> Dict[str, Any]:
+    projected = {key: doc[key] for key, include in fields.items() if include and key in doc}
+    if fields.get('_id', 1):
+        projected['_id'] = doc['_id']
+    return projected
+
+
+class MemoryRepository(StorageBackend):
+    """Storage backend holding all data in dicts guarded by a single lock"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.faculty: Dict[str, Dict[str, Any]] = {}            # faculty_id -> doc
+        self.students: Dict[str, Dict[str, Any]] = {}           # str(_id) -> doc
+        self.students_by_id: Dict[str, str] = {}                # student_id -> str(_id)
+        self._active_roster: Optional[List[str]] = None         # sorted student_ids, rebuilt lazily
+        self.lectures: List[Dict[str, Any]] = []
+        self.active_lectures: Dict[tuple, Dict[str, Any]] = {}  # (faculty_id, section) -> doc
+        self.attendance: Dict[str, Dict[str, Any]] = {}         # str(_id) -> doc
+        self._timeline: List[tuple] = []                        # sorted (day, timestamp, str(_id))
+        self._marks: Dict[tuple, str] = {}                      # mark_key -> str(_id)
+        self._changes: Dict[str, List[tuple]] = {               # collection -> sorted (updated_at, str(_id))
+            'students': [], 'attendance': []}
+
+    # Faculty
+
+    def find_faculty(self, faculty_id: str) -> Optional[Dict[str, Any]]:
+        doc = self.faculty.get(faculty_id)
+        return _project(doc, FACULTY_AUTH_FIELDS) if doc else None
+
+    def faculty_exists(self, faculty_id: str) -> bool:
+        return faculty_id in self.faculty
+
+    def insert_faculty(self, faculty_data: Dict[str, Any]) -> Any:
+        with self._lock:
+            faculty_data.setdefault('_id', ObjectId())
+            faculty_data.setdefault('updated_at', clock.now())
+            self.faculty[faculty_data['faculty_id']] = dict(faculty_data)
+            return faculty_data['_id']
+
+    def update_faculty_password(self, faculty_id: str, password_hash: str) -> None:
+        with self._lock:
+            faculty = self.faculty.get(faculty_id)
+            if faculty:
+                faculty['password_hash'] = password_hash
+                faculty['updated_at'] = clock.now()
+
+    # Students
+
+    def count_active_students(self) -> int:
+        return len(self._roster())
+
+    def student_exists(self, student_id: str) -> bool:
+        return student_id in self.students_by_id
+
+    def find_student(self, student_id: str) -> Optional[Dict[str, Any]]:
+        oid = self.students_by_id.get(student_id)
+        return _project(self.students[oid], STUDENT_SUMMARY_FIELDS) if oid else None
+
+    def find_students(self, student_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for student_id in student_ids:
+            oid = self.students_by_id.get(student_id)
+            if oid:
+                found[student_id] = _project(self.students[oid], STUDENT_SUMMARY_FIELDS)
+        return found
+
+    def students_by_object_ids(self, object_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        fields = {'student_id': 1, 'name': 1, 'department': 1}
+        return {oid: _project(self.students[oid], fields) for oid in set(map(str, object_ids))
+                if oid in self.students}
+
+    def _roster(self) -> List[str]:
+        roster = self._active_roster
+        if roster is None:
+            with self._lock:
+                roster = sorted(student['student_id'] for student in self.students.values()
+                                if student.get('is_active', True))
+                self._active_roster = roster
+        return roster
+
+    def list_active_students(self) -> List[Dict[str, Any]]:
+        return [_project(self.students[self.students_by_id[student_id]], STUDENT_ROSTER_FIELDS)
+                for student_id in self._roster()]
+
+    def list_students(self, active_only: bool = False) -> List[Dict[str, Any]]:
+        return [_project(student, STUDENT_EXPORT_FIELDS) for student in list(self.students.values())
+                if not active_only or student.get('is_active', True)]
+
+    def iter_students(self, batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        student_ids = sorted(self.students_by_id)
+        for i in range(0, len(student_ids), batch_size):
+            yield [_project(self.students[self.students_by_id[student_id]], STUDENT_EXPORT_FIELDS)
+                   for student_id in student_ids[i:i + batch_size]]
+
+    def insert_student(self, student_data: Dict[str, Any]) -> Any:
+        with self._lock:
+            if student_data['student_id'] in self.students_by_id:
+                raise ValueError(f"Duplicate student_id {student_data['student_id']}")
+            student_data.setdefault('_id', ObjectId())
+            student_data.setdefault('updated_at', clock.now())
+            oid = str(student_data['_id'])
+            self.students[oid] = dict(student_data)
+            self.students_by_id[student_data['student_id']] = oid
+            self._active_roster = None
+            self._changed('students', oid, None, student_data['updated_at'])
+            return student_data['_id']
+
+    def set_face_embedding(self, student_id: str, embedding: List[float]) -> bool:
+        with self._lock:
+            oid = self.students_by_id.get(student_id)
+            if not oid:
+                return False
+            student = self.students[oid]
+            student['face_embedding'] = list(embedding)
+            previous, student['updated_at'] = student.get('updated_at'), clock.now()
+            self._changed('students', oid, previous, student['updated_at'])
+            return True
+
+    def face_embeddings(self) -> List[Dict[str, Any]]:
+        return [_project(student, STUDENT_FACE_FIELDS) for student in list(self.students.values())
+                if student.get('is_active', True) and student.get('face_embedding')]
+
+    # Lectures
+
+    def get_active_lecture(self, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Optional[Dict[str, Any]]:
+        lecture = self.active_lectures.get((faculty_id, section))
+        return dict(lecture) if lecture else None
+
+    def get_or_create_active_lecture(self, faculty_id: Optional[str],
+                                     section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        lecture = self.active_lectures.get((faculty_id, section))
+        if lecture:
+            return dict(lecture)
+        with self._lock:
+            if (faculty_id, section) not in self.active_lectures:
+                self._add_lecture(self.build_lecture(1, faculty_id, section))
+            return dict(self.active_lectures[(faculty_id, section)])
+
+    def set_active_lecture(self, lecture_number: int, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._add_lecture(self.build_lecture(lecture_number, faculty_id, section)))
+
+    def _add_lecture(self, lecture: Dict[str, Any]) -> Dict[str, Any]:
+        key = (lecture['faculty_id'], lecture['section'])
+        previous = self.active_lectures.get(key)
+        if previous:
+            previous['is_active'] = False
+            previous['updated_at'] = lecture['updated_at']
+        lecture.setdefault('_id', ObjectId())
+        self.lectures.append(lecture)
+        self.active_lectures[key] = lecture
+        return lecture
+
+    # Attendance
+
+    def _range(self, start: tuple, end: tuple) -> List[str]:
+        timeline = self._timeline
+        lo = bisect_left(timeline, start)
+        hi = bisect_left(timeline, end)
+        return [oid for _, _, oid in timeline[lo:hi]]
+
+    def _record(self, oid: str) -> Dict[str, Any]:
+        return _project(self.attendance[oid], ATTENDANCE_FIELDS)
+
+    def count_attendance_for_days(self, first_day: int, end_day: int,
+                                  statuses: Optional[Iterable[str]] = None) -> int:
+        if statuses is not None:
+            statuses = set(statuses)
+            return sum(1 for oid in self._range((first_day,), (end_day,))
+                       if self.attendance[oid].get('status') in statuses)
+        timeline = self._timeline
+        return bisect_left(timeline, (end_day,)) - bisect_left(timeline, (first_day,))
+
+    def attendance_fingerprint(self, first_day: int, end_day: int) -> tuple:
+        oids = self._range((first_day,), (end_day,))
+        stamps = [self.attendance[oid]['updated_at'] for oid in oids if self.attendance[oid].get('updated_at')]
+        return len(oids), max(stamps, default=None)
+
+    def attendance_for_days(self, first_day: int, end_day: int) -> List[Dict[str, Any]]:
+        return [self._record(oid) for oid in self._range((first_day,), (end_day,))]
+
+    def all_attendance(self, limit: int = 0) -> List[Dict[str, Any]]:
+        entries = self._timeline[-limit:] if limit else self._timeline
+        return [self._record(oid) for _, _, oid in reversed(entries)]
+
+    def iter_attendance(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        # Day keys rise with timestamps, so (day, timestamp) bounds select the time range
+        oids = self._range((day_key(start), start) if start else (0,),
+                           (day_key(end), end) if end else (float('inf'),))
+        for i in range(0, len(oids), batch_size):
+            yield [_project(self.attendance[oid], ATTENDANCE_EXPORT_FIELDS) for oid in oids[i:i + batch_size]]
+
+    def attendance_exists(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> bool:
+        return (student_object_id, faculty_id, section, lecture_number, day_key(day)) in self._marks
+
+    def marked_object_ids(self, object_ids: Iterable[str], faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> set:
+        key = day_key(day)
+        return {oid for oid in object_ids if (oid, faculty_id, section, lecture_number, key) in self._marks}
+
+    def insert_attendance(self, record: Dict[str, Any]) -> Any:
+        with self._lock:
+            record.setdefault('_id', ObjectId())
+            doc = normalize_attendance(dict(record))
+            # Same rule as the unique mark index; legacy records without a student reference are kept
+            if doc.get('student_object_id') and mark_key(doc) in self._marks:
+                return None
+            oid = str(doc['_id'])
+            self.attendance[oid] = doc
+            insort(self._timeline, (doc['day'] or 0, doc['timestamp'] or datetime.min, oid))
+            self._marks.setdefault(mark_key(doc), oid)
+            self._changed('attendance', oid, None, doc.get('updated_at'))
+            return record['_id']
+
+    def insert_attendance_many(self, records: List[Dict[str, Any]]) -> List[Any]:
+        with self._lock:
+            ids = [self.insert_attendance(record) for record in records]
+        return [record_id for record_id in ids if record_id is not None]
+
+    def insert_missing_marks(self, records: List[Dict[str, Any]]) -> int:
+        return len(self.insert_attendance_many(records))
+
+    def update_attendance_status(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                                 lecture_number: int, day: datetime, status: str,
+                                 replaces: Optional[Iterable[str]] = None) -> bool:
+        with self._lock:
+            oid = self._marks.get((student_object_id, faculty_id, section, lecture_number, day_key(day)))
+            record = self.attendance.get(oid) if oid else None
+            if not record or record.get('status') == status:
+                return False
+            if replaces is not None and record.get('status') not in replaces:
+                return False
+            record['status'] = status
+            previous, record['updated_at'] = record.get('updated_at'), clock.now()
+            self._changed('attendance', oid, previous, record['updated_at'])
+            return True
+
+    # Change feed
+
+    def _changed(self, collection: str, oid: str, previous: Optional[datetime], updated_at: Any) -> None:
+        """Move a document to its new place in the change order (call with the lock held)"""
+        changes = self._changes[collection]
+        if isinstance(previous, datetime):
+            i = bisect_left(changes, (previous, oid))
+            if i < len(changes) and changes[i] == (previous, oid):
+                del changes[i]
+        if isinstance(updated_at, datetime):
+            insort(changes, (updated_at, oid))
+
+    def changed_since(self, collection: str, after: tuple, limit: int = 1000) -> List[tuple]:
+        docs = self.students if collection == 'students' else self.attendance
+        changes = self._changes[collection]
+        start = bisect_right(changes, after)
+        return [(changed_at, _project(docs[oid], CHANGE_FEED_FIELDS[collection]))
+                for changed_at, oid in changes[start:start + limit]]
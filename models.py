@@ -4,6 +4,8 @@ Database models for the Attendance Management System
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+import clock
+
 class User:
     """User model for authentication and authorization"""
     
@@ -14,7 +16,7 @@ class User:
         self.role = role
         self.full_name = full_name
         self.email = email
-        self.created_at = datetime.utcnow()
+        self.created_at = clock.now()
         self.last_login = None
     
     def to_dict(self) -> Dict[str, Any]:
@@ -39,7 +41,7 @@ class User:
             full_name=data.get('full_name', ''),
             email=data.get('email', '')
         )
-        user.created_at = data.get('created_at', datetime.utcnow())
+        user.created_at = data.get('created_at', clock.now())
         user.last_login = data.get('last_login')
         return user
 
@@ -54,8 +56,8 @@ class Student:
         self.phone = phone
         self.department = department
         self.year = year
-        self.created_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+        self.created_at = clock.now()
+        self.updated_at = clock.now()
         self.is_active = True
     
     def to_dict(self) -> Dict[str, Any]:
@@ -83,8 +85,8 @@ class Student:
             department=data.get('department', ''),
             year=data.get('year', '')
         )
-        student.created_at = data.get('created_at', datetime.utcnow())
-        student.updated_at = data.get('updated_at', datetime.utcnow())
+        student.created_at = data.get('created_at', clock.now())
+        student.updated_at = data.get('updated_at', clock.now())
         student.is_active = data.get('is_active', True)
         return student
     
@@ -93,7 +95,7 @@ class Student:
         for key, value in kwargs.items():
             if hasattr(self, key):
                 setattr(self, key, value)
-        self.updated_at = datetime.utcnow()
+        self.updated_at = clock.now()
 
 class AttendanceRecord:
     """Attendance record model"""
@@ -102,12 +104,12 @@ class AttendanceRecord:
                  status: str = 'present', marked_by: str = '', 
                  notes: str = '', method: str = 'manual'):
         self.student_id = student_id
-        self.date = date or datetime.utcnow()
+        self.date = date or clock.now()
         self.status = status  # 'present', 'absent', 'late'
         self.marked_by = marked_by
         self.notes = notes
         self.method = method  # 'manual', 'face_recognition', 'auto'
-        self.timestamp = datetime.utcnow()
+        self.timestamp = clock.now()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert attendance record to dictionary for MongoDB storage"""
@@ -126,13 +128,13 @@ class AttendanceRecord:
         """Create AttendanceRecord object from MongoDB document"""
         record = cls(
             student_id=data['student_id'],
-            date=data.get('date', datetime.utcnow()),
+            date=data.get('date', clock.now()),
             status=data.get('status', 'present'),
             marked_by=data.get('marked_by', ''),
             notes=data.get('notes', ''),
             method=data.get('method', 'manual')
         )
-        record.timestamp = data.get('timestamp', datetime.utcnow())
+        record.timestamp = data.get('timestamp', clock.now())
         return record
 
 class AttendanceSession:
@@ -141,10 +143,10 @@ class AttendanceSession:
     def __init__(self, session_name: str, date: datetime = None, 
                  created_by: str = '', description: str = ''):
         self.session_name = session_name
-        self.date = date or datetime.utcnow()
+        self.date = date or clock.now()
         self.created_by = created_by
         self.description = description
-        self.created_at = datetime.utcnow()
+        self.created_at = clock.now()
         self.is_active = True
         self.total_students = 0
         self.present_count = 0
@@ -169,11 +171,11 @@ class AttendanceSession:
         """Create AttendanceSession object from MongoDB document"""
         session = cls(
             session_name=data['session_name'],
-            date=data.get('date', datetime.utcnow()),
+            date=data.get('date', clock.now()),
             created_by=data.get('created_by', ''),
             description=data.get('description', '')
         )
-        session.created_at = data.get('created_at', datetime.utcnow())
+        session.created_at = data.get('created_at', clock.now())
         session.is_active = data.get('is_active', True)
         session.total_students = data.get('total_students', 0)
         session.present_count = data.get('present_count', 0)
@@ -213,28 +215,8 @@ def format_date_only(date: datetime) -> str:
     return date.strftime('%Y-%m-%d')
 
 def get_date_range_query(start_date: str, end_date: str) -> Dict[str, Any]:
-    """Generate MongoDB query for date range"""
-    query = {}
-    if start_date:
-        try:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            query['$gte'] = start_dt
-        except ValueError:
-            pass
-    
-    if end_date:
-        try:
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            # Add 23:59:59 to include the entire end date
-            end_dt = end_dt.replace(hour=23, minute=59, second=59)
-            if '$gte' in query:
-                query = {'$gte': query['$gte'], '$lte': end_dt}
-            else:
-                query['$lte'] = end_dt
-        except ValueError:
-            pass
-    
-    return {'date': query} if query else {}
+    """Generate MongoDB query for an inclusive date range on the integer day key"""
+    return clock.day_range_query(start_date, end_date)
 
 # Database collection names
 COLLECTIONS = {
@@ -260,5 +242,6 @@ USER_ROLES = {
 ATTENDANCE_METHODS = {
     'MANUAL': 'manual',
     'FACE_RECOGNITION': 'face_recognition',
+    'SELF_CHECKIN': 'self_checkin',
     'AUTO': 'auto'
 }
@@ -0,0 +1,30 @@
+"""
+MongoDB client settings for the Attendance Management System
+Pool sizes, timeouts and read preference are read from environment variables so
+they can be tuned per deployment without code changes.
+"""
+import os
+from typing import Dict, Any
+
+# Environment variable -> (MongoClient option, type, default)
+CLIENT_OPTIONS = {
+    'MONGO_MAX_POOL_SIZE': ('maxPoolSize', int, 50),
+    'MONGO_MIN_POOL_SIZE': ('minPoolSize', int, 5),
+    'MONGO_MAX_IDLE_TIME_MS': ('maxIdleTimeMS', int, 300000),
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': ('waitQueueTimeoutMS', int, 2000),
+    'MONGO_CONNECT_TIMEOUT_MS': ('connectTimeoutMS', int, 5000),
+    'MONGO_SOCKET_TIMEOUT_MS': ('socketTimeoutMS', int, 20000),
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': ('serverSelectionTimeoutMS', int, 5000),
+    'MONGO_MAX_CONNECTING': ('maxConnecting', int, 4),
+    'MONGO_READ_PREFERENCE': ('readPreference', str, 'primaryPreferred'),
+    'MONGO_APP_NAME': ('appname', str, 'attendance-system'),
+}
+
+
+def mongo_client_options() -> Dict[str, Any]:
+    """MongoClient keyword arguments built from the environment"""
+    options = {}
+    for env_name, (option, cast, default) in CLIENT_OPTIONS.items():
+        value = os.getenv(env_name)
+        options[option] = cast(value) if value not in (None, '') else default
+    return options
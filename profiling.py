@@ -0,0 +1,271 @@
+"""
+Opt-in profiling hooks for slow requests
+Requests slower than a latency threshold, or picked by a sampling rate, are
+profiled (cProfile or a low-overhead stack sampler) together with the MongoDB
+commands they issued. Results go to a bounded on-disk ring buffer that admins
+can browse and download. Nothing is registered unless PROFILING_ENABLED=1.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from flask import abort, g, jsonify, request, send_file, session
+
+from instrumentation import current_commands
+
+
+class ProfilingConfig:
+    """Profiling settings, read from environment variables by default"""
+
+    def __init__(self, enabled: bool = False, threshold_ms: float = 1000.0, sample_rate: float = 0.0,
+                 mode: str = 'sampling', directory: str = 'profiles', max_entries: int = 50,
+                 interval_ms: float = 5.0, admins: Optional[List[str]] = None):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.directory = directory
+        self.max_entries = max_entries
+        self.interval_ms = interval_ms
+        self.admins = admins or ['admin']
+
+    @classmethod
+    def from_env(cls) -> 'ProfilingConfig':
+        return cls(
+            enabled=os.getenv('PROFILING_ENABLED', '0') == '1',
+            threshold_ms=float(os.getenv('PROFILE_THRESHOLD_MS', '1000')),
+            sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+            mode=os.getenv('PROFILE_MODE', 'sampling'),
+            directory=os.getenv('PROFILE_DIR', 'profiles'),
+            max_entries=int(os.getenv('PROFILE_MAX_ENTRIES', '50')),
+            interval_ms=float(os.getenv('PROFILE_INTERVAL_MS', '5')),
+            admins=[a.strip() for a in os.getenv('PROFILE_ADMINS', 'admin').split(',') if a.strip()]
+        )
+
+
+class StackSampler:
+    """Single background thread sampling the stacks of registered request threads"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._samples: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._samples:
+                    continue
+                frames = sys._current_frames()
+                for ident, counter in self._samples.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        counter[_fold_stack(frame)] += 1
+
+    def start(self, ident: int) -> None:
+        with self._lock:
+            self._samples[ident] = Counter()
+        self._ensure_running()
+
+    def stop(self, ident: int) -> Counter:
+        with self._lock:
+            return self._samples.pop(ident, Counter())
+
+
+def _fold_stack(frame) -> str:
+    """Render a stack in the folded format used by flamegraph tools"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+class ProfileStore:
+    """Bounded ring buffer of profile captures on local disk"""
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        if not profile_id.isdigit():
+            raise ValueError('invalid profile id')
+        return os.path.join(self.directory, f'{profile_id}{suffix}')
+
+    def save(self, entry: Dict[str, Any], raw_profile: Optional[cProfile.Profile] = None) -> str:
+        profile_id = str(time.time_ns())
+        entry['id'] = profile_id
+        with self._lock:
+            if raw_profile is not None:
+                raw_profile.dump_stats(self._path(profile_id, '.prof'))
+                entry['has_raw'] = True
+            with open(self._path(profile_id, '.json'), 'w') as fh:
+                json.dump(entry, fh, default=str)
+            self._evict()
+        return profile_id
+
+    def _evict(self) -> None:
+        ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.json'))
+        for old_id in ids[:max(0, len(ids) - self.max_entries)]:
+            for suffix in ('.json', '.prof'):
+                try:
+                    os.remove(self._path(old_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        entries = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as fh:
+                    entry = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            entries.append({key: entry.get(key) for key in
+                            ('id', 'route', 'method', 'path', 'elapsed_ms', 'captured_at', 'mode', 'reason')}
+                           | {'mongo_commands': len(entry.get('commands', []))})
+        return entries
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(profile_id, '.json')) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def file(self, profile_id: str) -> Optional[str]:
+        for suffix in ('.prof', '.json'):
+            try:
+                path = self._path(profile_id, suffix)
+            except ValueError:
+                return None
+            if os.path.exists(path):
+                return path
+        return None
+
+
+def init_profiling(app, login_required, config: Optional[ProfilingConfig] = None) -> Optional[ProfileStore]:
+    """Register profiling hooks and admin endpoints when profiling is enabled"""
+    config = config or ProfilingConfig.from_env()
+    if not config.enabled:
+        return None
+
+    store = ProfileStore(config.directory, config.max_entries)
+    sampler = StackSampler(config.interval_ms / 1000.0)
+
+    @app.before_request
+    def _start_profile():
+        sampled = config.sample_rate > 0 and random.random() < config.sample_rate
+        g._profile_start = time.perf_counter()
+        g._profile_sampled = sampled
+        if sampled and config.mode == 'cprofile':
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+        else:
+            g._profile_thread = threading.get_ident()
+            sampler.start(g._profile_thread)
+
+    @app.after_request
+    def _finish_profile(response):
+        start = g.pop('_profile_start', None)
+        if start is None:
+            return response
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        profiler = g.pop('_profiler', None)
+        ident = g.pop('_profile_thread', None)
+        if profiler is not None:
+            profiler.disable()
+        stacks = sampler.stop(ident) if ident is not None else Counter()
+
+        slow = elapsed_ms >= config.threshold_ms
+        if not (slow or g.pop('_profile_sampled', False)):
+            return response
+
+        entry = {
+            'route': request.url_rule.rule if request.url_rule else 'unmatched',
+            'method': request.method,
+            'path': request.full_path,
+            'status': response.status_code,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'captured_at': datetime.now().isoformat(),
+            'reason': 'slow' if slow else 'sampled',
+            'commands': current_commands(),
+        }
+        if profiler is not None:
+            entry['mode'] = 'cprofile'
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(40)
+            entry['stats'] = output.getvalue()
+        else:
+            entry['mode'] = 'sampling'
+            entry['interval_ms'] = config.interval_ms
+            entry['stacks'] = dict(stacks.most_common(200))
+        try:
+            store.save(entry, profiler)
+        except OSError as e:
+            print(f"⚠️ Could not store profile: {e}")
+        return response
+
+    @app.teardown_request
+    def _cleanup_profile(exc=None):
+        # after_request is skipped when a view raises
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+        ident = g.pop('_profile_thread', None)
+        if ident is not None:
+            sampler.stop(ident)
+
+    def admin_only():
+        if session.get('faculty_id') not in config.admins:
+            abort(403)
+
+    @app.route('/admin/profiles')
+    @login_required
+    def list_profiles():
+        admin_only()
+        return jsonify({'profiles': store.list()})
+
+    @app.route('/admin/profiles/<profile_id>')
+    @login_required
+    def view_profile(profile_id):
+        admin_only()
+        entry = store.get(profile_id)
+        if entry is None:
+            abort(404)
+        return jsonify(entry)
+
+    @app.route('/admin/profiles/<profile_id>/download')
+    @login_required
+    def download_profile(profile_id):
+        admin_only()
+        path = store.file(profile_id)
+        if path is None:
+            abort(404)
+        return send_file(os.path.abspath(path), as_attachment=True,
+                         download_name=f'profile_{profile_id}{os.path.splitext(path)[1]}')
+
+    print(f"🔬 Profiling enabled (threshold {config.threshold_ms}ms, sample rate {config.sample_rate}, mode {config.mode})")
+    return store
@@ -0,0 +1,93 @@
+"""
+Per-user rate limits for the Attendance Management System
+Expensive routes (exports, sync and bulk marking) take a token from the
+caller's bucket; an empty bucket answers 429 with Retry-After instead of
+tying up a worker. Buckets refill continuously and hold at most one period's
+worth of requests, so short bursts pass. Callers are identified by faculty
+ID, or by address when not logged in. Buckets live in each worker process,
+so a user can reach the limit once per worker.
+
+Environment:
+    RATE_LIMIT_ENABLED  0 to disable the limits (default 1)
+    EXPORT_RATE_LIMIT   exports per user as requests/seconds (default 10/60)
+    SYNC_RATE_LIMIT     sync and bulk marking requests per user as requests/seconds (default 30/60)
+"""
+import os
+import threading
+import time
+from functools import wraps
+from typing import Dict, Hashable, Optional
+
+from flask import jsonify, request, session
+
+
+class RateLimiter:
+    """Token buckets per caller: ``capacity`` requests, refilled over ``period`` seconds"""
+
+    def __init__(self, name: str, capacity: int, period: float, max_buckets: int = 10000):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_buckets = max_buckets
+        self._buckets: Dict[Hashable, list] = {}   # key -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable) -> float:
+        """Take a token; returns 0 when allowed, else the seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_buckets:
+                    self._prune(now)
+                bucket = self._buckets[key] = [float(self.capacity), now]
+            tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                return (1 - tokens) / self.rate
+            bucket[0] = tokens - 1
+            return 0.0
+
+    def _prune(self, now: float) -> None:
+        # Buckets that have refilled completely are the same as new ones
+        full = [key for key, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * self.rate >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+
+
+def rate_limit_key() -> str:
+    """The caller a request is counted against"""
+    faculty_id = session.get('faculty_id')
+    return f'faculty:{faculty_id}' if faculty_id else f'addr:{request.remote_addr}'
+
+
+def rate_limited(limiter: Optional[RateLimiter]):
+    """Answer 429 when the caller's bucket in ``limiter`` is empty (no limit when None)"""
+    def decorator(view):
+        if limiter is None:
+            return view
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            retry_after = limiter.acquire(rate_limit_key())
+            if retry_after:
+                response = jsonify({
+                    'success': False,
+                    'message': f'Too many {limiter.name} requests, try again in {retry_after:.0f} seconds'
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(max(1, round(retry_after)))
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def create_rate_limiter(name: str, variable: str, default: str) -> Optional[RateLimiter]:
+    """Build a limiter from a ``requests/seconds`` environment setting, or None when limits are disabled"""
+    if os.getenv('RATE_LIMIT_ENABLED', '1') != '1':
+        return None
+    capacity, period = os.getenv(variable, default).split('/')
+    return RateLimiter(name, int(capacity), float(period))
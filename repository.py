@@ -0,0 +1,462 @@
+"""
+Data-access layer for the Attendance Management System
+All MongoDB reads and writes used by the routes go through named query methods
+that project only the fields a page needs and normalize the attendance schema.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Iterator
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+import clock
+from storage import DEFAULT_SECTION, MARK_FIELDS, StorageBackend, batched, day_key, normalize_attendance
+
+# Field projections for each query shape
+STUDENT_SUMMARY_FIELDS = {'student_id': 1, 'name': 1}
+STUDENT_ROSTER_FIELDS = {'student_id': 1, 'name': 1, 'email': 1, 'department': 1, 'class': 1}
+STUDENT_EXPORT_FIELDS = {
+    '_id': 0, 'student_id': 1, 'name': 1, 'class': 1, 'email': 1, 'phone': 1,
+    'department': 1, 'created_at': 1, 'is_active': 1
+}
+STUDENT_FACE_FIELDS = {'student_id': 1, 'name': 1, 'face_embedding': 1}
+FACULTY_AUTH_FIELDS = {'faculty_id': 1, 'name': 1, 'password_hash': 1}
+LECTURE_FIELDS = {'lecture_number': 1, 'faculty_id': 1, 'section': 1, 'subject': 1, 'date': 1, 'is_active': 1}
+ATTENDANCE_FIELDS = {
+    'student_id': 1, 'student_object_id': 1, 'student_name': 1, 'lecture_number': 1,
+    'subject': 1, 'date': 1, 'day': 1, 'time': 1, 'timestamp': 1, 'status': 1
+}
+ATTENDANCE_EXPORT_FIELDS = dict(ATTENDANCE_FIELDS, section=1, faculty_id=1, marked_by=1)
+# Fields sent to client-side caches by the change feed
+CHANGE_FEED_FIELDS = {
+    'students': dict(STUDENT_ROSTER_FIELDS, is_active=1, updated_at=1),
+    'attendance': dict(ATTENDANCE_FIELDS, section=1, faculty_id=1, marked_by=1, updated_at=1),
+}
+
+# Index hints for each query shape, keyed by collection and the index key pattern.
+# A hint is only sent once the index is known to exist on the collection.
+QUERY_HINTS = {
+    'students.by_student_id': ('students', [('student_id', 1)]),
+    'attendance.duplicate_check': ('attendance', [(field, 1) for field in MARK_FIELDS]),
+    'attendance.by_day': ('attendance', [('day', 1), ('timestamp', 1)]),
+    'attendance.by_timestamp': ('attendance', [('timestamp', -1)]),
+    'students.active': ('students', [('is_active', 1), ('student_id', 1)]),
+    'lectures.active': ('lectures', [('faculty_id', 1), ('section', 1), ('is_active', 1)]),
+    'faculty.by_faculty_id': ('faculty', [('faculty_id', 1)]),
+    'students.changed': ('students', [('updated_at', 1), ('_id', 1)]),
+    'attendance.changed': ('attendance', [('updated_at', 1), ('_id', 1)]),
+}
+
+
+# Server error code for a write that would break a unique index
+DUPLICATE_KEY = 11000
+
+
+class CollectionScanError(Exception):
+    """Raised in strict explain mode when a query falls back to a collection scan"""
+
+
+def duplicate_keys_only(error) -> bool:
+    """Whether every failure in a BulkWriteError is a duplicate key, i.e. the documents already exist"""
+    details = error.details or {}
+    return not details.get('writeConcernErrors') and all(
+        write_error.get('code') == DUPLICATE_KEY for write_error in details.get('writeErrors', []))
+
+
+def index_name(keys: List[tuple]) -> str:
+    """Return the default MongoDB index name for a key pattern"""
+    return '_'.join(f'{field}_{direction}' for field, direction in keys)
+
+
+class AttendanceRepository(StorageBackend):
+    """Named queries over the students, attendance, lectures and faculty collections"""
+
+    def __init__(self, db, use_hints: bool = True, explain: bool = False, strict: bool = False):
+        self.db = db
+        self.use_hints = use_hints
+        self.explain = explain
+        self.strict = strict
+        self.collscans: List[Dict[str, Any]] = []
+        self._index_cache: Dict[str, set] = {}
+
+    # Internal helpers
+
+    def _indexes(self, collection: str) -> set:
+        """Return the index names present on a collection (cached)"""
+        if collection not in self._index_cache:
+            try:
+                names = set(self.db[collection].index_information().keys())
+            except Exception:
+                names = set()
+            self._index_cache[collection] = names
+        return self._index_cache[collection]
+
+    def refresh_indexes(self) -> None:
+        """Forget cached index names, e.g. after creating new indexes"""
+        self._index_cache.clear()
+
+    def _hint(self, query_name: str) -> Optional[List[tuple]]:
+        """Return the index hint for a query shape if the index exists"""
+        if not self.use_hints:
+            return None
+        collection, keys = QUERY_HINTS[query_name]
+        if index_name(keys) in self._indexes(collection):
+            return keys
+        return None
+
+    def _kwargs(self, query_name: str) -> Dict[str, Any]:
+        hint = self._hint(query_name)
+        return {'hint': hint} if hint else {}
+
+    def _check_plan(self, query_name: str, collection: str, query: Dict[str, Any],
+                    sort: Optional[List[tuple]] = None) -> None:
+        """In explain mode, record (or raise on) queries whose plan is a COLLSCAN"""
+        if not self.explain:
+            return
+        cursor = self.db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        hint = self._hint(query_name)
+        if hint:
+            cursor = cursor.hint(hint)
+        plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        if 'COLLSCAN' in _plan_stages(plan):
+            entry = {'query': query_name, 'collection': collection, 'filter': query}
+            self.collscans.append(entry)
+            if self.strict:
+                raise CollectionScanError(f'{query_name} on {collection} uses a collection scan')
+
+    # Faculty
+
+    def find_faculty(self, faculty_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch the fields needed to authenticate a faculty member"""
+        query = {'faculty_id': faculty_id}
+        self._check_plan('faculty.by_faculty_id', 'faculty', query)
+        return self.db.faculty.find_one(query, FACULTY_AUTH_FIELDS, **self._kwargs('faculty.by_faculty_id'))
+
+    def faculty_exists(self, faculty_id: str) -> bool:
+        return self.db.faculty.count_documents({'faculty_id': faculty_id}, limit=1) > 0
+
+    def insert_faculty(self, faculty_data: Dict[str, Any]) -> Any:
+        faculty_data.setdefault('updated_at', clock.now())
+        return self.db.faculty.insert_one(faculty_data).inserted_id
+
+    def update_faculty_password(self, faculty_id: str, password_hash: str) -> None:
+        self.db.faculty.update_one(
+            {'faculty_id': faculty_id},
+            {'$set': {'password_hash': password_hash, 'updated_at': clock.now()}}
+        )
+
+    # Students
+
+    def count_active_students(self) -> int:
+        query = {'is_active': True}
+        self._check_plan('students.active', 'students', query)
+        return self.db.students.count_documents(query, **self._kwargs('students.active'))
+
+    def student_exists(self, student_id: str) -> bool:
+        return self.db.students.count_documents(
+            {'student_id': student_id}, limit=1, **self._kwargs('students.by_student_id')) > 0
+
+    def find_student(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a student's id and name by their student ID"""
+        query = {'student_id': student_id}
+        self._check_plan('students.by_student_id', 'students', query)
+        return self.db.students.find_one(query, STUDENT_SUMMARY_FIELDS, **self._kwargs('students.by_student_id'))
+
+    def find_students(self, student_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch many students in one query, keyed by student ID"""
+        query = {'student_id': {'$in': list(student_ids)}}
+        self._check_plan('students.by_student_id', 'students', query)
+        cursor = self.db.students.find(query, STUDENT_SUMMARY_FIELDS, **self._kwargs('students.by_student_id'))
+        return {student['student_id']: student for student in cursor}
+
+    def students_by_object_ids(self, object_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve student documents for a set of stringified ObjectIds"""
+        oids = []
+        for oid in set(object_ids):
+            try:
+                oids.append(ObjectId(oid))
+            except (InvalidId, TypeError):
+                continue
+        if not oids:
+            return {}
+        cursor = self.db.students.find({'_id': {'$in': oids}}, {'student_id': 1, 'name': 1, 'department': 1})
+        return {str(student['_id']): student for student in cursor}
+
+    def list_active_students(self) -> List[Dict[str, Any]]:
+        """Active roster sorted by student ID, projected for the marking page"""
+        query = {'is_active': True}
+        self._check_plan('students.active', 'students', query, [('student_id', 1)])
+        cursor = self.db.students.find(query, STUDENT_ROSTER_FIELDS, **self._kwargs('students.active'))
+        return list(cursor.sort('student_id', 1))
+
+    def list_students(self, active_only: bool = False) -> List[Dict[str, Any]]:
+        """All student fields used by the exports"""
+        query = {'is_active': True} if active_only else {}
+        return list(self.db.students.find(query, STUDENT_EXPORT_FIELDS))
+
+    def iter_students(self, batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        sort = [('student_id', 1)]
+        self._check_plan('students.by_student_id', 'students', {}, sort)
+        cursor = self.db.students.find({}, STUDENT_EXPORT_FIELDS, **self._kwargs('students.by_student_id'))
+        yield from batched(cursor.sort(sort).batch_size(batch_size), batch_size)
+
+    def insert_student(self, student_data: Dict[str, Any]) -> Any:
+        student_data.setdefault('updated_at', clock.now())
+        return self.db.students.insert_one(student_data).inserted_id
+
+    def set_face_embedding(self, student_id: str, embedding: List[float]) -> bool:
+        result = self.db.students.update_one(
+            {'student_id': student_id},
+            {'$set': {'face_embedding': embedding, 'updated_at': clock.now()}},
+            **self._kwargs('students.by_student_id'))
+        return result.matched_count > 0
+
+    def face_embeddings(self) -> List[Dict[str, Any]]:
+        query = {'is_active': True, 'face_embedding': {'$exists': True}}
+        return list(self.db.students.find(query, STUDENT_FACE_FIELDS, **self._kwargs('students.active')))
+
+    # Lectures
+
+    def get_active_lecture(self, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Optional[Dict[str, Any]]:
+        query = {'faculty_id': faculty_id, 'section': section, 'is_active': True}
+        self._check_plan('lectures.active', 'lectures', query)
+        return self.db.lectures.find_one(query, LECTURE_FIELDS, **self._kwargs('lectures.active'))
+
+    def get_or_create_active_lecture(self, faculty_id: Optional[str],
+                                     section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        """Return the active lecture, creating a default one if none exists"""
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+
+        current_lecture = self.get_active_lecture(faculty_id, section)
+        if current_lecture:
+            return current_lecture
+        # Upsert so concurrent first marks in one class create a single lecture;
+        # the unique partial index turns a lost race into DuplicateKeyError
+        query = {'faculty_id': faculty_id, 'section': section, 'is_active': True}
+        defaults = {key: value for key, value in self.build_lecture(1, faculty_id, section).items()
+                    if key not in query}
+        try:
+            return self.db.lectures.find_one_and_update(
+                query, {'$setOnInsert': defaults},
+                projection=LECTURE_FIELDS, upsert=True, return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            return self.get_active_lecture(faculty_id, section)
+
+    def set_active_lecture(self, lecture_number: int, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        """Deactivate the faculty member's lecture in the section and start a new one"""
+        from pymongo.errors import DuplicateKeyError
+
+        now = clock.now()
+        self.db.lectures.update_many(
+            {'faculty_id': faculty_id, 'section': section, 'is_active': True},
+            {'$set': {'is_active': False, 'updated_at': now}}
+        )
+        lecture = self.build_lecture(lecture_number, faculty_id, section, now)
+        try:
+            self.db.lectures.insert_one(lecture)
+        except DuplicateKeyError:
+            # A concurrent change for the same class won
+            return self.get_active_lecture(faculty_id, section)
+        return lecture
+
+    # Attendance
+
+    def count_attendance_for_days(self, first_day: int, end_day: int,
+                                  statuses: Optional[Iterable[str]] = None) -> int:
+        query = {'day': {'$gte': first_day, '$lt': end_day}}
+        if statuses is not None:
+            statuses = list(statuses)
+            # Records written before statuses existed are present marks
+            query['status'] = {'$in': statuses + [None] if 'present' in statuses else statuses}
+        self._check_plan('attendance.by_day', 'attendance', query)
+        return self.db.attendance.count_documents(query, **self._kwargs('attendance.by_day'))
+
+    def attendance_fingerprint(self, first_day: int, end_day: int) -> tuple:
+        query = {'day': {'$gte': first_day, '$lt': end_day}}
+        self._check_plan('attendance.by_day', 'attendance', query)
+        pipeline = [{'$match': query},
+                    {'$group': {'_id': None, 'count': {'$sum': 1}, 'latest': {'$max': '$updated_at'}}}]
+        result = list(self.db.attendance.aggregate(pipeline, **self._kwargs('attendance.by_day')))
+        return (result[0]['count'], result[0]['latest']) if result else (0, None)
+
+    def attendance_for_days(self, first_day: int, end_day: int) -> List[Dict[str, Any]]:
+        query = {'day': {'$gte': first_day, '$lt': end_day}}
+        sort = [('day', 1), ('timestamp', 1)]
+        self._check_plan('attendance.by_day', 'attendance', query, sort)
+        cursor = self.db.attendance.find(query, ATTENDANCE_FIELDS, **self._kwargs('attendance.by_day')).sort(sort)
+        return [normalize_attendance(record) for record in cursor]
+
+    def all_attendance(self, limit: int = 0) -> List[Dict[str, Any]]:
+        """Attendance records, newest first"""
+        sort = [('timestamp', -1)]
+        self._check_plan('attendance.by_timestamp', 'attendance', {}, sort)
+        cursor = self.db.attendance.find({}, ATTENDANCE_FIELDS, **self._kwargs('attendance.by_timestamp'))
+        cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [normalize_attendance(record) for record in cursor]
+
+    def iter_attendance(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """Attendance records with export fields, oldest first, streamed from a batched cursor"""
+        bounds = {op: value for op, value in (('$gte', start), ('$lt', end)) if value is not None}
+        query = {'timestamp': bounds} if bounds else {}
+        sort = [('timestamp', 1)]
+        self._check_plan('attendance.by_timestamp', 'attendance', query, sort)
+        cursor = self.db.attendance.find(query, ATTENDANCE_EXPORT_FIELDS, **self._kwargs('attendance.by_timestamp'))
+        cursor = cursor.sort(sort).batch_size(batch_size)
+        yield from batched((normalize_attendance(record) for record in cursor), batch_size)
+
+    @staticmethod
+    def _mark_query(student_object_id: Any, faculty_id: Optional[str], section: str,
+                    lecture_number: int, day: datetime) -> Dict[str, Any]:
+        return dict(zip(MARK_FIELDS, (student_object_id, faculty_id, section, lecture_number, day_key(day))))
+
+    def attendance_exists(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> bool:
+        """Whether a student is already marked for a lecture on the given day"""
+        query = self._mark_query(student_object_id, faculty_id, section, lecture_number, day)
+        self._check_plan('attendance.duplicate_check', 'attendance', query)
+        return self.db.attendance.count_documents(
+            query, limit=1, **self._kwargs('attendance.duplicate_check')) > 0
+
+    def marked_object_ids(self, object_ids: Iterable[str], faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> set:
+        """Return which of the given students are already marked for a lecture"""
+        query = self._mark_query({'$in': list(object_ids)}, faculty_id, section, lecture_number, day)
+        self._check_plan('attendance.duplicate_check', 'attendance', query)
+        cursor = self.db.attendance.find(
+            query, {'_id': 0, 'student_object_id': 1}, **self._kwargs('attendance.duplicate_check'))
+        return {record['student_object_id'] for record in cursor}
+
+    def insert_attendance(self, record: Dict[str, Any]) -> Any:
+        """Insert a mark; the unique mark index rejects it when the student is already marked"""
+        from pymongo.errors import DuplicateKeyError
+
+        try:
+            return self.db.attendance.insert_one(record).inserted_id
+        except DuplicateKeyError:
+            return None
+
+    def changed_since(self, collection: str, after: tuple, limit: int = 1000) -> List[tuple]:
+        """Documents by ``updated_at``; documents written before it existed never show up as changes"""
+        changed_at, last_id = after
+        query: Dict[str, Any] = {'updated_at': {'$gte': changed_at}}
+        if last_id:
+            # Ties on updated_at are skipped within the index scan, without fetching them
+            try:
+                last_id = ObjectId(last_id)
+            except InvalidId:
+                pass
+            query['$or'] = [{'updated_at': {'$gt': changed_at}}, {'_id': {'$gt': last_id}}]
+        sort = [('updated_at', 1), ('_id', 1)]
+        query_name = f'{collection}.changed'
+        self._check_plan(query_name, collection, query, sort)
+        cursor = self.db[collection].find(query, CHANGE_FEED_FIELDS[collection], **self._kwargs(query_name))
+        docs = cursor.sort(sort).limit(limit)
+        if collection == 'attendance':
+            docs = (normalize_attendance(doc) for doc in docs)
+        return [(doc['updated_at'], doc) for doc in docs]
+
+    def backfill_attendance_references(self) -> int:
+        """Add missing student_object_id/student_name/timestamp/day/section/faculty_id fields to old records"""
+        from pymongo import UpdateOne
+
+        query = {'$or': [{'student_object_id': {'$in': [None, '']}}, {'timestamp': {'$exists': False}},
+                         {'day': {'$exists': False}}, {'section': {'$exists': False}},
+                         {'faculty_id': {'$exists': False}}]}
+        records = list(self.db.attendance.find(
+            query, {'student_id': 1, 'student_object_id': 1, 'date': 1, 'day': 1, 'timestamp': 1,
+                    'section': 1, 'faculty_id': 1}))
+        if not records:
+            return 0
+        students = self.find_students({record['student_id'] for record in records if record.get('student_id')})
+
+        updates = []
+        for record in records:
+            update_data = {}
+            student = students.get(record.get('student_id'))
+            if student and not record.get('student_object_id'):
+                update_data['student_object_id'] = str(student['_id'])
+                update_data['student_name'] = student['name']
+            timestamp = normalize_attendance(dict(record))['timestamp']
+            if 'date' in record and not record.get('timestamp'):
+                update_data['timestamp'] = timestamp = timestamp or clock.now()
+            if 'day' not in record and timestamp:
+                update_data['day'] = day_key(timestamp)
+            # Marks made before lectures were scoped belong to the default section
+            if not record.get('section'):
+                update_data['section'] = DEFAULT_SECTION
+            if 'faculty_id' not in record:
+                update_data['faculty_id'] = None
+            if update_data:
+                updates.append(UpdateOne({'_id': record['_id']}, {'$set': update_data}))
+        if updates:
+            self.db.attendance.bulk_write(updates, ordered=False)
+        return len(updates)
+
+    def insert_attendance_many(self, records: List[Dict[str, Any]]) -> List[Any]:
+        from pymongo.errors import BulkWriteError
+
+        if not records:
+            return []
+        try:
+            return self.db.attendance.insert_many(records, ordered=False).inserted_ids
+        except BulkWriteError as e:
+            if not duplicate_keys_only(e):
+                raise
+            # insert_many set every record's _id; the rest were inserted
+            duplicates = {write_error['index'] for write_error in e.details['writeErrors']}
+            return [record['_id'] for i, record in enumerate(records) if i not in duplicates]
+
+    def insert_missing_marks(self, records: List[Dict[str, Any]]) -> int:
+        """Upsert each record keyed by its mark in a single bulk_write; existing marks are left untouched"""
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+
+        if not records:
+            return 0
+        requests = []
+        for record in records:
+            mark = {field: record.get(field) for field in MARK_FIELDS}
+            requests.append(UpdateOne(
+                mark, {'$setOnInsert': {key: value for key, value in record.items() if key not in mark}},
+                upsert=True))
+        try:
+            return self.db.attendance.bulk_write(requests, ordered=False).upserted_count
+        except BulkWriteError as e:
+            # Two writers upserting the same mark at once can both miss it; the unique
+            # mark index fails the second insert, and that mark exists either way
+            if not duplicate_keys_only(e):
+                raise
+            return e.details.get('nUpserted', 0)
+
+    def update_attendance_status(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                                 lecture_number: int, day: datetime, status: str,
+                                 replaces: Optional[Iterable[str]] = None) -> bool:
+        query = self._mark_query(student_object_id, faculty_id, section, lecture_number, day)
+        query['status'] = {'$in': [s for s in replaces if s != status]} if replaces is not None else {'$ne': status}
+        result = self.db.attendance.update_one(
+            query, {'$set': {'status': status, 'updated_at': clock.now()}},
+            **self._kwargs('attendance.duplicate_check'))
+        return result.modified_count > 0
+
+
+def _plan_stages(plan: Dict[str, Any]) -> set:
+    """Collect every stage name in an explain() winning plan"""
+    stages = set()
+    if not isinstance(plan, dict):
+        return stages
+    if 'stage' in plan:
+        stages.add(plan['stage'])
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages |= _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages |= _plan_stages(child)
+    return stages
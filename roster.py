@@ -0,0 +1,95 @@
+"""
+Active roster pages for the Attendance Management System
+The marking page shows the roster as a virtualized list that fetches pages as
+it scrolls, so its size no longer grows with the roster. The projected active
+roster is held in process, sorted by student ID and split by section: a page
+is a list slice and a search is one scan over precomputed lowercase keys,
+with its matches kept briefly for the pages that follow. Nothing is read from
+the database per request; the roster is reloaded after any student change,
+tracked by a version counter shared by the worker processes.
+
+Environment:
+    ROSTER_VERSION_PATH  counter file (default: attendance_roster.bin in the temp dir)
+"""
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Any
+
+from cache import TTLCache
+from lecture_sessions import normalize_section
+from storage import DEFAULT_SECTION
+from versioning import DataVersion
+
+# Fields sent for each roster row
+ROW_FIELDS = ('student_id', 'name', 'email', 'department', 'class')
+
+
+class _Snapshot:
+    """The active roster at one version: rows, section membership and search keys"""
+
+    def __init__(self, stamp: tuple, students: List[Dict[str, Any]]):
+        self.stamp = stamp
+        self.rows = [{field: student.get(field) for field in ROW_FIELDS}
+                     for student in sorted(students, key=lambda student: student['student_id'])]
+        self.sections: Dict[str, List[int]] = {}
+        for i, row in enumerate(self.rows):
+            self.sections.setdefault(normalize_section(row['class']), []).append(i)
+        self.sections[DEFAULT_SECTION] = list(range(len(self.rows)))
+        self.keys = [f"{row['student_id']}\x00{row['name'] or ''}".lower() for row in self.rows]
+
+
+class Roster:
+    """Paged, filtered access to the active roster, cached in process"""
+
+    def __init__(self, repo, version: DataVersion, search_ttl: float = 60):
+        self.repo = repo
+        self.version = version
+        self._snapshot: Optional[_Snapshot] = None
+        self._matches = TTLCache(ttl=search_ttl, max_entries=256)
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> _Snapshot:
+        stamp = self.version.read()[:2]
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.stamp != stamp:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.stamp != stamp:
+                    # Read the version first so a concurrent change leaves the new roster already stale
+                    snapshot = self._snapshot = _Snapshot(stamp, self.repo.list_active_students())
+        return snapshot
+
+    def sections(self) -> List[str]:
+        """Sections with at least one active student"""
+        return sorted(section for section in self.snapshot().sections if section != DEFAULT_SECTION)
+
+    def page(self, section: str = DEFAULT_SECTION, search: str = '', offset: int = 0,
+             limit: int = 100) -> tuple:
+        """(matching students, rows ``offset`` to ``offset + limit``) of a section, filtered by a search
+        on student ID or name"""
+        snapshot = self.snapshot()
+        members = snapshot.sections.get(section, [])
+        search = search.strip().lower()
+        if search:
+            key = (snapshot.stamp, section, search)
+            matches = self._matches.get(key)
+            if matches is None:
+                keys = snapshot.keys
+                matches = [i for i in members if search in keys[i]]
+                self._matches.set(key, matches)
+            members = matches
+        return len(members), [snapshot.rows[i] for i in members[offset:offset + limit]]
+
+    def invalidate(self) -> None:
+        """Reload the roster in every worker process on next use"""
+        self.version.bump()
+
+
+roster_version = DataVersion(os.getenv(
+    'ROSTER_VERSION_PATH', os.path.join(tempfile.gettempdir(), 'attendance_roster.bin')))
+
+
+def create_roster(repo) -> Roster:
+    """Build the roster cache"""
+    return Roster(repo, roster_version)
@@ -0,0 +1,127 @@
+"""
+Scheduled report precomputation for the Attendance Management System
+A small in-process scheduler that runs jobs once a day at a fixed local time.
+Every worker process runs the scheduler thread; a run is claimed under a file
+lock in a state file next to the export artifacts, so each job runs once a day
+per host. A run missed while no process was up starts late only within the
+misfire grace period, otherwise the job waits for the next day.
+
+Reports precomputed off-peak:
+    daily_report   yesterday's daily report
+    month_to_date  this month's report up to today; the monthly export adds today's rows
+Both are served until the attendance of the days they cover changes; marking today does not.
+
+Environment:
+    REPORT_PRECOMPUTE_ENABLED  1 to precompute reports off-peak (default 1)
+    REPORT_PRECOMPUTE_AT       local time the reports are built, HH:MM (default 02:00)
+    REPORT_MISFIRE_GRACE       seconds a missed run may start late (default 3600)
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import datetime, time as dtime
+from typing import Callable, Dict, List, Optional, Any
+
+import clock
+
+
+class Scheduler:
+    """Run registered jobs once a day, in one process per host"""
+
+    def __init__(self, state_path: str, misfire_grace: float = 3600, poll_interval: float = 30):
+        self.state_path = state_path
+        self.misfire_grace = misfire_grace
+        self.poll_interval = poll_interval
+        self.jobs: List[Dict[str, Any]] = []
+        self._thread = None
+        self._pid = None
+
+    def daily(self, name: str, at: str, fn: Callable[[], Any]) -> None:
+        """Run ``fn`` every day at ``at`` ('HH:MM', local time)"""
+        hour, minute = (int(part) for part in at.split(':'))
+        self.jobs.append({'name': name, 'at': dtime(hour, minute), 'fn': fn})
+
+    def start(self) -> None:
+        """Start the scheduler thread in this process (safe to call repeatedly, and after fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='report-scheduler', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.run_pending()
+            time.sleep(self.poll_interval)
+
+    def _read_state(self) -> Dict[str, str]:
+        try:
+            with open(self.state_path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state: Dict[str, str]) -> None:
+        tmp = f'{self.state_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(state, fh)
+        os.replace(tmp, self.state_path)
+
+    def run_pending(self, now: Optional[datetime] = None) -> List[str]:
+        """Run the jobs due today that no process has claimed yet; returns the names run"""
+        now = now or clock.now()
+        today = now.date().isoformat()
+        ran = []
+        for job in self.jobs:
+            due = datetime.combine(now.date(), job['at'])
+            if now < due:
+                continue
+            with open(f'{self.state_path}.lock', 'w') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Another process is running a job; it records its own runs
+                    continue
+                state = self._read_state()
+                if state.get(job['name']) == today:
+                    continue
+                state[job['name']] = today
+                self._write_state(state)
+
+                if (now - due).total_seconds() > self.misfire_grace:
+                    print(f"⏭️ Skipped {job['name']}: missed {due.strftime('%H:%M')} by more than the grace period")
+                    continue
+                started = time.monotonic()
+                try:
+                    job['fn']()
+                except Exception as e:
+                    print(f"❌ Scheduled job {job['name']} failed: {e}")
+                    continue
+                print(f"🕑 Scheduled job {job['name']} finished in {time.monotonic() - started:.1f}s")
+                ran.append(job['name'])
+        return ran
+
+
+def precompute_daily_report(export_jobs, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Build yesterday's daily report"""
+    yesterday = clock.add_days(clock.day_key(now), -1)
+    return export_jobs.precompute('daily_report_excel', day=clock.format_day(yesterday))
+
+
+def precompute_month_to_date(export_jobs, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Build this month's report up to the start of today"""
+    return export_jobs.precompute('monthly_report_csv', end=clock.format_day(clock.day_key(now)))
+
+
+def create_report_scheduler(export_jobs) -> Optional[Scheduler]:
+    """Build the report scheduler from environment settings, or None when disabled"""
+    if os.getenv('REPORT_PRECOMPUTE_ENABLED', '1') != '1':
+        return None
+    at = os.getenv('REPORT_PRECOMPUTE_AT', '02:00')
+    scheduler = Scheduler(os.path.join(export_jobs.directory, 'schedule.state'),
+                          misfire_grace=float(os.getenv('REPORT_MISFIRE_GRACE', '3600')))
+    scheduler.daily('daily_report', at, lambda: precompute_daily_report(export_jobs))
+    scheduler.daily('month_to_date', at, lambda: precompute_month_to_date(export_jobs))
+    return scheduler
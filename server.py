@@ -0,0 +1,115 @@
+"""
+Production server for the Attendance Management System
+Runs the Flask app under a pre-fork gunicorn server configured in code. Every
+worker gets its own MongoClient and is warmed up before it accepts traffic.
+
+Usage:
+    python server.py
+    python attendance_system.py --production
+
+Environment:
+    BIND                  address to listen on (default 0.0.0.0:5000)
+    WEB_CONCURRENCY       number of worker processes (default 2 * CPUs + 1)
+    WORKER_THREADS        threads per worker (default 4)
+    WORKER_TIMEOUT        seconds before a silent worker is restarted (default 60)
+    PRELOAD_APP           import the app in the master before forking (default 0);
+                          otherwise the master never imports it and each worker
+                          imports it after fork
+    MAX_REQUESTS          recycle workers after this many requests (default 0, never)
+    plus the MONGO_* pool settings in mongo_settings.py
+"""
+import multiprocessing
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+
+def server_options() -> dict:
+    """gunicorn settings built from the environment"""
+    return {
+        'bind': os.getenv('BIND', '0.0.0.0:5000'),
+        'workers': int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)),
+        'worker_class': 'gthread',
+        'threads': int(os.getenv('WORKER_THREADS', '4')),
+        'timeout': int(os.getenv('WORKER_TIMEOUT', '60')),
+        'graceful_timeout': 30,
+        'keepalive': 5,
+        'preload_app': os.getenv('PRELOAD_APP', '0') == '1',
+        'max_requests': int(os.getenv('MAX_REQUESTS', '0')),
+        'max_requests_jitter': int(os.getenv('MAX_REQUESTS_JITTER', '50')),
+        'accesslog': os.getenv('ACCESS_LOG', '-'),
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+    }
+
+
+def post_fork(server, worker):
+    """MongoClient is not fork-safe: give each worker a fresh client
+
+    Only a preloaded app has a client inherited from the master; without preload
+    the worker has not imported the app yet and opens its own on import.
+    """
+    module = sys.modules.get('attendance_system')
+    if module is not None:
+        module.reconnect_mongo()
+
+
+def post_worker_init(worker):
+    """Prime pools and caches before the worker starts accepting connections"""
+    import attendance_system
+    attendance_system.warm_up()
+
+
+class AttendanceServer(BaseApplication):
+    """gunicorn application wrapper configured entirely in code"""
+
+    def __init__(self, options: dict = None):
+        self.options = options or server_options()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        import attendance_system
+        return attendance_system.app
+
+
+def init_database() -> None:
+    """Create indexes and defaults once, before any worker starts"""
+    import attendance_system
+
+    with attendance_system.app.app_context():
+        attendance_system.init_database()
+    # Drop this process's connections; each worker opens its own pool
+    if attendance_system.mongo is not None:
+        attendance_system.mongo.cx.close()
+
+
+def init_database_in_child() -> None:
+    """Run init_database in a forked child so the master never imports the app"""
+    child = multiprocessing.get_context('fork').Process(target=init_database, name='init-database')
+    child.start()
+    child.join()
+    if child.exitcode != 0:
+        raise RuntimeError(f"Database initialization failed (exit code {child.exitcode})")
+
+
+def run_production(options: dict = None) -> None:
+    """Initialize the database once, then start the pre-fork server"""
+    options = options or server_options()
+    if options.get('preload_app'):
+        init_database()
+    else:
+        init_database_in_child()
+
+    print(f"🚀 Starting production server on {options['bind']} with "
+          f"{options['workers']} workers x {options['threads']} threads")
+    AttendanceServer(options).run()
+
+
+if __name__ == '__main__':
+    run_production()
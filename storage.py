@@ -0,0 +1,373 @@
+"""
+Pluggable storage backends for the Attendance Management System
+StorageBackend is the data-access interface the routes use. Implementations:
+
+    mongo   AttendanceRepository (repository.py), the default
+    sqlite  SQLiteRepository (local_store.py), offline-capable, synced to MongoDB
+    memory  MemoryRepository (memory_store.py), dict-indexed, for tests and benchmarks
+
+Select one with the STORAGE_BACKEND environment variable.
+"""
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Iterator
+
+import clock
+from clock import day_bounds, day_key
+from models import ATTENDANCE_METHODS, ATTENDANCE_STATUS
+
+BACKENDS = ('mongo', 'sqlite', 'memory')
+
+# Section used when a faculty member runs lectures without naming one
+DEFAULT_SECTION = 'default'
+
+# Statuses that count as attending; records without a status are present marks
+ATTENDED_STATUSES = (ATTENDANCE_STATUS['PRESENT'], ATTENDANCE_STATUS['LATE'])
+
+# Fields identifying a mark: a student has at most one per lecture of a class and day.
+# Lectures are numbered per faculty member and section, so both are part of it
+MARK_FIELDS = ('student_object_id', 'faculty_id', 'section', 'lecture_number', 'day')
+
+
+def normalize_attendance(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an attendance document to the canonical schema
+
+    Older records store either ``date`` or ``timestamp`` (sometimes as a string)
+    and either ``student_id`` or ``student_object_id``. Readers always get
+    ``timestamp`` as a datetime, ``date`` as the start of that day, ``day`` as
+    its integer key and both student references as strings. Records from before
+    lectures were scoped belong to no faculty member and the default section.
+    """
+    timestamp = record.get('timestamp')
+    if not isinstance(timestamp, datetime):
+        raw_date = record.get('date')
+        if isinstance(raw_date, datetime):
+            timestamp = raw_date
+        else:
+            try:
+                timestamp = datetime.strptime(str(raw_date)[:10], '%Y-%m-%d')
+            except (TypeError, ValueError):
+                timestamp = None
+    record['timestamp'] = timestamp
+    record['date'] = day_bounds(timestamp)[0] if timestamp else None
+    if not isinstance(record.get('day'), int):
+        record['day'] = day_key(timestamp) if timestamp else None
+    if not record.get('time') and timestamp:
+        record['time'] = timestamp.strftime('%H:%M:%S')
+
+    if record.get('student_object_id') is not None:
+        record['student_object_id'] = str(record['student_object_id'])
+    if record.get('student_id') is not None:
+        record['student_id'] = str(record['student_id'])
+    record.setdefault('status', 'present')
+    record.setdefault('faculty_id', None)
+    record['section'] = record.get('section') or DEFAULT_SECTION
+    return record
+
+
+def mark_key(record: Dict[str, Any]) -> tuple:
+    """Identity of a normalized attendance record's mark, in MARK_FIELDS order"""
+    return tuple(record.get(field) for field in MARK_FIELDS)
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of at most ``size`` items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class StorageBackend(ABC):
+    """Operations over students, attendance, lectures and faculty used by the app"""
+
+    # Faculty
+
+    @abstractmethod
+    def find_faculty(self, faculty_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch the fields needed to authenticate a faculty member"""
+
+    @abstractmethod
+    def faculty_exists(self, faculty_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def insert_faculty(self, faculty_data: Dict[str, Any]) -> Any:
+        pass
+
+    @abstractmethod
+    def update_faculty_password(self, faculty_id: str, password_hash: str) -> None:
+        pass
+
+    # Students
+
+    @abstractmethod
+    def count_active_students(self) -> int:
+        pass
+
+    @abstractmethod
+    def student_exists(self, student_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def find_student(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a student's id and name by their student ID"""
+
+    @abstractmethod
+    def find_students(self, student_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch many students, keyed by student ID"""
+
+    @abstractmethod
+    def students_by_object_ids(self, object_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve students for a set of stringified ObjectIds"""
+
+    @abstractmethod
+    def list_active_students(self) -> List[Dict[str, Any]]:
+        """Active roster sorted by student ID"""
+
+    @abstractmethod
+    def list_students(self, active_only: bool = False) -> List[Dict[str, Any]]:
+        """All student fields used by the exports"""
+
+    @abstractmethod
+    def iter_students(self, batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """Students with export fields, ordered by student_id, in batches of ``batch_size``"""
+
+    @abstractmethod
+    def insert_student(self, student_data: Dict[str, Any]) -> Any:
+        pass
+
+    @abstractmethod
+    def set_face_embedding(self, student_id: str, embedding: List[float]) -> bool:
+        """Store a student's face embedding; returns False for unknown students"""
+
+    @abstractmethod
+    def face_embeddings(self) -> List[Dict[str, Any]]:
+        """Active students with a face embedding: _id, student_id, name and face_embedding"""
+
+    # Lectures
+    #
+    # Each faculty member has at most one active lecture per section, so classes
+    # running at the same time never share or overwrite a lecture document.
+
+    @abstractmethod
+    def get_active_lecture(self, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Optional[Dict[str, Any]]:
+        """The active lecture of a faculty member in a section"""
+
+    @abstractmethod
+    def get_or_create_active_lecture(self, faculty_id: Optional[str],
+                                     section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        """Return the active lecture of a faculty member in a section, creating a default one if none exists"""
+
+    @abstractmethod
+    def set_active_lecture(self, lecture_number: int, faculty_id: Optional[str],
+                           section: str = DEFAULT_SECTION) -> Dict[str, Any]:
+        """Deactivate the faculty member's lecture in the section and start a new one"""
+
+    # Attendance
+
+    @abstractmethod
+    def count_attendance_for_days(self, first_day: int, end_day: int,
+                                  statuses: Optional[Iterable[str]] = None) -> int:
+        """Count records with a day key in [first_day, end_day), optionally only those with one of ``statuses``"""
+
+    @abstractmethod
+    def attendance_fingerprint(self, first_day: int, end_day: int) -> tuple:
+        """(count, latest updated_at) of records with a day key in [first_day, end_day); changes
+        whenever a record of those days is added or updated"""
+
+    @abstractmethod
+    def attendance_for_days(self, first_day: int, end_day: int) -> List[Dict[str, Any]]:
+        """Records with a day key in [first_day, end_day), ordered by day and time"""
+
+    @abstractmethod
+    def all_attendance(self, limit: int = 0) -> List[Dict[str, Any]]:
+        """Attendance records, newest first"""
+
+    @abstractmethod
+    def iter_attendance(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """Attendance records with export fields, oldest first, in batches of ``batch_size``"""
+
+    # Marks are looked up by student and lecture: the faculty member, section and
+    # lecture number, and the day (see MARK_FIELDS)
+
+    @abstractmethod
+    def attendance_exists(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> bool:
+        """Whether a student is already marked for a lecture on the given day"""
+
+    @abstractmethod
+    def marked_object_ids(self, object_ids: Iterable[str], faculty_id: Optional[str], section: str,
+                          lecture_number: int, day: datetime) -> set:
+        """Return which of the given students are already marked for a lecture"""
+
+    @abstractmethod
+    def insert_attendance(self, record: Dict[str, Any]) -> Any:
+        """Insert a record; returns its id, or None when the student's mark for the lecture already exists"""
+
+    @abstractmethod
+    def insert_attendance_many(self, records: List[Dict[str, Any]]) -> List[Any]:
+        """Insert records; returns the ids of those inserted, skipping marks that already exist"""
+
+    @abstractmethod
+    def insert_missing_marks(self, records: List[Dict[str, Any]]) -> int:
+        """Insert records whose student, lecture and day have no mark yet; returns how many were new"""
+
+    @abstractmethod
+    def update_attendance_status(self, student_object_id: str, faculty_id: Optional[str], section: str,
+                                 lecture_number: int, day: datetime, status: str,
+                                 replaces: Optional[Iterable[str]] = None) -> bool:
+        """Change the status of an existing mark, only one with a status in ``replaces`` when given;
+        returns False if there is no such mark or it already has ``status``"""
+
+    # Change feed
+    #
+    # Students and attendance are read back in order of the time each document
+    # last changed in this store, then its id, for incremental client sync.
+
+    @abstractmethod
+    def changed_since(self, collection: str, after: tuple, limit: int = 1000) -> List[tuple]:
+        """``(changed_at, doc)`` for up to ``limit`` students or attendance records, oldest change first,
+        after a ``(changed_at, id)`` position; an empty id includes every change at ``changed_at``"""
+
+    # Shared behaviour
+
+    def recent_attendance(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recent records with student names and IDs resolved in one batch"""
+        records = self.all_attendance(limit=limit)
+        students = self.students_by_object_ids(
+            record['student_object_id'] for record in records if record.get('student_object_id'))
+        missing = {record['student_id'] for record in records
+                   if record.get('student_id') and record.get('student_object_id') not in students}
+        by_student_id = self.find_students(missing) if missing else {}
+        for record in records:
+            student = students.get(record.get('student_object_id')) or by_student_id.get(record.get('student_id'))
+            if student:
+                record['student_name'] = student.get('name', 'Unknown Student')
+                record['display_student_id'] = student.get('student_id', 'N/A')
+            else:
+                record['student_name'] = record.get('student_name') or 'Unknown Student'
+                record['display_student_id'] = record.get('student_id') or 'N/A'
+        return records
+
+    def finalize_lecture(self, lecture: Dict[str, Any], faculty_id: Optional[str],
+                         roster: List[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+        """Mark every roster student without a mark for the lecture today as absent
+
+        The roster minus the students already marked is computed in one pass and
+        written in one batch that skips existing marks, so running it again (or
+        concurrently) adds nothing. Returns the number of absent records written.
+        """
+        now = now or clock.now()
+        marked = self.marked_object_ids([str(student['_id']) for student in roster], faculty_id,
+                                        lecture.get('section', DEFAULT_SECTION), lecture['lecture_number'], now)
+        absent = [self.build_attendance(student, lecture, faculty_id, 'finalize', now, ATTENDANCE_STATUS['ABSENT'])
+                  for student in roster if str(student['_id']) not in marked]
+        return self.insert_missing_marks(absent) if absent else 0
+
+    def write_marks(self, records: List[Dict[str, Any]]) -> int:
+        """Store marks from the write-behind queue or self check-in; returns how many were inserted or changed
+
+        A mark that already exists takes the new status, e.g. a late arrival after the
+        lecture was finalized, and replaying a mark changes nothing. A self check-in
+        only replaces an absent mark, never one a faculty member set.
+        """
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for record in records:
+            scope = (record.get('faculty_id'), record.get('section') or DEFAULT_SECTION,
+                     record['lecture_number'], record['date'])
+            groups.setdefault(scope, []).append(record)
+        new_records, changed = [], 0
+        for scope, group in groups.items():
+            existing = self.marked_object_ids([record['student_object_id'] for record in group], *scope)
+            for record in group:
+                if record['student_object_id'] not in existing:
+                    new_records.append(record)
+                    continue
+                replaces = ((ATTENDANCE_STATUS['ABSENT'],)
+                            if record.get('marked_by') == ATTENDANCE_METHODS['SELF_CHECKIN'] else None)
+                changed += self.update_attendance_status(
+                    record['student_object_id'], *scope, record.get('status', ATTENDANCE_STATUS['PRESENT']), replaces)
+        return (self.insert_missing_marks(new_records) if new_records else 0) + changed
+
+    @staticmethod
+    def build_lecture(lecture_number: int, faculty_id: Optional[str], section: str = DEFAULT_SECTION,
+                      now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build an active lecture document"""
+        now = now or clock.now()
+        return {
+            'lecture_number': lecture_number,
+            'faculty_id': faculty_id,
+            'section': section,
+            'date': now,
+            'is_active': True,
+            'subject': 'General',
+            'created_by': faculty_id,
+            'updated_at': now
+        }
+
+    @staticmethod
+    def build_attendance(student: Dict[str, Any], lecture: Dict[str, Any],
+                         faculty_id: Optional[str], marked_by: str,
+                         now: Optional[datetime] = None, status: str = ATTENDANCE_STATUS['PRESENT']) -> Dict[str, Any]:
+        """Build an attendance document in the canonical schema"""
+        now = now or clock.now()
+        return {
+            'student_id': student['student_id'],
+            'student_object_id': str(student['_id']),
+            'student_name': student['name'],
+            'lecture_number': lecture['lecture_number'],
+            'subject': lecture.get('subject', 'General'),
+            'section': lecture.get('section', DEFAULT_SECTION),
+            'faculty_id': faculty_id,
+            'date': day_bounds(now)[0],
+            'day': day_key(now),
+            'time': now.strftime('%H:%M:%S'),
+            'timestamp': now,
+            'status': status,
+            'marked_by': marked_by,
+            'updated_at': now
+        }
+
+    def refresh_indexes(self) -> None:
+        """Forget cached index metadata; a no-op for backends without any"""
+
+    def _indexes(self, collection: str) -> set:
+        return set()
+
+    def backfill_attendance_references(self) -> int:
+        """Repair legacy attendance records; a no-op unless the backend stores them"""
+        return 0
+
+
+def backend_name() -> str:
+    """Storage backend selected by the environment"""
+    name = os.getenv('STORAGE_BACKEND', '').lower()
+    if not name:
+        # LOCAL_STORE_ENABLED predates STORAGE_BACKEND
+        name = 'sqlite' if os.getenv('LOCAL_STORE_ENABLED', '0') == '1' else 'mongo'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown STORAGE_BACKEND '{name}', expected one of {', '.join(BACKENDS)}")
+    return name
+
+
+def create_storage(name: str, mongo_repo=None) -> tuple:
+    """Build the selected backend; returns (repository, sync worker or None)"""
+    if name == 'memory':
+        from memory_store import MemoryRepository
+        print("🧠 Using in-memory storage (data is not persisted)")
+        return MemoryRepository(), None
+    if name == 'sqlite':
+        from local_store import LocalSync, SQLiteRepository
+        local = SQLiteRepository(os.getenv('LOCAL_STORE_PATH', 'attendance_local.db'))
+        sync = LocalSync(local, mongo_repo, interval=float(os.getenv('LOCAL_SYNC_INTERVAL', '5')))
+        print(f"💾 Local store enabled ({local.path}), syncing every {sync.interval}s")
+        return local, sync
+    return mongo_repo, None
@@ -0,0 +1,169 @@
+"""
+Streaming responses for the Attendance Management System
+WSGI middleware that gzip/brotli-compresses responses chunk by chunk, so
+generator responses stay streamed, plus helpers for chunked CSV and template
+output.
+
+Environment:
+    COMPRESSION_ENABLED   set to 0 to disable compression (default 1)
+    COMPRESSION_MIN_SIZE  smallest known Content-Length worth compressing (default 1024)
+    COMPRESSION_LEVEL     gzip level (default 6)
+    BROTLI_QUALITY        brotli quality when the brotli package is installed (default 4)
+"""
+import csv
+import os
+import zlib
+from io import StringIO
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Formats that are compressed already
+SKIP_CONTENT_TYPES = (
+    'application/vnd.openxmlformats-officedocument',
+    'application/zip',
+    'application/gzip',
+    'application/x-7z-compressed',
+    'application/vnd.apache.parquet',
+    'image/',
+    'video/',
+    'audio/',
+)
+
+
+class _Compressor:
+    """Common interface over zlib (gzip framing) and brotli streams"""
+
+    def __init__(self, encoding: str, level: int, quality: int):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._stream = brotli.Compressor(quality=quality)
+        else:
+            self._stream = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush every chunk so streamed output reaches the client as it is produced
+        if self.encoding == 'br':
+            return self._stream.process(data) + self._stream.flush()
+        return self._stream.compress(data) + self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._stream.finish()
+        return self._stream.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Compress eligible responses without buffering them"""
+
+    def __init__(self, app: Callable, min_size: int = 1024, level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        accepted = parse_accept_header(accept_encoding)
+        if brotli is not None and accepted.quality('br') > 0:
+            return 'br'
+        if accepted.quality('gzip') > 0:
+            return 'gzip'
+        return None
+
+    def should_compress(self, status: str, headers: List[tuple]) -> bool:
+        if not status.startswith('200'):
+            return False
+        values = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in values:
+            return False
+        content_type = values.get('content-type', '')
+        if not content_type or content_type.startswith(SKIP_CONTENT_TYPES):
+            return False
+        length = values.get('content-length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        encoding = self.negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        compress, returned = [], []
+
+        def start(status, headers, exc_info=None):
+            # Apps that start the response lazily, while iterating, are passed through
+            if not returned and self.should_compress(status, headers):
+                compress.append(True)
+                headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+                headers = [(name, _weaken(value) if name.lower() == 'etag' else value) for name, value in headers]
+                headers.append(('Content-Encoding', encoding))
+                headers.append(('Vary', 'Accept-Encoding'))
+            return start_response(status, headers, exc_info)
+
+        body = self.app(environ, start)
+        returned.append(True)
+        if not compress:
+            return body
+        close = getattr(body, 'close', None)
+        stream = self._compress(body, _Compressor(encoding, self.level, self.brotli_quality))
+        return ClosingIterator(stream, [close] if close else None)
+
+    @staticmethod
+    def _compress(body: Iterable[bytes], compressor: _Compressor) -> Iterator[bytes]:
+        for data in body:
+            if data:
+                out = compressor.chunk(data)
+                if out:
+                    yield out
+        yield compressor.finish()
+
+
+def _weaken(etag: str) -> str:
+    """An ETag must not be strong across content encodings"""
+    return etag if etag.startswith('W/') else f'W/{etag}'
+
+
+def init_compression(app) -> None:
+    """Wrap the app's WSGI callable with the compression middleware unless disabled"""
+    if os.getenv('COMPRESSION_ENABLED', '1') != '1':
+        return
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+        level=int(os.getenv('COMPRESSION_LEVEL', '6')),
+        brotli_quality=int(os.getenv('BROTLI_QUALITY', '4')),
+    )
+
+
+def coalesce(chunks: Iterable[str], size: int = 8192) -> Iterator[str]:
+    """Join small chunks (e.g. from stream_template) into pieces of about ``size`` characters"""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(header: Optional[List[str]], rows: Iterable[List[Any]], rows_per_chunk: int = 1000,
+               **writer_options) -> Iterator[str]:
+    """Write CSV rows in chunks instead of building the whole file in memory (no header row when None)"""
+    output = StringIO()
+    writer = csv.writer(output, **writer_options)
+    if header is not None:
+        writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % rows_per_chunk == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
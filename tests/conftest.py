@@ -0,0 +1,35 @@
+"""Shared fixtures; the modules under test live in the repository root"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_store import MemoryRepository  # noqa: E402
+
+
+@pytest.fixture
+def repo():
+    return MemoryRepository()
+
+
+@pytest.fixture
+def students(repo):
+    """Three active students, the last one in class B"""
+    docs = []
+    for i, student_class in enumerate(('A', 'A', 'B'), 1):
+        doc = {
+            'student_id': f'S{i:03d}',
+            'name': f'Student {i}',
+            'email': f's{i}@example.edu',
+            'phone': '',
+            'department': 'CS',
+            'class': student_class,
+            'created_at': datetime(2026, 1, 1),
+            'is_active': True,
+        }
+        repo.insert_student(doc)
+        docs.append(doc)
+    return docs
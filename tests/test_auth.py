@@ -0,0 +1,17 @@
+"""Password hash upgrades at login"""
+import pytest
+
+pytest.importorskip('werkzeug.security')
+
+from auth import PasswordHasher
+
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha256:1000'])
+def test_hash_with_configured_method_needs_no_rehash(method):
+    hasher = PasswordHasher(method=method, workers=1)
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+
+
+def test_hash_with_other_cost_needs_rehash():
+    old = PasswordHasher(method='pbkdf2:sha256:1000', workers=1).hash('secret')
+    assert PasswordHasher(method='pbkdf2:sha256:2000', workers=1).needs_rehash(old)
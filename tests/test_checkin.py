@@ -0,0 +1,89 @@
+"""QR self check-in: token checks, deduplication and batched writes"""
+import os
+import struct
+
+import pytest
+
+import clock
+from checkin import ACCEPTED, DUPLICATE, INVALID_TOKEN, UNKNOWN_STUDENT, CheckIns, CheckInUnavailable
+from storage import DEFAULT_SECTION
+from versioning import DataVersion
+
+
+@pytest.fixture
+def checkins(repo, tmp_path):
+    service = CheckIns(repo, b'test-secret', DataVersion(str(tmp_path / 'checkin.bin')), flush_interval=60,
+                       max_attempts=2, progress_dir=str(tmp_path / 'progress'))
+    # Flushed explicitly by the tests
+    service.start = lambda: None
+    return service
+
+
+def test_checkin_accepts_each_student_once(repo, students, checkins):
+    lecture = repo.set_active_lecture(2, 'f1', 'a')
+    token = checkins.issue(lecture, 'f1')['token']
+
+    assert checkins.check_in(token, 'S001') == ACCEPTED
+    assert checkins.check_in(token, 'S001') == DUPLICATE
+    assert checkins.check_in(token, 'S003') == UNKNOWN_STUDENT    # class B
+    assert checkins.check_in(token[:-2] + 'xx', 'S002') == INVALID_TOKEN
+    assert checkins.flush() == 1
+    assert repo.attendance_exists(str(students[0]['_id']), 'f1', 'a', 2, clock.now())
+
+
+def test_checkin_requires_a_secret(repo, tmp_path):
+    checkins = CheckIns(repo, None, DataVersion(str(tmp_path / 'checkin.bin')), progress_dir=str(tmp_path))
+    assert not checkins.enabled
+    with pytest.raises(CheckInUnavailable):
+        checkins.issue({'lecture_number': 1, 'section': DEFAULT_SECTION}, 'f1')
+    with pytest.raises(CheckInUnavailable):
+        checkins.check_in('payload.signature', 'S001')
+
+
+def test_checkin_drops_batch_after_max_attempts(repo, students, checkins):
+    token = checkins.issue(repo.set_active_lecture(1, 'f1', DEFAULT_SECTION), 'f1')['token']
+
+    def failing_sink(batch):
+        raise RuntimeError('store unavailable')
+
+    checkins.sink = failing_sink
+    assert checkins.check_in(token, 'S001') == ACCEPTED
+    checkins.flush()
+    checkins.flush()
+    # Dropped, so the student may check in again
+    assert checkins.check_in(token, 'S001') == ACCEPTED
+
+
+def test_checkin_after_finalize_turns_absent_into_present(repo, students, checkins):
+    lecture = repo.set_active_lecture(1, 'f1', DEFAULT_SECTION)
+    now = clock.now()
+    assert repo.finalize_lecture(lecture, 'f1', students, now) == 3
+
+    token = checkins.issue(lecture, 'f1')['token']
+    assert checkins.check_in(token, 'S001') == ACCEPTED
+    assert checkins.wait_for_all(timeout=1)
+    statuses = {record['student_id']: record['status'] for batch in repo.iter_attendance() for record in batch}
+    assert statuses == {'S001': 'present', 'S002': 'absent', 'S003': 'absent'}
+
+
+def test_checkin_never_overrides_a_faculty_mark(repo, students, checkins):
+    lecture = repo.set_active_lecture(1, 'f1', DEFAULT_SECTION)
+    repo.insert_attendance(repo.build_attendance(students[0], lecture, 'f1', 'manual', clock.now(), 'late'))
+
+    token = checkins.issue(lecture, 'f1')['token']
+    assert checkins.check_in(token, 'S001') == ACCEPTED
+    checkins.flush()
+    assert [record['status'] for batch in repo.iter_attendance() for record in batch] == ['late']
+
+
+def test_wait_for_all_sees_other_workers(repo, students, tmp_path):
+    progress = str(tmp_path / 'progress')
+    version = DataVersion(str(tmp_path / 'checkin.bin'))
+    checkins = CheckIns(repo, b'test-secret', version, progress_dir=progress)
+    # A live worker (this process's parent) with one check-in still buffered
+    with open(os.path.join(progress, f'{os.getppid()}.bin'), 'wb') as fh:
+        fh.write(struct.pack('QQ', 1, 0))
+    assert not checkins.wait_for_all(timeout=0.1)
+    with open(os.path.join(progress, f'{os.getppid()}.bin'), 'wb') as fh:
+        fh.write(struct.pack('QQ', 1, 1))
+    assert checkins.wait_for_all(timeout=0.1)
@@ -0,0 +1,17 @@
+"""Delta sync: snapshot and changes after a cursor"""
+import clock
+from delta_sync import ChangeFeed
+from storage import DEFAULT_SECTION
+
+
+def test_change_feed_returns_changes_after_cursor(repo, students):
+    feed = ChangeFeed(repo, overlap=0)
+    snapshot = feed.snapshot()
+    assert {student['student_id'] for student in snapshot['students']} == {'S001', 'S002', 'S003'}
+
+    lecture = {'lecture_number': 1, 'section': DEFAULT_SECTION}
+    repo.insert_attendance(repo.build_attendance(students[1], lecture, 'f1', 'manual', clock.now()))
+    changes = feed.changes(snapshot['cursor'])
+    assert [record['student_id'] for record in changes['attendance']] == ['S002']
+
+    assert feed.changes(changes['cursor'])['attendance'] == []
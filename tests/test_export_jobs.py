@@ -0,0 +1,42 @@
+"""Precomputed reports stay valid until the attendance of the days they cover changes"""
+from datetime import timedelta
+
+import pytest
+
+import clock
+from export_jobs import ExportJobs
+from storage import DEFAULT_SECTION
+from versioning import DataVersion
+
+
+@pytest.fixture
+def export_jobs(repo, tmp_path):
+    return ExportJobs(repo, DataVersion(str(tmp_path / 'version.bin')), directory=str(tmp_path / 'exports'))
+
+
+def mark(repo, export_jobs, student, now):
+    lecture = {'lecture_number': 1, 'section': DEFAULT_SECTION}
+    repo.insert_attendance(repo.build_attendance(student, lecture, 'f1', 'manual', now))
+    # What coherence.publish('attendance') does in the app
+    export_jobs.version.bump()
+
+
+def test_precomputed_report_survives_writes_to_other_days(repo, students, export_jobs):
+    now = clock.now()
+    yesterday = clock.format_day(clock.add_days(clock.day_key(now), -1))
+    mark(repo, export_jobs, students[0], now - timedelta(days=1))
+    job = export_jobs.precompute('daily_report_excel', day=yesterday)
+    assert job['status'] == 'done'
+
+    mark(repo, export_jobs, students[1], now)
+    assert export_jobs.get_precomputed('daily_report_excel', day=yesterday)
+
+    mark(repo, export_jobs, students[2], now - timedelta(days=1))
+    assert export_jobs.get_precomputed('daily_report_excel', day=yesterday) is None
+
+
+def test_reports_without_fixed_days_follow_every_write(repo, students, export_jobs):
+    export_jobs.precompute('students_excel')
+    assert export_jobs.get_precomputed('students_excel')
+    mark(repo, export_jobs, students[0], clock.now())
+    assert export_jobs.get_precomputed('students_excel') is None
@@ -0,0 +1,64 @@
+"""Marking and finalization against the in-memory backend"""
+import clock
+from storage import DEFAULT_SECTION
+
+
+def mark(repo, student, faculty_id='f1', section=DEFAULT_SECTION, lecture_number=1, status='present', now=None):
+    lecture = {'lecture_number': lecture_number, 'section': section}
+    record = repo.build_attendance(student, lecture, faculty_id, 'manual', now or clock.now(), status)
+    return repo.insert_attendance(record)
+
+
+def test_marks_are_scoped_to_faculty_and_section(repo, students):
+    student = students[0]
+    oid = str(student['_id'])
+    now = clock.now()
+
+    assert mark(repo, student, now=now) is not None
+    assert mark(repo, student, now=now) is None
+    assert repo.attendance_exists(oid, 'f1', DEFAULT_SECTION, 1, now)
+    assert not repo.attendance_exists(oid, 'f2', DEFAULT_SECTION, 1, now)
+    assert not repo.attendance_exists(oid, 'f1', 'a', 1, now)
+
+    # Another faculty member's lecture with the same number is a separate mark
+    assert mark(repo, student, faculty_id='f2', now=now) is not None
+    assert repo.marked_object_ids([oid], 'f2', DEFAULT_SECTION, 1, now) == {oid}
+
+
+def test_update_status_only_touches_its_own_mark(repo, students):
+    student = students[0]
+    oid = str(student['_id'])
+    now = clock.now()
+    mark(repo, student, faculty_id='f1', now=now)
+    mark(repo, student, faculty_id='f2', now=now)
+
+    assert repo.update_attendance_status(oid, 'f1', DEFAULT_SECTION, 1, now, 'late')
+    assert not repo.update_attendance_status(oid, 'f1', DEFAULT_SECTION, 1, now, 'late')
+    statuses = {record['faculty_id']: record['status']
+                for batch in repo.iter_attendance() for record in batch}
+    assert statuses == {'f1': 'late', 'f2': 'present'}
+
+
+def test_insert_many_skips_existing_marks(repo, students):
+    now = clock.now()
+    mark(repo, students[0], now=now)
+    lecture = {'lecture_number': 1, 'section': DEFAULT_SECTION}
+    records = [repo.build_attendance(student, lecture, 'f1', 'bulk', now) for student in students]
+
+    ids = repo.insert_attendance_many(records)
+    assert [str(record_id) for record_id in ids] == [str(record['_id']) for record in records[1:]]
+    assert repo.insert_missing_marks(records) == 0
+
+
+def test_finalize_marks_unmarked_students_absent_once(repo, students):
+    lecture = repo.get_or_create_active_lecture('f1', DEFAULT_SECTION)
+    now = clock.now()
+    mark(repo, students[0], now=now)
+
+    assert repo.finalize_lecture(lecture, 'f1', students, now) == 2
+    assert repo.finalize_lecture(lecture, 'f1', students, now) == 0
+    # Another faculty member's lecture in the same slot is not finalized
+    assert not repo.marked_object_ids([str(s['_id']) for s in students], 'f2', DEFAULT_SECTION,
+                                      lecture['lecture_number'], now)
+    statuses = sorted(record['status'] for batch in repo.iter_attendance() for record in batch)
+    assert statuses == ['absent', 'absent', 'present']
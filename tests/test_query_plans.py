@@ -0,0 +1,86 @@
+"""Every named repository query must use an index; runs against a real mongod
+
+Set TEST_MONGO_URI to point at a server; CI does, against a mongo service. Without
+it the tests try mongodb://localhost:27017 and are skipped when nothing answers;
+with it an unreachable server is a failure. A throwaway database is created and
+dropped.
+"""
+import os
+import uuid
+from datetime import timedelta
+
+import pytest
+
+pymongo = pytest.importorskip('pymongo')
+
+import clock  # noqa: E402
+from index_advisor import apply_indexes  # noqa: E402
+from repository import AttendanceRepository  # noqa: E402
+from storage import DEFAULT_SECTION  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def db():
+    uri = os.getenv('TEST_MONGO_URI')
+    try:
+        client = pymongo.MongoClient(uri or 'mongodb://localhost:27017', serverSelectionTimeoutMS=1000)
+        client.admin.command('ping')
+    except Exception as e:
+        if uri:
+            pytest.fail(f'TEST_MONGO_URI is set but {uri} does not answer: {e}')
+        pytest.skip(f'no MongoDB at mongodb://localhost:27017: {e}')
+    database = client[f'attendance_test_{uuid.uuid4().hex[:8]}']
+    try:
+        yield database
+    finally:
+        client.drop_database(database.name)
+        client.close()
+
+
+@pytest.fixture(scope='module')
+def repo(db):
+    setup = AttendanceRepository(db)
+    now = clock.now()
+    lecture = {'lecture_number': 1, 'section': DEFAULT_SECTION}
+    for i in range(50):
+        student = {'student_id': f'S{i:03d}', 'name': f'Student {i}', 'class': 'A',
+                   'created_at': now, 'updated_at': now, 'is_active': True}
+        setup.insert_student(student)
+        setup.insert_attendance(setup.build_attendance(
+            student, lecture, 'f1', 'manual', now - timedelta(days=i % 5)))
+    setup.insert_faculty({'faculty_id': 'f1', 'name': 'Faculty', 'password': 'x'})
+    created, failed = apply_indexes(db)
+    assert not failed, failed
+    # Strict mode raises CollectionScanError on the first query planned as a COLLSCAN
+    return AttendanceRepository(db, explain=True, strict=True)
+
+
+def test_student_and_faculty_queries_use_indexes(repo):
+    repo.find_faculty('f1')
+    repo.count_active_students()
+    repo.find_student('S001')
+    repo.find_students(['S001', 'S002'])
+    repo.list_active_students()
+    list(repo.iter_students())
+    assert repo.collscans == []
+
+
+def test_attendance_queries_use_indexes(repo):
+    now = clock.now()
+    today = clock.day_key(now)
+    oid = str(repo.find_student('S001')['_id'])
+    repo.get_active_lecture('f1', DEFAULT_SECTION)
+    repo.count_attendance_for_days(clock.add_days(today, -7), clock.add_days(today, 1))
+    repo.attendance_for_days(clock.add_days(today, -7), clock.add_days(today, 1))
+    repo.all_attendance(limit=10)
+    list(repo.iter_attendance(now - timedelta(days=7), now))
+    repo.attendance_exists(oid, 'f1', DEFAULT_SECTION, 1, now)
+    repo.marked_object_ids([oid], 'f1', DEFAULT_SECTION, 1, now)
+    assert repo.collscans == []
+
+
+def test_change_feed_queries_use_indexes(repo):
+    after = (clock.now() - timedelta(days=1), '')
+    for collection in ('students', 'attendance'):
+        repo.changed_since(collection, after, limit=10)
+    assert repo.collscans == []
@@ -0,0 +1,22 @@
+"""Write-behind mark queue flushing into the storage backend"""
+import clock
+from storage import DEFAULT_SECTION
+from write_behind import MarkQueue
+
+
+def test_mark_queue_flushes_into_store(repo, students, tmp_path):
+    queue = MarkQueue(repo, path=str(tmp_path / 'queue.db'), flush_interval=60)
+    lecture = {'lecture_number': 1, 'section': DEFAULT_SECTION}
+    now = clock.now()
+    try:
+        present = repo.build_attendance(students[0], lecture, 'f1', 'manual', now)
+        assert queue.enqueue(present)
+        assert not queue.enqueue(dict(present))
+        # A new status for a queued mark replaces the queued one
+        assert queue.enqueue(dict(present, status='late'))
+        queue.drain()
+    finally:
+        queue.stop()
+    assert queue.pending() == 0
+    records = [record for batch in repo.iter_attendance() for record in batch]
+    assert [record['status'] for record in records] == ['late']
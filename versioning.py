@@ -0,0 +1,111 @@
+"""
+Attendance data version for conditional GETs
+A counter bumped on every write that changes dashboard data, shared by all
+worker processes on the host through a small memory-mapped file. Polling
+endpoints derive their ETag from it and answer 304 without querying storage.
+
+Environment:
+    DATA_VERSION_PATH  counter file (default: attendance_version.bin in the temp dir)
+"""
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import make_response, request
+
+import clock
+
+# epoch (random per deployment), counter, last bump as a unix timestamp
+_LAYOUT = struct.Struct('QQd')
+
+
+def _new_epoch() -> int:
+    return int.from_bytes(os.urandom(8), 'big')
+
+
+class DataVersion:
+    """Cross-process monotonic counter with a last-modified time"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._pid = os.getpid()
+        with self._locked():
+            fresh = os.fstat(self._fd).st_size < _LAYOUT.size
+            if fresh:
+                os.ftruncate(self._fd, _LAYOUT.size)
+            self._map = mmap.mmap(self._fd, _LAYOUT.size)
+            if fresh:
+                self._write(_new_epoch(), 0)
+
+    @contextmanager
+    def _locked(self):
+        if self._pid != os.getpid():
+            # flock is shared by forked processes holding the same descriptor
+            self._fd = os.open(self.path, os.O_RDWR)
+            self._pid = os.getpid()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _write(self, epoch: int, counter: int) -> None:
+        _LAYOUT.pack_into(self._map, 0, epoch, counter, time.time())
+
+    def read(self) -> tuple:
+        return _LAYOUT.unpack_from(self._map, 0)
+
+    def bump(self) -> None:
+        with self._locked():
+            epoch, counter, _ = self.read()
+            self._write(epoch, counter + 1)
+
+    def reset(self) -> None:
+        """Start a new epoch so ETags issued before a restart never match"""
+        with self._locked():
+            self._write(_new_epoch(), 0)
+
+    def etag(self, *parts) -> str:
+        epoch, counter, _ = self.read()
+        return '-'.join([f'{epoch:x}', str(counter)] + [str(part) for part in parts])
+
+    def last_modified(self) -> datetime:
+        return datetime.fromtimestamp(self.read()[2], timezone.utc)
+
+
+data_version = DataVersion(os.getenv(
+    'DATA_VERSION_PATH', os.path.join(tempfile.gettempdir(), 'attendance_version.bin')))
+
+
+def conditional(key: Optional[Callable[[], object]] = None):
+    """Serve a GET view with an ETag from ``data_version``; unchanged data gets a 304
+
+    ``key`` adds request-specific inputs (such as session values) to the ETag.
+    The current date is always included, since "today" figures roll over at midnight.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = data_version.etag(clock.day_key(), key() if key else '')
+            # The tag is taken before the view reads, so a write racing the read
+            # leaves the client with an older tag and it refetches on the next poll
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.last_modified = data_version.last_modified()
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
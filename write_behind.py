@@ -0,0 +1,185 @@
+"""
+Write-behind marking queue
+Attendance marks are acknowledged once they are committed to a local SQLite
+(WAL) queue; a background flusher batch-inserts them into MongoDB. The queue
+survives restarts and replays without creating duplicate records.
+"""
+import atexit
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any
+
+from storage import MARK_FIELDS
+
+DATETIME_FIELDS = ('date', 'timestamp', 'updated_at')
+
+# A mark queued again with another status replaces the queued status (keeping the first
+# timestamp); the same status again changes nothing, so rowcount tells a replay apart
+ENQUEUE = """
+    INSERT INTO marks (mark_key, payload, enqueued_at) VALUES (?, ?, ?)
+    ON CONFLICT(mark_key) DO UPDATE SET
+        payload = json_set(marks.payload, '$.status', json_extract(excluded.payload, '$.status'))
+    WHERE json_extract(marks.payload, '$.status') IS NOT json_extract(excluded.payload, '$.status')
+"""
+
+
+def _encode(record: Dict[str, Any]) -> str:
+    payload = dict(record)
+    payload.pop('_id', None)
+    for field in DATETIME_FIELDS:
+        if isinstance(payload.get(field), datetime):
+            payload[field] = payload[field].isoformat()
+    return json.dumps(payload)
+
+
+def _decode(payload: str) -> Dict[str, Any]:
+    record = json.loads(payload)
+    for field in DATETIME_FIELDS:
+        if isinstance(record.get(field), str):
+            record[field] = datetime.fromisoformat(record[field])
+    return record
+
+
+def mark_key(record: Dict[str, Any]) -> str:
+    """Identity of a mark: one per student, lecture of a faculty member's section, and day"""
+    return json.dumps([record.get(field) for field in MARK_FIELDS])
+
+
+class MarkQueue:
+    """Durable local queue of attendance marks with a background Mongo flusher"""
+
+    def __init__(self, repo, path: str = 'mark_queue.db', batch_size: int = 500,
+                 flush_interval: float = 0.5, synchronous: str = 'FULL'):
+        self.repo = repo
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        # Called after marks reach the store
+        self.on_flush: Optional[Callable[[], None]] = None
+        self._init_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self) -> None:
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS marks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mark_key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL
+            )
+        """)
+
+    def start(self) -> None:
+        """Start the flusher in this process (safe to call repeatedly, and after fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mark-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher after draining what is queued"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """Durably queue a mark; returns False if the same mark is already queued with this status"""
+        self.start()
+        cursor = self._connection().execute(ENQUEUE, (mark_key(record), _encode(record), time.time()))
+        return cursor.rowcount == 1
+
+    def enqueue_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue several marks in one transaction; returns the ones that were new or changed status"""
+        self.start()
+        conn = self._connection()
+        accepted = []
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for record in records:
+                cursor = conn.execute(ENQUEUE, (mark_key(record), _encode(record), time.time()))
+                if cursor.rowcount == 1:
+                    accepted.append(record)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._wake.set()
+        return accepted
+
+    def pending(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM marks').fetchone()[0]
+
+    def flush(self) -> int:
+        """Move one batch of queued marks into Mongo; returns the number of queue rows drained"""
+        with self._flush_lock, open(self.path + '.lock', 'w') as lock_file:
+            # Serialize flushers across worker processes sharing the queue file
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            conn = self._connection()
+            rows = conn.execute(
+                'SELECT id, payload FROM marks ORDER BY id LIMIT ?', (self.batch_size,)
+            ).fetchall()
+            if not rows:
+                return 0
+            records = [_decode(payload) for _, payload in rows]
+
+            # Marks that already reached the store (e.g. flushed before a crash) only update status
+            if self.repo.write_marks(records) and self.on_flush:
+                self.on_flush()
+            conn.executemany('DELETE FROM marks WHERE id = ?', [(row_id,) for row_id, _ in rows])
+            return len(rows)
+
+    def drain(self) -> None:
+        """Flush until the queue is empty, e.g. before reading marks that must be complete"""
+        while self.flush() == self.batch_size:
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"⚠️ Write-behind flush failed, will retry: {e}")
+                time.sleep(self.flush_interval)
+
+
+def create_mark_queue(repo) -> Optional[MarkQueue]:
+    """Build the queue from environment settings, or None when write-behind is disabled"""
+    if os.getenv('WRITE_BEHIND_ENABLED', '0') != '1':
+        return None
+    queue = MarkQueue(
+        repo,
+        path=os.getenv('WRITE_BEHIND_PATH', 'mark_queue.db'),
+        batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500')),
+        flush_interval=float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '0.5')),
+        synchronous=os.getenv('WRITE_BEHIND_SYNCHRONOUS', 'FULL'),
+    )
+    atexit.register(queue.stop)
+    print(f"📥 Write-behind marking enabled ({queue.path})")
+    return queue